@@ -0,0 +1,238 @@
+from code.classes.protein import Protein
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime
+from itertools import product
+
+import matplotlib
+matplotlib.use("Agg")
+
+import argparse, csv, json, os
+import helpers
+
+# Short algorithm names, as used in the result filenames
+ALGORITHM_NAMES = {
+    1: "random",
+    2: "hillclimber",
+    3: "greedy",
+    4: "beam",
+    5: "simulated",
+    6: "exact",
+    7: "perm",
+    8: "tabu",
+    9: "genetic",
+    10: "mcts",
+}
+
+SEQUENCES_FILE = os.path.join("data", "sequences.csv")
+LEDGER_FILE = os.path.join("results", "batch_ledger.jsonl")
+LOG_DIRECTORY = os.path.join("results", "batch_logs")
+
+
+def load_sequences(names) -> dict[str, str]:
+    """
+    Resolves the sequences of a job specification.
+
+    Args:
+        names: "all" for the predefined sequences p1 - p9, or a list with names
+            p1 - p9, ids from data/sequences.csv (e.g. protein0) or literal sequences.
+
+    Returns:
+        dict[str, str]: Sequence name mapped to the sequence.
+    """
+    if names == "all":
+        return {f"p{number}": sequence for number, sequence in helpers.SEQUENCES.items()}
+
+    csv_sequences = {}
+    if os.path.isfile(SEQUENCES_FILE):
+        with open(SEQUENCES_FILE, mode='r', newline='') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                csv_sequences[row['id']] = row['sequence']
+
+    sequences = {}
+    for name in names:
+        if name.startswith("p") and name[1:].isdigit() and int(name[1:]) in helpers.SEQUENCES:
+            sequences[name] = helpers.SEQUENCES[int(name[1:])]
+        elif name in csv_sequences:
+            sequences[name] = csv_sequences[name]
+        elif set(name) <= set("HPC"):
+            sequences[name] = name
+        else:
+            raise ValueError(f"Unknown sequence '{name}'.")
+    return sequences
+
+
+def resolve_algorithm(algorithm) -> int:
+    """
+    Resolves an algorithm of a job specification to its menu number.
+
+    Args:
+        algorithm: The menu number or the short name (e.g. "hillclimber").
+
+    Returns:
+        int: The menu number of the algorithm.
+    """
+    if isinstance(algorithm, int) and algorithm in ALGORITHM_NAMES:
+        return algorithm
+    for choice, name in ALGORITHM_NAMES.items():
+        if str(algorithm).lower() == name:
+            return choice
+    raise ValueError(f"Unknown algorithm '{algorithm}'.")
+
+
+def build_jobs(spec: dict) -> list[dict]:
+    """
+    Expands a job specification into the list of sequence x algorithm x time budget x repeat jobs.
+
+    Args:
+        spec (dict): The job specification.
+
+    Returns:
+        list[dict]: One dictionary per job. The job name is also its result filename.
+    """
+    sequences = load_sequences(spec.get("sequences", "all"))
+    algorithms = [resolve_algorithm(algorithm) for algorithm in spec.get("algorithms", list(ALGORITHM_NAMES))]
+    minutes = spec.get("minutes", [120])
+    minutes = minutes if isinstance(minutes, list) else [minutes]
+    repeats = spec.get("repeats", 1)
+    prefix = spec.get("prefix", "o")
+    parameters = spec.get("parameters", {})
+
+    jobs = []
+    for (name, sequence), choice, budget, repeat in product(sequences.items(), algorithms, minutes, range(repeats)):
+        filename = f"{prefix}_{name}_{ALGORITHM_NAMES[choice]}_{budget}min"
+        if repeats > 1:
+            filename += f"_run{repeat + 1}"
+
+        jobs.append({
+            "name": filename,
+            "filename": filename + ".csv",
+            "sequence": sequence,
+            "choice": choice,
+            "minutes": budget,
+            "seed": [spec.get("seed", 0), len(jobs)],
+            "parameters": parameters.get(ALGORITHM_NAMES[choice], {}),
+        })
+    return jobs
+
+
+def read_ledger(ledger_path: str) -> set[str]:
+    """
+    Reads the names of the finished jobs from the ledger.
+
+    Args:
+        ledger_path (str): Path to the ledger file.
+
+    Returns:
+        set[str]: Names of the jobs that are finished.
+    """
+    finished = set()
+    if os.path.isfile(ledger_path):
+        with open(ledger_path, mode='r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut off by an interruption
+                if entry.get("status") == "done":
+                    finished.add(entry["job"])
+    return finished
+
+
+def append_ledger(ledger_path: str, entry: dict) -> None:
+    """
+    Appends an entry to the ledger and flushes it to disk.
+
+    Args:
+        ledger_path (str): Path to the ledger file.
+        entry (dict): The entry to append.
+    """
+    with open(ledger_path, mode='a') as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_job(job: dict) -> float | None:
+    """
+    Runs one job in a worker process. The terminal output of the algorithm is
+    written to a log file per job. A job that was interrupted continues from its checkpoint.
+
+    Args:
+        job (dict): The job to run.
+
+    Returns:
+        float | None: The best stability found.
+    """
+    log_path = os.path.join(LOG_DIRECTORY, job["name"] + ".log")
+    with open(log_path, mode='w') as log, redirect_stdout(log):
+        return helpers.run_algorithm_for_x_minutes(
+            job["choice"],
+            Protein(job["sequence"]),
+            helpers.ALGORITHMS[job["choice"]],
+            job["filename"],
+            job["minutes"],
+            seed=job["seed"],
+            parameters=job["parameters"],
+            resume=True)
+
+
+def run_batch(spec: dict, workers: int, ledger_path: str = LEDGER_FILE) -> None:
+    """
+    Runs all jobs of a specification in a pool of processes. Finished jobs are
+    recorded in the ledger, so an interrupted batch skips them when it is started again.
+
+    Args:
+        spec (dict): The job specification.
+        workers (int): The number of jobs that run at the same time.
+        ledger_path (str): Path to the ledger file.
+    """
+    for directory in [os.path.dirname(ledger_path) or ".", LOG_DIRECTORY]:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    jobs = build_jobs(spec)
+    finished = read_ledger(ledger_path)
+    pending = [job for job in jobs if job["name"] not in finished]
+    print(f"{len(jobs)} jobs, {len(jobs) - len(pending)} already finished, {len(pending)} to run.")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, job): job for job in pending}
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                best_stability = future.result()
+            except Exception as e:
+                print(f"Job {job['name']} failed: {e}")
+                append_ledger(ledger_path, {"job": job["name"], "status": "failed", "error": str(e)})
+                continue
+
+            print(f"Job {job['name']} finished: Stability={best_stability}")
+            append_ledger(ledger_path, {
+                "job": job["name"],
+                "status": "done",
+                "best_stability": best_stability,
+                "finished": datetime.now().isoformat(timespec="seconds"),
+            })
+
+
+def main():
+    """
+    Runs a batch of experiments from a JSON job specification without any prompts.
+    """
+    parser = argparse.ArgumentParser(description="Run a batch of protein folding experiments.")
+    parser.add_argument("spec", help="Path to the JSON job specification.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of jobs that run at the same time.")
+    parser.add_argument("--ledger", default=LEDGER_FILE, help="Path to the job ledger.")
+    args = parser.parse_args()
+
+    with open(args.spec, mode='r') as f:
+        spec = json.load(f)
+
+    workers = args.workers or spec.get("workers", os.cpu_count())
+    run_batch(spec, workers, args.ledger)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,54 @@
 from code.classes.protein import Protein
 from code.classes.data_storing import DataStoring
 from code.algorithms.hillclimber import HillClimber
+from code.classes.lattice import directions_from_coordinates
+from code.classes.moves import MoveSet
 
-import random, copy, math
+import random, math
 import matplotlib.pyplot as plt
+import numpy as np
+
+
+def cooling_schedule(protein_length: int) -> tuple[float, float, float]:
+    """
+    Returns the cooling parameters that suit a protein of the given length.
+
+    Args:
+        protein_length (int): Number of amino acids.
+
+    Returns:
+        tuple[float, float, float]: The cooling rate, initial temperature and minimum temperature.
+    """
+    if protein_length < 25:
+        return 0.999, 3.0, 1.0
+    elif 25 <= protein_length < 35:
+        return 0.997, 3.0, 1.0
+    elif 35 <= protein_length <= 50:
+        return 0.995, 2.0, 0.6
+    return 0.990, 3.0, 1.0
+
+
+def metropolis_accept(delta_e, temperature: float, uniform):
+    """
+    Applies the Metropolis criterion: improvements are always accepted and a
+    worse folding with probability exp(-delta_e / temperature). A temperature
+    of 0 only accepts improvements.
+
+    Works on single values as well as on NumPy arrays of moves.
+
+    Args:
+        delta_e: Change in stability of the move(s).
+        temperature (float): The current temperature.
+        uniform: Random number(s) between 0 and 1.
+
+    Returns:
+        The acceptance (a boolean or a boolean array).
+    """
+    if temperature <= 0:
+        return delta_e < 0
+    with np.errstate(over='ignore'):
+        return (delta_e < 0) | (uniform < np.exp(-np.asarray(delta_e) / temperature))
+
 
 class SimulatedAnnealing:
     """
@@ -15,7 +60,8 @@ class SimulatedAnnealing:
     enabling escape from local minima and convergence to an optimized solution.
     """
 
-    def __init__(self, data: DataStoring, protein: Protein, max_attempts_per_temp: int = 100, hillclimber_iterations: int = 1000) -> None:
+    def __init__(self, data: DataStoring, protein: Protein, max_attempts_per_temp: int = 100, hillclimber_iterations: int = 1000,
+                 move_set: str = "rotations", optimum: int = None) -> None:
         """
         Initializes the Simulated Annealing algorithm.
 
@@ -24,32 +70,21 @@ class SimulatedAnnealing:
             protein (Protein): The protein to optimize.
             max_attempts_per_temp (int): Number of attempts per temperature level.
             hillclimber_iterations (int): Number of iterations for the HillClimber algorithm.
+            move_set (str): The moves to use, see MoveSet.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
         """
         self.data = data
         self.protein = protein
         self.max_attempts_per_temp = max_attempts_per_temp
         self.hillclimber_iterations = hillclimber_iterations
+        self.move_set = MoveSet(move_set)
         self.current_protein = None  # Store the initial folded protein
         self.best_protein = None  # Track the best protein configuration found
+        self.resume_state = None  # State from a checkpoint to continue from
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
 
         # Configure cooling parameters based on protein length
-        protein_length = len(protein.sequence)
-        if protein_length < 25:
-            self.cooling_rate = 0.999
-            self.initial_temp = 3.0
-            self.min_temp = 1.0
-        elif 25 <= protein_length < 35:
-            self.cooling_rate = 0.997
-            self.initial_temp = 3.0
-            self.min_temp = 1.0
-        elif 35 <= protein_length <= 50:
-            self.cooling_rate = 0.995
-            self.initial_temp = 2.0
-            self.min_temp = 0.6
-        else:
-            self.cooling_rate = 0.990
-            self.initial_temp = 3.0
-            self.min_temp = 1.0
+        self.cooling_rate, self.initial_temp, self.min_temp = cooling_schedule(len(protein.sequence))
 
     def initialize_with_hillclimber(self) -> Protein:
         """
@@ -58,13 +93,31 @@ class SimulatedAnnealing:
         Returns:
             Protein: The locally optimized protein structure.
         """
-        hill_climber = HillClimber(protein=self.protein, max_iterations=self.hillclimber_iterations)
+        hill_climber = HillClimber(protein=self.protein, max_iterations=self.hillclimber_iterations,
+                                   move_set=self.move_set.name)
         return hill_climber.execute()
 
-    def execute(self) -> Protein:
+    def load_state(self, state: dict) -> None:
+        """
+        Continues from a state saved by a checkpoint during an earlier execution.
+
+        Args:
+            state (dict): The temperature, iteration and the current and best
+                foldings as direction codes.
+        """
+        self.current_protein = Protein.from_directions(self.protein.sequence, state["current"])
+        self.resume_state = state
+
+    def execute(self, checkpoint=None) -> Protein:
         """
         Executes the Simulated Annealing algorithm.
 
+        Args:
+            checkpoint (callable): Optional function that is called with the
+                algorithm state after every temperature step. It returns True
+                when the state was saved, after which the collected iteration
+                data is exported.
+
         Returns:
             Protein: The best protein configuration found during optimization.
         """
@@ -72,60 +125,60 @@ class SimulatedAnnealing:
         if self.current_protein is None:
             self.current_protein = self.initialize_with_hillclimber()
 
-        current_protein = copy.deepcopy(self.current_protein)
-        self.best_protein = copy.deepcopy(current_protein)
+        current_protein = self.current_protein.copy()
+        best_snapshot = current_protein.snapshot()
         current_stability = current_protein.calculate_stability()
         best_stability = current_stability
 
         current_temp = self.initial_temp
         iteration_count = 0
 
+        # Continue from a checkpoint
+        if self.resume_state is not None:
+            current_temp = self.resume_state["temperature"]
+            iteration_count = self.resume_state["iteration"]
+            best_protein = Protein.from_directions(self.protein.sequence, self.resume_state["best"])
+            best_snapshot = best_protein.snapshot()
+            best_stability = best_protein.calculate_stability()
+            self.resume_state = None
+
         iteration_data = []# Track iteration counts for plotting
 
-        while current_temp > self.min_temp:
+        while current_temp > self.min_temp and best_stability > self.lower_bound:
             for attempt in range(self.max_attempts_per_temp):
                 print(f"Iteration: {iteration_count}, Temperature: {current_temp:.6f}, Attempt: {attempt + 1}, Current Stability: {current_stability}, Best Stability: {best_stability}")
 
-                # Generate a list of valid pivot points
-                possible_folds = list(range(len(current_protein.amino_acids) - 1))
-                if not possible_folds:
+                if len(current_protein.positions) < 2:
                     break
 
-                # Randomly select a pivot point and rotation
-                pivot = random.choice(possible_folds)
-                rotation_matrix = random.choice(list(current_protein.get_rotation_matrices().values()))
-                new_protein = copy.deepcopy(current_protein)
-
-                # Apply rotation if valid
-                if new_protein.is_rotation_valid(pivot, rotation_matrix):
-                    for amino_index in range(pivot + 1, len(new_protein.amino_acids)):
-                        new_protein.rotate_amino_acid(amino_index, pivot, rotation_matrix)
+                # Randomly select a move, None if it is not valid
+                move = self.move_set.random_move(current_protein)
 
-                    # Calculate the stability difference
-                    new_stability = new_protein.calculate_stability()
-                    delta_e = new_stability - current_stability
+                # Evaluate the move if valid
+                if move is not None:
+                    # Calculate the stability difference without applying the move
+                    delta_e = self.move_set.stability_delta(current_protein, move)
+                    new_stability = current_stability + delta_e
 
                     # Determine acceptance based on stability and temperature
-                    if delta_e < 0:
-                        accept = True  # Always accept improvements
-                    else:
-                        probability = math.exp(-delta_e / current_temp)
-                        accept = random.uniform(0, 1) < probability
-
-                    if accept:
-                        current_protein = copy.deepcopy(new_protein)
+                    if metropolis_accept(delta_e, current_temp, random.uniform(0, 1)):
+                        self.move_set.apply(current_protein, move)
                         current_stability = new_stability
 
                         # Periodically refine using HillClimber
                         if iteration_count % 10 == 0:
-                            hill_climber = HillClimber(protein=current_protein, max_iterations=10, start=1)
+                            hill_climber = HillClimber(protein=current_protein, max_iterations=10, start=1,
+                                                       move_set=self.move_set.name)
                             current_protein = hill_climber.execute()
                             current_stability = current_protein.calculate_stability()
 
                         # Update the best configuration found
                         if current_stability < best_stability:
-                            self.best_protein = copy.deepcopy(current_protein)
+                            best_snapshot = current_protein.snapshot()
                             best_stability = current_stability
+                            if best_stability <= self.lower_bound:
+                                print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                                break
             iteration = iteration_count
             temp = current_temp
             stability= current_stability
@@ -137,9 +190,22 @@ class SimulatedAnnealing:
             current_temp *= self.cooling_rate
             iteration_count += 1
 
+            if checkpoint is not None:
+                state = {
+                    "temperature": current_temp,
+                    "iteration": iteration_count,
+                    "current": current_protein.to_directions(),
+                    "best": directions_from_coordinates(best_snapshot).tolist(),
+                }
+                if checkpoint(state):
+                    self.export_results(iteration_data)
+                    iteration_data = []
+
         self.export_results(iteration_data)
 
         # Return the best configuration found
+        self.best_protein = current_protein.copy()
+        self.best_protein.restore(best_snapshot)
         return self.best_protein
     
     def export_results(self, iteration_data: list[tuple[int, float, float]]) -> None:
@@ -1,19 +1,138 @@
 from code.classes.data_storing import DataStoring
 from code.classes.protein import Protein
 from code.classes.protein import Protein
+from code.classes.energy import get_sequence_tables
+from code.classes.lattice import (
+    DIRECTION_KEY_STEPS, coordinates_from_directions, decode_directions, pack_coordinates, pack_position
+)
 from code.visualisation.timer import Timer
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import islice, repeat
 
-import copy
+import heapq
 import numpy as np
 
+# Direction codes of +y, +x, -y, -x, +z and -z, the order in which candidates are made
+BEAM_DIRECTIONS = [2, 1, -2, -1, 3, -3]
+
+# Smallest part of the beam that is worth sending to a worker process
+MIN_SHARD_SIZE = 64
+
+
+def expand_shard(sequence: str, shard: list[tuple[int, bytes]], step: int, k: int) -> list[tuple[int, bytes]]:
+    """
+    Expands and scores a part of the beam in a worker process of the parallel beam search.
+
+    Partial foldings are passed as their stability and encoded directions, so
+    no Protein objects have to be sent between processes.
+
+    Args:
+        sequence (str): The protein sequence.
+        shard (list[tuple[int, bytes]]): Stability and encoded directions of every partial folding.
+        step (int): Index of the amino acid to place.
+        k (int): Number of candidates to return.
+
+    Returns:
+        list[tuple[int, bytes]]: The k best candidates of the shard, best first.
+    """
+    tables = get_sequence_tables(sequence)
+    directions = decode_directions(b"".join(prefix for _, prefix in shard)).reshape(len(shard), step - 1)
+    keys = pack_coordinates(coordinates_from_directions(directions)).tolist()
+
+    candidates = []
+    for (energy, prefix), path_keys in zip(shard, keys):
+        occupancy = dict(zip(path_keys, range(step)))
+        for direction in BEAM_DIRECTIONS:
+            key = path_keys[-1] + DIRECTION_KEY_STEPS[direction + 3]
+            if key not in occupancy:
+                new_energy = energy + tables.contact_energy(step, key, occupancy)
+                candidates.append((new_energy, prefix + bytes((direction + 3,))))  # Same encoding as encode_directions
+
+    return heapq.nsmallest(k, candidates, key=lambda candidate: candidate[0])
+
+
+class BeamNode:
+    """
+    A partial folding in the prefix tree of the beam search.
+
+    A node only stores the last step of the chain and points to the node of
+    the chain without that step, so candidates share their common prefix.
+    The stability of a node is the stability of its parent plus the contacts
+    of the newly placed amino acid.
+
+    The anytime search caches the scored extensions of a node in `children`,
+    so a node that is kept again at a larger beam width is not expanded twice.
+    """
+
+    __slots__ = ("parent", "direction", "key", "energy", "occupancy", "children")
+
+    def __init__(self, parent: "BeamNode", direction: int, key: int, energy: int, occupancy: dict) -> None:
+        """
+        Initializes the node.
+
+        Args:
+            parent (BeamNode): The node of the prefix, None for the first amino acid.
+            direction (int): Direction code of the last step, +-1 (x), +-2 (y) or +-3 (z).
+            key (int): Packed position of the last placed amino acid.
+            energy (int): Stability of the partial folding.
+            occupancy (dict): Packed position -> index of every placed amino acid.
+        """
+        self.parent = parent
+        self.direction = direction
+        self.key = key
+        self.energy = energy
+        self.occupancy = occupancy
+        self.children = None  # [energy, direction, key, node or None] per extension, once expanded
+
+    @classmethod
+    def root(cls) -> "BeamNode":
+        """
+        Returns:
+            BeamNode: The node with only the first amino acid, placed at the origin.
+        """
+        key = pack_position((0, 0, 0))
+        return cls(None, 0, key, 0, {key: 0})
+
+    def directions(self) -> list[int]:
+        """
+        Returns:
+            list[int]: The direction codes of every step from the first amino acid to this node.
+        """
+        directions = []
+        node = self
+        while node.parent is not None:
+            directions.append(node.direction)
+            node = node.parent
+        return directions[::-1]
+
+    def path_occupancy(self) -> dict:
+        """
+        Returns the occupancy of the node, rebuilt from the path to the root
+        when it was released to save memory.
+
+        Returns:
+            dict: Packed position -> index of every placed amino acid.
+        """
+        if self.occupancy is not None:
+            return self.occupancy
+
+        keys = []
+        node = self
+        while node is not None:
+            keys.append(node.key)
+            node = node.parent
+        return {key: index for index, key in enumerate(reversed(keys))}
+
+
 class BeamSearchProteinFolding:
     """
     Implements the Beam Search algorithm for optimizing protein folding.
     Maintains a fixed number of candidate configurations (beam width) at each step.
     """
 
-    def __init__(self, data: DataStoring, protein: Protein, beam_width: int):
+    def __init__(self, data: DataStoring, protein: Protein, beam_width: int, workers: int = 1,
+                 optimum: int = None):
         """
         Initializes the Beam Search class.
 
@@ -21,15 +140,17 @@ class BeamSearchProteinFolding:
             data (DataStoring): Object for managing data storage.
             protein (Protein): The protein object to fold.
             beam_width (int): Number of top configurations to keep at each step.
+            workers (int): Number of processes that expand the beam in execute.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
         """
         self.data = data
         self.protein = protein
         self.beam_width = beam_width
-        self.directions = [
-            np.array([0, 1, 0]), np.array([1, 0, 0]), np.array([0, -1, 0]),
-            np.array([-1, 0, 0]), np.array([0, 0, 1]), np.array([0, 0, -1])
-        ]
+        self.workers = workers
+        self.directions = BEAM_DIRECTIONS
         self.stabilities = []  # Stores stability scores of configurations
+        self.cached_nodes = 0  # Number of nodes in the prefix tree of the anytime search
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
 
     def execute(self) -> Protein:
         """
@@ -41,36 +162,27 @@ class BeamSearchProteinFolding:
         Returns:
             Protein: The best protein configuration found.
         """
+        if self.workers > 1:
+            return self.execute_parallel()
+
         beam_data=[]
-        protein = Protein(self.protein.sequence)
-        n = len(protein.amino_acids)
+        n = len(self.protein.sequence)
 
-        beam = [protein]  # Initialize the beam with the starting configuration
+        beam = [BeamNode.root()]  # Initialize the beam with the first amino acid
         timer = Timer()
         timer.start()
 
         for step in range(1, n):
-            candidates = []  # Store candidate configurations for the current step
-            
-
-            for current_protein in beam:
-                last_pos = current_protein.amino_acids[step - 1]["position"]
-
-                # Try placing the next amino acid in all possible directions
-                for direction in self.directions:
-                    new_pos = last_pos + direction
+            # Store candidate configurations for the current step
+            candidates = self.expand_candidates(beam, step)
+            if not candidates:
+                raise RuntimeError(f"Every candidate is trapped at amino acid {step}, use a wider beam.")
 
-                    if not any(np.array_equal(new_pos, aa["position"]) for aa in current_protein.amino_acids[:step]):
-                        new_protein = copy.deepcopy(current_protein)
-                        new_protein.amino_acids[step]["position"] = new_pos
-                        stability = new_protein.calculate_stability()
-                        candidates.append((stability, new_protein))
-
-            candidates.sort(key=lambda x: x[0])  # Sort by stability (lower is better)
-            beam = [protein for _, protein in candidates[:self.beam_width]]  # Retain top candidates
+            beam = self.select_candidates(candidates, step, self.beam_width)  # Retain top candidates
 
             # Save stability scores for visualization
-            self.stabilities.extend([stability for stability, _ in candidates])
+            self.stabilities.extend([candidate[0] for candidate in candidates])
+            stability = beam[0].energy
 
             timer.stop()
             elapsed_time = timer.elapsed_time()
@@ -79,67 +191,319 @@ class BeamSearchProteinFolding:
             self.export_results(beam_data)
 
         # Return the best configuration
-        best_protein = min(beam, key=lambda protein: protein.calculate_stability())
-        return best_protein
+        return self.materialize(beam[0])
+
+    def execute_parallel(self) -> Protein:
+        """
+        Executes the Beam Search algorithm with the beam expansion divided over
+        a pool of worker processes.
+
+        Every step the beam is split in contiguous shards. Each worker expands
+        and scores its shard and returns only its best beam_width candidates,
+        sorted. The sorted lists are merged with a k-way merge, which gives the
+        same beam as a full sort of all candidates.
+
+        Returns:
+            Protein: The best protein configuration found.
+        """
+        beam_data = []
+        sequence = self.protein.sequence
+        n = len(sequence)
+
+        beam = [(0, b"")]  # Stability and encoded directions of every partial folding
+        timer = Timer()
+        timer.start()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for step in range(1, n):
+                shards = self.split_beam(beam)
+                if len(shards) == 1:
+                    results = [expand_shard(sequence, shards[0], step, self.beam_width)]
+                else:
+                    results = executor.map(expand_shard, repeat(sequence), shards, repeat(step), repeat(self.beam_width))
+
+                beam = list(islice(heapq.merge(*results, key=lambda candidate: candidate[0]), self.beam_width))
+                if not beam:
+                    raise RuntimeError(f"Every candidate is trapped at amino acid {step}, use a wider beam.")
+
+                # Save stability scores of the kept candidates for visualization
+                self.stabilities.extend([stability for stability, _ in beam])
+                stability = beam[0][0]
 
-    def execute_with_dynamic_beam_width(self, end_time: datetime) -> tuple[Protein, list[tuple[int, float, float]]]:
+                timer.stop()
+                elapsed_time = timer.elapsed_time()
+                beam_data.append((self.beam_width, elapsed_time, stability))
+
+                self.export_results(beam_data)
+                beam_data = []
+
+        return Protein.from_bytes(sequence, beam[0][1])
+
+    def split_beam(self, beam: list[tuple[int, bytes]]) -> list[list[tuple[int, bytes]]]:
+        """
+        Splits the beam in contiguous shards, one per worker, of at least MIN_SHARD_SIZE partial foldings.
+
+        Args:
+            beam (list[tuple[int, bytes]]): The partial foldings.
+
+        Returns:
+            list[list[tuple[int, bytes]]]: The shards, in beam order.
+        """
+        shard_count = max(1, min(self.workers, len(beam) // MIN_SHARD_SIZE))
+        shard_size = -(-len(beam) // shard_count)
+        return [beam[start:start + shard_size] for start in range(0, len(beam), shard_size)]
+
+    def execute_with_dynamic_beam_width(self, end_time: datetime, checkpoint=None, state: dict = None) -> tuple[Protein, list[tuple[int, float, float]]]:
         """
         Executes Beam Search with dynamically increasing beam widths until a given end time.
 
         Args:
             end_time (datetime): The time to stop execution.
+            checkpoint (callable): Optional function that is called with the
+                algorithm state after every beam width.
+            state (dict): Optional state saved by a checkpoint to continue from.
 
         Returns:
             tuple: The best found Protein and a list of tuples with beam data.
         """
-        n = len(self.protein.amino_acids)
+        n = len(self.protein.sequence)
 
         beam_width = 1
         best_protein = None
         best_stability = float('inf')
         beam_data = []
 
-        while datetime.now() < end_time:
-            protein = Protein(self.protein.sequence)
-            beam = [protein]  # Initialize the beam
+        # Continue from a checkpoint
+        if state is not None:
+            beam_width = state["beam_width"]
+            if state.get("best") is not None:
+                best_protein = Protein.from_directions(self.protein.sequence, state["best"])
+                best_stability = best_protein.calculate_stability()
+
+        while datetime.now() < end_time and best_stability > self.lower_bound:
+            beam = [BeamNode.root()]  # Initialize the beam
             timer = Timer()
             timer.start()
 
             for step in range(1, n):
-                candidates = []
+                candidates = self.expand_candidates(beam, step)
+                beam = self.select_candidates(candidates, step, beam_width)
+                if not beam:
+                    break  # Every candidate is trapped, try the next beam width
+
+            if beam:
+                current_stability = beam[0].energy
 
-                for current_protein in beam:
-                    last_pos = current_protein.amino_acids[step - 1]["position"]
-                    for direction in self.directions:
-                        new_pos = last_pos + direction
+                if current_stability < best_stability:
+                    best_stability = current_stability
+                    best_protein = self.materialize(beam[0])
 
-                        if not any(np.array_equal(new_pos, aa["position"]) for aa in current_protein.amino_acids[:step]):
-                            new_protein = copy.deepcopy(current_protein)
-                            new_protein.amino_acids[step]["position"] = new_pos
-                            stability = new_protein.calculate_stability()
-                            candidates.append((stability, new_protein))
+                timer.stop()
+                elapsed_time = timer.elapsed_time()
+                beam_data.append((beam_width, elapsed_time, current_stability))
 
-                candidates.sort(key=lambda x: x[0])
-                beam = [protein for _, protein in candidates[:beam_width]]
+            beam_width += 5  # Increase the beam width for the next iteration
 
-            current_best_protein = min(beam, key=lambda protein: protein.calculate_stability())
-            current_stability = current_best_protein.calculate_stability()
+            self.export_results(beam_data)
+            beam_data = []
 
-            if current_stability < best_stability:
-                best_stability = current_stability
-                best_protein = current_best_protein
+            if checkpoint is not None and best_protein is not None:
+                checkpoint({"beam_width": beam_width, "best": best_protein.to_directions()})
 
-            timer.stop()
-            elapsed_time = timer.elapsed_time()
-            beam_data.append((beam_width, elapsed_time, current_stability))
+        return best_protein
 
-            beam_width += 5  # Increase the beam width for the next iteration
+    def execute_anytime(self, end_time: datetime, checkpoint=None, state: dict = None, cache_limit: int = 2_000_000) -> Protein:
+        """
+        Executes Beam Search with a doubling beam width until a given end time,
+        reusing the work of the earlier passes.
+
+        All passes share one prefix tree. A node that was kept at a smaller
+        beam width keeps its scored extensions, so a wider pass only scores
+        the nodes that are new. When the tree grows beyond cache_limit nodes
+        the next pass starts with an empty tree. A pass is cut off at the end
+        time, and every improvement of the best folding is reported directly.
+
+        Args:
+            end_time (datetime): The time to stop execution.
+            checkpoint (callable): Optional function that is called with the
+                algorithm state after every beam width.
+            state (dict): Optional state saved by a checkpoint to continue from.
+            cache_limit (int): Maximum number of cached nodes.
+
+        Returns:
+            Protein: The best protein configuration found.
+        """
+        n = len(self.protein.sequence)
+
+        beam_width = 1
+        best_protein = None
+        best_stability = float('inf')
+        beam_data = []
+
+        # Continue from a checkpoint
+        if state is not None:
+            beam_width = state["beam_width"]
+            if state.get("best") is not None:
+                best_protein = Protein.from_directions(self.protein.sequence, state["best"])
+                best_stability = best_protein.calculate_stability()
+
+        root = BeamNode.root()
+        self.cached_nodes = 0
+
+        while datetime.now() < end_time and best_stability > self.lower_bound:
+            if self.cached_nodes > cache_limit:
+                root = BeamNode.root()
+                self.cached_nodes = 0
+
+            beam = [root]
+            timer = Timer()
+            timer.start()
+
+            for step in range(1, n):
+                if datetime.now() >= end_time:
+                    beam = []  # Out of time, the pass is not finished
+                    break
+                beam = self.select_cached_candidates(beam, step, beam_width)
+                if not beam:
+                    break  # Every candidate is trapped, try the next beam width
+
+            if beam:
+                current_stability = beam[0].energy
+
+                if current_stability < best_stability:
+                    best_stability = current_stability
+                    best_protein = self.materialize(beam[0])
+                    print(f"Beam width {beam_width}: new best stability {best_stability}")
+
+                timer.stop()
+                elapsed_time = timer.elapsed_time()
+                beam_data.append((beam_width, elapsed_time, current_stability))
+
+            beam_width *= 2  # Double the beam width for the next pass
 
             self.export_results(beam_data)
             beam_data = []
 
+            if checkpoint is not None and best_protein is not None:
+                checkpoint({"beam_width": beam_width, "best": best_protein.to_directions()})
+
         return best_protein
 
+    def expand_candidates(self, beam: list[BeamNode], step: int) -> list[tuple[int, BeamNode, int, int]]:
+        """
+        Places the amino acid at `step` in every free direction for every node
+        in the beam. Only the contacts of the new amino acid are calculated,
+        the rest of the score comes from the parent node.
+
+        Args:
+            beam (list[BeamNode]): The partial foldings kept from the previous step.
+            step (int): Index of the amino acid to place.
+
+        Returns:
+            list[tuple[int, BeamNode, int, int]]: The stability, parent node, direction code
+            and packed position of every candidate.
+        """
+        tables = self.protein.tables
+        candidates = []
+        for node in beam:
+            occupancy = node.occupancy
+
+            # Try placing the next amino acid in all possible directions
+            for direction in self.directions:
+                key = node.key + DIRECTION_KEY_STEPS[direction + 3]
+                if key not in occupancy:
+                    energy = node.energy + tables.contact_energy(step, key, occupancy)
+                    candidates.append((energy, node, direction, key))
+        return candidates
+
+    def select_candidates(self, candidates: list[tuple[int, BeamNode, int, int]], step: int, beam_width: int) -> list[BeamNode]:
+        """
+        Keeps the best candidates and turns only those into nodes.
+
+        Args:
+            candidates (list): Candidates made by expand_candidates.
+            step (int): Index of the amino acid that was placed.
+            beam_width (int): Number of candidates to keep.
+
+        Returns:
+            list[BeamNode]: The new beam, best node first.
+        """
+        candidates.sort(key=lambda candidate: candidate[0])  # Sort by stability (lower is better)
+
+        beam = []
+        for energy, parent, direction, key in candidates[:beam_width]:
+            occupancy = parent.occupancy.copy()
+            occupancy[key] = step
+            beam.append(BeamNode(parent, direction, key, energy, occupancy))
+        return beam
+
+    def expand_cached(self, node: BeamNode, step: int) -> list[list]:
+        """
+        Scores every free extension of a node once and caches them on the node.
+
+        Args:
+            node (BeamNode): The partial folding to extend.
+            step (int): Index of the amino acid to place.
+
+        Returns:
+            list[list]: The stability, direction code, packed position and child node
+            (None until it is kept) of every extension.
+        """
+        if node.children is None:
+            tables = self.protein.tables
+            occupancy = node.path_occupancy()
+            node.children = []
+            for direction in self.directions:
+                key = node.key + DIRECTION_KEY_STEPS[direction + 3]
+                if key not in occupancy:
+                    energy = node.energy + tables.contact_energy(step, key, occupancy)
+                    node.children.append([energy, direction, key, None])
+        return node.children
+
+    def select_cached_candidates(self, beam: list[BeamNode], step: int, beam_width: int) -> list[BeamNode]:
+        """
+        Expands the beam with the cached extensions and keeps the best candidates.
+        Only kept candidates that were never kept before become new nodes.
+
+        The occupancy of the expanded nodes is released afterwards, their children
+        hold their own copy and path_occupancy can rebuild it when needed.
+
+        Args:
+            beam (list[BeamNode]): The partial foldings kept from the previous step.
+            step (int): Index of the amino acid to place.
+            beam_width (int): Number of candidates to keep.
+
+        Returns:
+            list[BeamNode]: The new beam, best node first.
+        """
+        candidates = [(child[0], node, child) for node in beam for child in self.expand_cached(node, step)]
+        candidates.sort(key=lambda candidate: candidate[0])  # Sort by stability (lower is better)
+
+        new_beam = []
+        for energy, parent, child in candidates[:beam_width]:
+            if child[3] is None:
+                occupancy = parent.path_occupancy().copy()
+                occupancy[child[2]] = step
+                child[3] = BeamNode(parent, child[1], child[2], energy, occupancy)
+                self.cached_nodes += 1
+            new_beam.append(child[3])
+
+        for node in beam:
+            node.occupancy = None
+        return new_beam
+
+    def materialize(self, node: BeamNode) -> Protein:
+        """
+        Builds the Protein of a complete folding in the prefix tree.
+
+        Args:
+            node (BeamNode): The node of the last amino acid.
+
+        Returns:
+            Protein: The folded protein.
+        """
+        return Protein.from_directions(self.protein.sequence, node.directions())
+
     def export_results(self, beam_data:list[tuple[int, float, float]]) -> None:
         
         """
@@ -0,0 +1,242 @@
+from code.classes.protein import Protein
+from code.classes.data_storing import DataStoring
+from code.algorithms.beam_search import BeamNode, BeamSearchProteinFolding
+from code.classes.energy import BOND_ENERGY_TABLE
+from code.classes.bounds import contact_weights, parity_bound, record_optimum, remaining_bounds, slot_bound, unplaced_slots
+from code.classes.lattice import DIRECTION_KEY_STEPS, DIRECTION_VECTORS, NEIGHBOR_KEY_STEPS, NEIGHBOR_OFFSETS, pack_position
+from datetime import datetime
+
+import time
+
+# Direction codes that may be taken while the chain is still on the x-axis,
+# in the xy-plane, or already three-dimensional (symmetry breaking)
+ALLOWED_DIRECTIONS = [
+    [1, 2],
+    [1, -1, 2, -2, 3],
+    [1, -1, 2, -2, 3, -3]
+]
+
+# Offset and packed key offset of the six neighbouring sites, and the unit step of every direction code
+NEIGHBOR_STEPS = list(zip(NEIGHBOR_OFFSETS.tolist(), NEIGHBOR_KEY_STEPS))
+STEP_VECTORS = DIRECTION_VECTORS.tolist()
+
+
+class BranchAndBound:
+    """
+    Exact solver that grows the chain depth-first and proves the optimal stability.
+
+    Three things keep the search small:
+    - Symmetry breaking: the first step goes along +x, the first step off the
+      x-axis along +y and the first step out of the xy-plane along +z. Every
+      folding is still reachable up to one of the 48 lattice symmetries.
+    - A lower bound on the stability the remaining amino acids can still add,
+      the tighter of two admissible bounds. Branches that cannot beat the best
+      folding are cut off.
+    - Dead-end detection: a site without any free neighbour is never used for
+      an amino acid that still needs a successor.
+
+    For sequences that are too long to solve, a node or time limit stops the
+    search and the certificate shows how far the best folding may be from the optimum.
+    """
+
+    def __init__(self, protein: Protein, data: DataStoring = None, node_limit: int = None, end_time: datetime = None,
+                 beam_width: int = 64):
+        """
+        Initializes the solver.
+
+        Args:
+            protein (Protein): The protein to fold.
+            data (DataStoring): Optional object to store the certificate.
+            node_limit (int): Optional maximum number of search nodes.
+            end_time (datetime): Optional time to stop the search.
+            beam_width (int): Beam width of the quick beam search that gives the first folding to beat.
+        """
+        self.protein = protein
+        self.data = data
+        self.node_limit = node_limit
+        self.end_time = end_time
+        self.beam_width = beam_width
+        self.types = protein.tables.type_list
+        self.remaining_bound = remaining_bounds(self.types)
+        self.weights = contact_weights(self.types)
+        self.unplaced_slots = unplaced_slots(self.types, self.weights)
+        self.parity_bound = parity_bound(protein.sequence)
+
+        self.nodes = 0
+        self.aborted = False
+        self.best_stability = 1  # Every folding has a stability of at most 0
+        self.best_directions = None
+        self.certificate = None
+
+    def execute(self) -> Protein:
+        """
+        Executes the branch and bound search.
+
+        Returns:
+            Protein: The best protein configuration found, optimal when the certificate says it is proven.
+            The unfolded protein when the search stopped before any complete folding.
+        """
+        n = len(self.types)
+        start_time = time.time()
+
+        if n <= 1:
+            self.best_stability = 0
+            self.best_directions = []
+        else:
+            self.find_incumbent()
+            start_key = pack_position((0, 0, 0))
+            occupancy = {start_key: 0}
+            directions = []
+            bonding = [(0, start_key, 0, 0, 0)] if self.types[0] > 0 else []
+            self.search(1, start_key, (0, 0, 0), 0, 0, occupancy, directions, bonding)
+
+        if self.best_directions is None:
+            print("Branch and bound stopped before a complete folding was found.")
+            return Protein(self.protein.sequence)
+
+        proven = not self.aborted
+        lower_bound = self.best_stability if proven else self.parity_bound
+        self.certificate = {
+            "nodes": self.nodes,
+            "stability": self.best_stability,
+            "lower_bound": lower_bound,
+            "bound_gap": self.best_stability - lower_bound,
+            "proven": proven,
+            "elapsed_time": time.time() - start_time,
+        }
+        print(f"Branch and bound: stability {self.best_stability} after {self.nodes} nodes, "
+              f"{'proven optimal' if proven else f'at most {self.best_stability - lower_bound} from the optimum'}.")
+
+        if proven:
+            record_optimum(self.protein.sequence, self.best_stability, save=True)
+
+        if self.data is not None:
+            self.data.branch_and_bound_data(self.certificate)
+
+        return Protein.from_directions(self.protein.sequence, self.best_directions)
+
+    def find_incumbent(self) -> None:
+        """
+        Finds a first folding with a quick beam search, so the search only
+        has to look for strictly better foldings from the start.
+        """
+        beam_search = BeamSearchProteinFolding(self.data, self.protein, self.beam_width)
+        beam = [BeamNode.root()]
+        for step in range(1, len(self.types)):
+            beam = beam_search.select_candidates(beam_search.expand_candidates(beam, step), step, self.beam_width)
+            if not beam:
+                return
+
+        self.best_stability = beam[0].energy
+        self.best_directions = beam[0].directions()
+
+    def search(self, step: int, last_key: int, last_position: tuple, level: int, energy: int,
+               occupancy: dict, directions: list, bonding: list) -> None:
+        """
+        Places the amino acid at `step` in every allowed direction and searches
+        on from every placement that can still improve the best folding.
+
+        Two bounds are used. remaining_bound is fixed per index. The free
+        site bound counts the free sites next to placed H and C amino acids
+        that the remaining chain can still reach, since every new contact
+        needs such a site or an amino acid that is not placed yet.
+
+        Args:
+            step (int): Index of the amino acid to place.
+            last_key (int): Packed position of the previous amino acid.
+            last_position (tuple): Position of the previous amino acid.
+            level (int): 0 while the chain is on the x-axis, 1 while it is in the xy-plane, 2 otherwise.
+            energy (int): Stability of the partial folding.
+            occupancy (dict): Packed position -> index of every placed amino acid.
+            directions (list): Direction codes of the partial folding.
+            bonding (list): Index, packed position and position of every placed H and C amino acid.
+        """
+        self.nodes += 1
+        if self.nodes & 4095 == 0 and self.limit_reached():
+            self.aborted = True
+        if self.aborted or self.best_stability <= self.parity_bound:
+            return  # Out of nodes or time, or the best folding reaches the lower bound
+
+        types = self.types
+        weights = self.weights
+        reach = len(types) - 1 - step  # Largest distance to the end of the chain that is left
+        last = reach == 0
+        bond_energies = BOND_ENERGY_TABLE[types[step]]
+        remaining_bound = self.remaining_bound[step + 1]
+        unplaced_even, unplaced_odd = self.unplaced_slots[step + 1]
+
+        children = []
+        for direction in ALLOWED_DIRECTIONS[level] if step > 1 else [1]:
+            key = last_key + DIRECTION_KEY_STEPS[direction + 3]
+            if key in occupancy:
+                continue
+
+            # Contacts of the new amino acid
+            new_energy = energy
+            occupied = 0
+            for offset in NEIGHBOR_KEY_STEPS:
+                other = occupancy.get(key + offset)
+                if other is not None:
+                    occupied += 1
+                    if other != step - 1 and types[other] > 0:
+                        new_energy += bond_energies[types[other]]
+
+            # Dead end: the amino acid would have no free site for its successor
+            if not last and occupied == 6:
+                continue
+            if new_energy + remaining_bound >= self.best_stability:
+                continue
+
+            bound = 0
+            step_x, step_y, step_z = STEP_VECTORS[direction + 3]
+            position = (last_position[0] + step_x, last_position[1] + step_y, last_position[2] + step_z)
+            if not last:
+                placed_slots = [0, 0]
+                placed_slots[step % 2] += (5 - occupied) * weights[step]  # One free site is for the successor
+                for index, bonding_key, x, y, z in bonding:
+                    for (dx, dy, dz), offset in NEIGHBOR_STEPS:
+                        site = bonding_key + offset
+                        if site != key and site not in occupancy and \
+                                abs(x + dx - position[0]) + abs(y + dy - position[1]) + abs(z + dz - position[2]) <= reach:
+                            placed_slots[index % 2] += weights[index]
+                bound = max(remaining_bound, slot_bound(placed_slots[0], placed_slots[1], unplaced_even, unplaced_odd))
+                if new_energy + bound >= self.best_stability:
+                    continue
+
+            children.append((new_energy, direction, key, position, bound))
+
+        # Most promising placement first, so good foldings are found early
+        children.sort(key=lambda child: child[0])
+
+        for new_energy, direction, key, position, bound in children:
+            if new_energy + bound >= self.best_stability:
+                continue  # The best folding improved while searching a sibling
+
+            directions.append(direction)
+            if last:
+                self.best_stability = new_energy
+                self.best_directions = directions[:]
+            else:
+                new_level = level
+                if level == 0 and direction == 2:
+                    new_level = 1
+                elif level == 1 and direction == 3:
+                    new_level = 2
+
+                occupancy[key] = step
+                if types[step] > 0:
+                    bonding.append((step, key) + position)
+                self.search(step + 1, key, position, new_level, new_energy, occupancy, directions, bonding)
+                if types[step] > 0:
+                    bonding.pop()
+                del occupancy[key]
+            directions.pop()
+
+    def limit_reached(self) -> bool:
+        """
+        Returns:
+            bool: True if the node limit or the end time has been reached.
+        """
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        return self.end_time is not None and datetime.now() >= self.end_time
@@ -0,0 +1,379 @@
+from code.classes.protein import Protein
+from code.classes.data_storing import DataStoring
+from code.classes.energy import get_sequence_tables
+from code.classes.lattice import DIRECTION_KEY_STEPS, LATTICE_SYMMETRIES, direction_permutations, pack_position
+from code.classes.worker_pipes import receive_all, report_failure, send_all, stop_workers
+from datetime import datetime
+
+import math, random
+import multiprocessing as mp
+import numpy as np
+
+# All six direction codes, +-1 (x), +-2 (y) and +-3 (z)
+GENETIC_DIRECTIONS = [1, -1, 2, -2, 3, -3]
+
+# How every lattice symmetry maps the direction codes (+ 3), for pivot mutations
+SYMMETRY_PERMUTATIONS = direction_permutations(LATTICE_SYMMETRIES)
+
+
+class Island:
+    """
+    One population of the genetic algorithm.
+
+    Individuals are direction encodings, one code +-1, +-2 or +-3 per step
+    (as given by DataStoring.get_movement_directions). Every generation keeps
+    the elite unchanged and fills the rest with children: two parents chosen
+    by tournament are combined with segment crossover, a child is mutated with
+    a pivot move (a lattice symmetry applied to the directions after a random
+    step) and self-intersections are repaired. The fitness of all children is
+    calculated with one batched stability call.
+    """
+
+    def __init__(self, sequence: str, population_size: int = 100, elite: int = 2, crossover_rate: float = 0.9,
+                 mutation_rate: float = 0.5, tournament_size: int = 3, start_directions: list[int] = None,
+                 seed: int = None) -> None:
+        """
+        Initializes the island with a random population of self-avoiding walks.
+
+        Args:
+            sequence (str): The protein sequence.
+            population_size (int): Number of individuals.
+            elite (int): Number of best individuals that are kept unchanged.
+            crossover_rate (float): Probability that a child is made by crossover instead of copied.
+            mutation_rate (float): Probability that a child gets a pivot mutation.
+            tournament_size (int): Number of individuals per tournament selection.
+            start_directions (list[int]): Optional folding to put in the first population.
+            seed (int): Optional seed of the random number generator of the island.
+        """
+        self.tables = get_sequence_tables(sequence)
+        self.steps = len(sequence) - 1
+        self.population_size = population_size
+        self.elite = min(elite, population_size)
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = mutation_rate
+        self.tournament_size = tournament_size
+        self.random = random.Random(seed)
+
+        population = [self.repair([self.random.choice(GENETIC_DIRECTIONS) for _ in range(self.steps)])
+                      for _ in range(population_size)]
+        if start_directions is not None:
+            population[0] = self.repair(list(start_directions))
+        self.population = np.array(population, dtype=np.int8).reshape(population_size, self.steps)
+        self.scores = self.evaluate(self.population)
+        self.generation = 0
+
+    def evaluate(self, population: np.ndarray) -> np.ndarray:
+        """
+        Calculates the stability of a whole population in one batched call.
+
+        Args:
+            population (np.array): Direction codes, shape (m, n - 1).
+
+        Returns:
+            np.array: The stability of every individual.
+        """
+        if self.steps == 0:
+            return np.zeros(len(population), dtype=int)
+        scores, _ = self.tables.batch_stability(population)
+        return scores
+
+    def repair(self, codes: list[int]) -> list[int]:
+        """
+        Turns a direction encoding into a self-avoiding walk. Every direction
+        that leads to an occupied site is replaced by a random direction to a
+        free site, preferring sites that are not a dead end. A walk that gets
+        trapped is grown again from scratch.
+
+        Args:
+            codes (list[int]): The direction codes.
+
+        Returns:
+            list[int]: The repaired direction codes.
+        """
+        for _ in range(100):
+            repaired = self.walk(codes)
+            if repaired is not None:
+                return repaired
+            codes = [self.random.choice(GENETIC_DIRECTIONS) for _ in codes]
+        raise RuntimeError("Could not grow a self-avoiding walk.")
+
+    def walk(self, codes: list[int]) -> list[int] | None:
+        """
+        Follows the direction codes and replaces the ones that collide.
+
+        Args:
+            codes (list[int]): The direction codes.
+
+        Returns:
+            list[int] | None: The repaired codes, or None when the walk gets trapped.
+        """
+        key = pack_position((0, 0, 0))
+        occupied = {key}
+        repaired = list(codes)
+        for step, code in enumerate(repaired):
+            new_key = key + DIRECTION_KEY_STEPS[code + 3]
+            if new_key in occupied:
+                free = [direction for direction in GENETIC_DIRECTIONS
+                        if key + DIRECTION_KEY_STEPS[direction + 3] not in occupied]
+                if not free:
+                    return None
+                open_ends = [direction for direction in free if any(
+                    key + DIRECTION_KEY_STEPS[direction + 3] + DIRECTION_KEY_STEPS[other + 3] not in occupied
+                    for other in GENETIC_DIRECTIONS)]
+                code = self.random.choice(open_ends or free)
+                repaired[step] = code
+                new_key = key + DIRECTION_KEY_STEPS[code + 3]
+            occupied.add(new_key)
+            key = new_key
+        return repaired
+
+    def select(self) -> np.ndarray:
+        """
+        Chooses a parent with a tournament: the best of a few random individuals.
+
+        Returns:
+            np.array: The direction codes of the parent.
+        """
+        contestants = [self.random.randrange(self.population_size) for _ in range(self.tournament_size)]
+        return self.population[min(contestants, key=lambda index: self.scores[index])]
+
+    def make_child(self) -> list[int]:
+        """
+        Makes one child with segment crossover and a pivot mutation.
+
+        Returns:
+            list[int]: The direction codes of the child, not repaired yet.
+        """
+        child = self.select().copy()
+        if self.steps > 1 and self.random.random() < self.crossover_rate:
+            donor = self.select()
+            start, end = sorted(self.random.sample(range(self.steps + 1), 2))
+            child[start:end] = donor[start:end]
+
+        if self.steps > 0 and self.random.random() < self.mutation_rate:
+            pivot = self.random.randrange(self.steps)
+            permutation = SYMMETRY_PERMUTATIONS[self.random.randrange(len(SYMMETRY_PERMUTATIONS))]
+            child[pivot:] = permutation[child[pivot:] + 3] - 3
+        return child.tolist()
+
+    def evolve(self, generations: int) -> None:
+        """
+        Runs a number of generations.
+
+        Args:
+            generations (int): Number of generations.
+        """
+        for _ in range(generations):
+            order = np.argsort(self.scores, kind="stable")
+            elite = self.population[order[:self.elite]]
+            children = [self.repair(self.make_child()) for _ in range(self.population_size - self.elite)]
+            children = np.array(children, dtype=np.int8).reshape(len(children), self.steps)
+
+            self.population = np.concatenate([elite, children])
+            self.scores = np.concatenate([self.scores[order[:self.elite]], self.evaluate(children)])
+            self.generation += 1
+
+    def emigrants(self, count: int) -> np.ndarray:
+        """
+        Returns:
+            np.array: Copies of the best individuals of the island.
+        """
+        return self.population[np.argsort(self.scores, kind="stable")[:count]].copy()
+
+    def receive(self, immigrants: np.ndarray) -> None:
+        """
+        Replaces the worst individuals of the island by immigrants.
+
+        Args:
+            immigrants (np.array): Direction codes of the immigrants.
+        """
+        if len(immigrants) == 0:
+            return
+        worst = np.argsort(self.scores, kind="stable")[::-1][:len(immigrants)]
+        self.population[worst] = immigrants
+        self.scores[worst] = self.evaluate(immigrants)
+
+    def best(self) -> tuple[int, list[int]]:
+        """
+        Returns:
+            tuple[int, list[int]]: The stability and the direction codes of the best individual.
+        """
+        index = int(np.argmin(self.scores))
+        return int(self.scores[index]), self.population[index].tolist()
+
+    def run_epoch(self, immigrants: np.ndarray, generations: int, migrants: int) -> tuple:
+        """
+        Takes in the immigrants, evolves and reports back.
+
+        Args:
+            immigrants (np.array): Direction codes of the immigrants, may be empty.
+            generations (int): Number of generations until the next migration.
+            migrants (int): Number of individuals to send to the next island.
+
+        Returns:
+            tuple: The best stability, its direction codes and the emigrants.
+        """
+        self.receive(immigrants)
+        self.evolve(generations)
+        return self.best() + (self.emigrants(migrants),)
+
+
+def run_island(sequence: str, settings: dict, seed_sequence: np.random.SeedSequence, connection) -> None:
+    """
+    Runs one island of the genetic algorithm in a worker process.
+
+    Every message holds the immigrants of the island. The island takes them
+    in, evolves until the next migration and answers with its best individual
+    and its emigrants. A message of None stops the island. An exception is
+    sent back as a WorkerFailure.
+
+    Args:
+        sequence (str): The protein sequence.
+        settings (dict): Keyword arguments of Island and the epoch settings "generations" and "migrants".
+        seed_sequence (np.random.SeedSequence): Seed of the random number generator of this island.
+        connection: The worker end of the pipe to the coordinator.
+    """
+    try:
+        generations = settings.pop("generations")
+        migrants = settings.pop("migrants")
+        island = Island(sequence, seed=int(seed_sequence.generate_state(1)[0]), **settings)
+
+        while True:
+            immigrants = connection.recv()
+            if immigrants is None:
+                break
+            connection.send(island.run_epoch(immigrants, generations, migrants))
+    except Exception:
+        report_failure(connection)
+    finally:
+        connection.close()
+
+
+class GeneticAlgorithm:
+    """
+    Implements a genetic algorithm with an island model for protein folding.
+
+    Every island is a population that evolves on its own (see Island), in a
+    process of its own when there is more than one island. Every
+    migration_interval generations each island sends copies of its best
+    individuals to the next island in a ring, where they replace the worst
+    individuals. Islands so search different regions and still share good
+    building blocks, and all cores work on one sequence.
+    """
+
+    def __init__(self, data: DataStoring, protein: Protein, islands: int = 1, population_size: int = 100,
+                 generations: int = 1000, migration_interval: int = 10, migrants: int = 2, elite: int = 2,
+                 crossover_rate: float = 0.9, mutation_rate: float = 0.5, end_time: datetime = None,
+                 seed=None, optimum: int = None) -> None:
+        """
+        Initializes the genetic algorithm.
+
+        Args:
+            data (DataStoring): Object to store and manage result data.
+            protein (Protein): The protein to fold, its folding is put in the first population.
+            islands (int): Number of islands (and processes).
+            population_size (int): Number of individuals per island.
+            generations (int): Maximum number of generations.
+            migration_interval (int): Number of generations between two migrations.
+            migrants (int): Number of individuals every island sends per migration.
+            elite (int): Number of best individuals per island that are kept unchanged.
+            crossover_rate (float): Probability that a child is made by crossover.
+            mutation_rate (float): Probability that a child gets a pivot mutation.
+            end_time (datetime): Optional time to stop.
+            seed: Optional seed for the random number generators of the islands.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
+        """
+        self.data = data
+        self.protein = protein
+        self.islands = max(1, islands)
+        self.generations = generations
+        self.migration_interval = max(1, migration_interval)
+        self.migrants = min(migrants, population_size)
+        self.end_time = end_time
+        self.seed = seed
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
+        self.settings = {
+            "population_size": population_size,
+            "elite": elite,
+            "crossover_rate": crossover_rate,
+            "mutation_rate": mutation_rate,
+            "start_directions": protein.to_directions(),
+        }
+
+    def execute(self) -> Protein:
+        """
+        Executes the genetic algorithm until the number of generations or the end time is reached.
+
+        Returns:
+            Protein: The best protein configuration found on any island.
+        """
+        sequence = self.protein.sequence
+        if len(sequence) <= 1:
+            return Protein(sequence)
+
+        seed_sequences = np.random.SeedSequence(self.seed).spawn(self.islands)
+        epochs = math.ceil(self.generations / self.migration_interval)
+
+        local_island = None
+        connections = []
+        processes = []
+        if self.islands == 1:
+            local_island = Island(sequence, seed=int(seed_sequences[0].generate_state(1)[0]), **self.settings)
+        else:
+            for seed_sequence in seed_sequences:
+                settings = dict(self.settings, generations=self.migration_interval, migrants=self.migrants)
+                parent_connection, child_connection = mp.Pipe()
+                process = mp.Process(target=run_island, args=(sequence, settings, seed_sequence, child_connection))
+                process.start()
+                child_connection.close()
+                connections.append(parent_connection)
+                processes.append(process)
+
+        best_stability = math.inf
+        best_directions = None
+        epoch_data = []
+        immigrants = [np.zeros((0, len(sequence) - 1), dtype=np.int8)] * self.islands
+
+        try:
+            for epoch in range(1, epochs + 1):
+                if self.end_time is not None and datetime.now() >= self.end_time:
+                    break
+
+                if local_island is not None:
+                    results = [local_island.run_epoch(immigrants[0], self.migration_interval, 0)]
+                else:
+                    send_all(connections, immigrants, "Island")
+                    results = receive_all(connections, "Island")
+
+                for island, (stability, directions, _) in enumerate(results):
+                    epoch_data.append((epoch * self.migration_interval, island + 1, stability))
+                    if stability < best_stability:
+                        best_stability = stability
+                        best_directions = directions
+
+                if best_stability <= self.lower_bound:
+                    print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                    break
+
+                # Every island sends its best individuals to the next island in the ring
+                immigrants = [results[island - 1][2] for island in range(len(results))]
+
+        finally:
+            stop_workers(connections, processes)
+
+        print(f"Genetic algorithm: best stability {best_stability} on {self.islands} island(s).")
+        self.export_results(epoch_data)
+
+        if best_directions is None:
+            return Protein(sequence)
+        return Protein.from_directions(sequence, best_directions)
+
+    def export_results(self, epoch_data: list[tuple[int, int, int]]) -> None:
+        """
+        Exports the best stability of every island after every migration.
+
+        Args:
+            epoch_data (list[tuple[int, int, int]]): Generation, island and best stability.
+        """
+        if self.data is not None:
+            self.data.genetic_algorithm_data(epoch_data)
@@ -1,7 +1,10 @@
 from code.classes.protein import Protein
 from code.classes.data_storing import DataStoring
+from code.classes.lattice import DIRECTION_KEY_STEPS, NEIGHBOR_KEY_STEPS, pack_position
+from code.algorithms.branch_and_bound import ALLOWED_DIRECTIONS
 
-import copy, random
+import random
+import numpy as np
 
 class GreedyFolding:
     """
@@ -14,18 +17,23 @@ class GreedyFolding:
     combination of random and greedy folding approaches.
 
     The process continues until the entire sequence is folded and optimized.
+
+    With a lookahead the algorithm is constructive instead: see execute_lookahead.
     """
 
-    def __init__(self, data: DataStoring, protein: Protein):
+    def __init__(self, data: DataStoring, protein: Protein, lookahead: int = None):
         """
         Initializes the GreedyFolding algorithm.
 
         Args:
             data (DataStoring): Object to handle data storage and export.
             protein (Protein): The protein to be folded and optimized.
+            lookahead (int): Optional number of amino acids to look ahead, which
+                selects the constructive greedy instead of the hybrid algorithm.
         """
         self.data = data
         self.protein = protein
+        self.lookahead = lookahead
 
     def execute(self) -> Protein:
         """
@@ -34,6 +42,11 @@ class GreedyFolding:
         Returns:
             Protein: The optimized protein structure with improved stability.
         """
+        if self.lookahead is not None:
+            best_protein = self.execute_lookahead()
+            self.export_results(best_protein)
+            return best_protein
+
         print("Starting exploratory random folding phase...")
         # Phase 1: Find an initial configuration with stability <= -1
         first_protein = self.find_initial_negative_stability()
@@ -45,6 +58,109 @@ class GreedyFolding:
 
         return best_protein
 
+    def execute_lookahead(self) -> Protein:
+        """
+        Folds the protein constructively, one amino acid at a time.
+
+        For every amino acid all self-avoiding extensions of the next
+        `lookahead` amino acids are enumerated depth-first, scored with the
+        contacts of every newly placed amino acid. Only the first step of the
+        best extension is kept. Sites without a free neighbour are never used
+        for an amino acid that still needs a successor, and the first steps
+        follow the symmetry breaking of BranchAndBound. The result is
+        deterministic, and the cost grows linearly with the length of the
+        sequence (at most 5^lookahead extensions per amino acid).
+
+        When the chain end gets trapped, the last amino acid is taken back and
+        placed with the next best first direction of its extensions.
+
+        Returns:
+            Protein: The folded protein.
+        """
+        n = len(self.protein.sequence)
+        key = pack_position((0, 0, 0))
+        occupancy = {key: 0}
+        directions = []
+        level = 0
+        energy = 0
+
+        # The untried first directions, chain end, level and stability before every placed amino acid
+        placed = []
+        alternatives = None
+        step = 1
+        while step < n:
+            if alternatives is None:
+                depth = min(self.lookahead, n - step)
+                ranked = self.search_extensions(step, key, level, occupancy, depth, ranked=True)
+                alternatives = [direction for _, direction in ranked]
+
+            if not alternatives:
+                # The chain end is trapped, so the last amino acid goes to its next best site
+                alternatives, key, level, energy = placed.pop()
+                del occupancy[key + DIRECTION_KEY_STEPS[directions.pop() + 3]]
+                step -= 1
+                continue
+
+            direction = alternatives.pop(0)
+            placed.append((alternatives, key, level, energy))
+            key += DIRECTION_KEY_STEPS[direction + 3]
+            energy += self.protein.tables.contact_energy(step, key, occupancy)
+            occupancy[key] = step
+            directions.append(direction)
+            level = max(level, abs(direction) - 1)
+            alternatives = None
+            step += 1
+
+        print(f"Greedy folding with a lookahead of {self.lookahead}: stability {energy}")
+        return Protein.from_directions(self.protein.sequence, directions)
+
+    def search_extensions(self, step: int, key: int, level: int, occupancy: dict, depth: int,
+                          ranked: bool = False) -> tuple | list | None:
+        """
+        Finds the best extension of at most `depth` amino acids from the chain end.
+        Extensions that reach the full depth beat shorter ones, then the lowest
+        stability wins, then the most occupied neighbours (the most compact).
+
+        Args:
+            step (int): Index of the amino acid to place.
+            key (int): Packed position of the chain end.
+            level (int): 0 while the chain is on the x-axis, 1 while it is in the xy-plane, 2 otherwise.
+            occupancy (dict): Packed position -> index of every placed amino acid, restored on return.
+            depth (int): Number of amino acids to place.
+            ranked (bool): Return the best extension for every first direction instead, best first.
+
+        Returns:
+            tuple | list | None: The score (-depth reached, stability, -occupied neighbours) and the
+            first direction of the best extension, or None when no amino acid can be placed.
+        """
+        tables = self.protein.tables
+        last = len(self.protein.sequence) - 1
+        extensions = []
+
+        for direction in ALLOWED_DIRECTIONS[level] if step > 1 else [1]:
+            new_key = key + DIRECTION_KEY_STEPS[direction + 3]
+            if new_key in occupancy:
+                continue
+            occupied = sum(new_key + offset in occupancy for offset in NEIGHBOR_KEY_STEPS)
+            if step < last and occupied == 6:
+                continue  # Dead end, the successor would have no free site
+
+            contact = tables.contact_energy(step, new_key, occupancy)
+            score = (-1, contact, -occupied)
+            if depth > 1:
+                occupancy[new_key] = step
+                deeper = self.search_extensions(step + 1, new_key, max(level, abs(direction) - 1), occupancy, depth - 1)
+                del occupancy[new_key]
+                if deeper is not None:
+                    score = (deeper[0][0] - 1, deeper[0][1] + contact, deeper[0][2] - occupied)
+
+            extensions.append((score, direction))
+
+        # Sorting is stable, so equal scores keep the order of ALLOWED_DIRECTIONS
+        if ranked:
+            return sorted(extensions, key=lambda extension: extension[0])
+        return min(extensions, key=lambda extension: extension[0], default=None)
+
     def find_initial_negative_stability(self) -> Protein:
         """
         Finds an initial protein configuration with a stability score <= -1.
@@ -58,12 +174,14 @@ class GreedyFolding:
         Raises:
             ValueError: If no configuration with stability <= -1 is found.
         """
+        start_stability = self.protein.calculate_stability()
+        start_snapshot = self.protein.snapshot()
+        temp_protein = self.protein.copy()
         for n in range(4, len(self.protein.amino_acids) + 1):
             print(f"Trying random folding with the first {n} amino acids...")
             for attempt in range(100):  # Try up to 100 configurations per size
-                temp_protein = copy.deepcopy(self.protein)
-                self.apply_random_folding(temp_protein, n)
-                stability = temp_protein.calculate_stability()
+                temp_protein.restore(start_snapshot)
+                stability = start_stability + self.apply_random_folding(temp_protein, n)
 
                 print(f"Attempt {attempt + 1}, Stability: {stability}, Amino acids: {n}")
 
@@ -73,23 +191,28 @@ class GreedyFolding:
 
         raise ValueError("Unable to find an initial configuration with stability <= -1.")
 
-    def apply_random_folding(self, protein: Protein, limit: int):
+    def apply_random_folding(self, protein: Protein, limit: int) -> int:
         """
         Applies random folding to the first `limit` amino acids.
 
         Args:
             protein (Protein): The protein structure to modify.
             limit (int): The number of amino acids to fold randomly.
+
+        Returns:
+            int: The total change in stability of the applied rotations.
         """
         directions = list(protein.get_rotation_matrices().keys())
+        stability_change = 0
         for i in range(min(limit, len(protein.amino_acids))):
             pivot_index = i
             direction = random.choice(directions)
             rotation_matrix = protein.get_rotation_matrices()[direction]
             # Check if the rotation is valid before applying it
             if protein.is_rotation_valid(pivot_index, rotation_matrix):
-                for j in range(i + 1, len(protein.amino_acids)):
-                    protein.rotate_amino_acid(j, i, rotation_matrix)
+                stability_change += protein.stability_delta(pivot_index, rotation_matrix)
+                protein.rotate_protein(pivot_index, rotation_matrix)
+        return stability_change
 
     def iterative_random_and_greedy_folding(self, protein: Protein) -> Protein:
         """
@@ -101,7 +224,7 @@ class GreedyFolding:
         Returns:
             Protein: The refined protein structure.
         """
-        current_protein = copy.deepcopy(protein)
+        current_protein = protein.copy()
         best_score = current_protein.calculate_stability()
 
         # Incrementally refine the structure
@@ -141,21 +264,27 @@ class GreedyFolding:
             print(f"Skipping: pivot index {n - 1} out of range.")
             return False
 
-        for direction in directions:
-            temp_protein = copy.deepcopy(protein)
+        pivot_index = n - 1
+        rotation_matrices = protein.get_rotation_matrices()
+        valid_directions = [
+            direction for direction in directions
+            if protein.is_rotation_valid(pivot_index, rotation_matrices[direction])
+        ]
+        if not valid_directions:
+            return False
 
-            pivot_index = n - 1
-            rotation_matrix = temp_protein.get_rotation_matrices()[direction]
-            if temp_protein.is_rotation_valid(pivot_index, rotation_matrix):
-                for j in range(pivot_index + 1, len(temp_protein.amino_acids)):
-                    temp_protein.rotate_amino_acid(j, pivot_index, rotation_matrix)
+        # Score all valid rotations in one batch without applying them
+        conformations = np.repeat(protein.positions[None, :, :].astype(np.int64), len(valid_directions), axis=0)
+        for row, direction in enumerate(valid_directions):
+            conformations[row, pivot_index + 1:] = protein.rotated_tail(pivot_index, rotation_matrices[direction])
+        stabilities, _ = protein.batch_stability(conformations)
 
-                stability = temp_protein.calculate_stability()
-                print(f"Testing one amino acid, Direction: {direction}, Stability: {stability}")
+        for direction, stability in zip(valid_directions, stabilities.tolist()):
+            print(f"Testing one amino acid, Direction: {direction}, Stability: {stability}")
 
-                if stability < current_best_score:
-                    protein.amino_acids = temp_protein.amino_acids
-                    return True
+            if stability < current_best_score:
+                protein.rotate_protein(pivot_index, rotation_matrices[direction])
+                return True
 
         return False
 
@@ -176,23 +305,31 @@ class GreedyFolding:
             print(f"Skipping: pivot index {n} out of range.")
             return False
 
+        attempts = []
         for attempt in range(100):  # Test up to 100 configurations
-            temp_protein = copy.deepcopy(protein)
-
-            for i in range(max(0, n - 2), min(n + 2, len(temp_protein.amino_acids))):
+            applied_moves = 0
+            for i in range(max(0, n - 2), min(n + 2, len(protein.amino_acids))):
                 pivot_index = i
                 direction = random.choice(directions)
-                rotation_matrix = temp_protein.get_rotation_matrices()[direction]
+                rotation_matrix = protein.get_rotation_matrices()[direction]
+
+                if protein.is_rotation_valid(pivot_index, rotation_matrix):
+                    protein.apply_move(pivot_index, rotation_matrix)
+                    applied_moves += 1
+
+            # Save the attempt and revert its moves
+            attempts.append(protein.snapshot())
+            for _ in range(applied_moves):
+                protein.undo_move()
 
-                if temp_protein.is_rotation_valid(pivot_index, rotation_matrix):
-                    for j in range(pivot_index + 1, len(temp_protein.amino_acids)):
-                        temp_protein.rotate_amino_acid(j, pivot_index, rotation_matrix)
+        # Score all attempts in one batch
+        stabilities, _ = protein.batch_stability(np.array(attempts))
 
-            stability = temp_protein.calculate_stability()
+        for attempt, (positions, stability) in enumerate(zip(attempts, stabilities.tolist())):
             print(f"Random folding attempt {attempt + 1}, Stability: {stability}")
 
             if stability < current_best_score:
-                protein.amino_acids = temp_protein.amino_acids
+                protein.restore(positions)
                 return True
 
         return False
@@ -1,8 +1,13 @@
 from code.classes.protein import Protein
 from code.classes.data_storing import DataStoring
 from code.algorithms.random_algorithm import RandomFolding
+from code.classes.moves import MoveSet
+
+import numpy as np
+
+# The ways a HillClimber can choose its next move
+HILLCLIMBER_MODES = ("random", "steepest", "first")
 
-import copy, random
 
 class HillClimber:
     """
@@ -13,9 +18,20 @@ class HillClimber:
     configurations that lead to a better (lower) stability score, ensuring 
     incremental optimization. The process terminates after a fixed number of 
     iterations or if no further improvements are found.
+
+    There are three modes:
+    - random: every iteration tries one random pivot move.
+    - steepest: every iteration scores all (n - 1) x 6 pivot moves in one
+      batch and applies the best one.
+    - first: every iteration scores the pivot moves in a random order, in
+      batches of chunk_size, and applies the first one that improves.
+    The last two modes know when no pivot move improves the folding (a local
+    optimum) and then stop, or restart from a new random folding.
     """
 
-    def __init__(self,  protein: Protein, max_iterations:int, data: DataStoring = None, start: int = None):
+    def __init__(self,  protein: Protein, max_iterations:int, data: DataStoring = None, start: int = None,
+                 mode: str = "random", restart: bool = False, chunk_size: int = 48, move_set: str = "rotations",
+                 optimum: int = None):
         
         """
         Initializes the HillClimber class.
@@ -23,11 +39,31 @@ class HillClimber:
         Args:
             protein (Protein): The initial protein configuration to optimize.
             max_iterations (int): The maximum number of iterations to perform.
+            data (DataStoring): Optional object to store the iteration data.
+            start (int): When given, the protein itself is the start instead of a random folding.
+            mode (str): "random", "steepest" or "first" (first improvement).
+            restart (bool): Restart from a random folding at a local optimum instead of stopping
+                (steepest and first only).
+            chunk_size (int): Number of moves scored per batch in the first improvement mode.
+            move_set (str): The moves to use, see MoveSet. The steepest and first
+                modes scan pivot moves only, so they take "rotations" or "symmetries".
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
         """
+        if mode not in HILLCLIMBER_MODES:
+            raise ValueError(f"Unknown hillclimber mode '{mode}', choose from {HILLCLIMBER_MODES}.")
+        self.move_set = MoveSet(move_set)
+        if mode != "random" and self.move_set.local:
+            raise ValueError(f"The {mode} mode scans pivot moves only, use the rotations or symmetries move set.")
+
         self.data = data
         self.protein = protein
         self.max_iterations = max_iterations
         self.start = start
+        self.mode = mode
+        self.restart = restart
+        self.chunk_size = chunk_size
+        self.local_optima = []  # Stability of every local optimum that was reached
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
 
 
     def execute(self) -> Protein:
@@ -39,12 +75,15 @@ class HillClimber:
         """
        # random folding starting hillclimber
         if self.start is None:
-            random_folding= RandomFolding(self.protein)
+            random_folding= RandomFolding(self.protein, move_set=self.move_set.name)
             self.protein = random_folding.execute(iterations=1000)
 
-        # Deep copy the initial protein to avoid modifying the original
-        current_protein = copy.deepcopy(self.protein)
-        best_protein = copy.deepcopy(current_protein)
+        if self.mode != "random":
+            return self.execute_neighbourhood()
+
+        # Copy the initial protein to avoid modifying the original
+        current_protein = self.protein.copy()
+        best_snapshot = current_protein.snapshot()
         current_stability = current_protein.calculate_stability()
         best_stability = current_stability
         iteration_count=1
@@ -54,46 +93,155 @@ class HillClimber:
         for iteration in range(self.max_iterations):
             print(f"HillClimber Iteration: {iteration + 1}, Current Stability: {current_stability}, Best Stability: {best_stability}")
 
-            # Generate a list of valid pivot points for rotations
-            possible_folds = list(range(len(current_protein.amino_acids) - 1))
-            if not possible_folds:
-                # No valid moves available, terminate early
+            if len(current_protein.positions) < 2:
+                # No moves available, terminate early
                 break
 
-            # Select a random pivot point and rotation direction
-            pivot = random.choice(possible_folds)
-            rotation_matrix = random.choice(list(current_protein.get_rotation_matrices().values()))
-            new_protein = copy.deepcopy(current_protein)
-
-            # Apply the rotation if it's valid
-            if new_protein.is_rotation_valid(pivot, rotation_matrix):
-                for amino_index in range(pivot + 1, len(new_protein.amino_acids)):
-                    new_protein.rotate_amino_acid(amino_index, pivot, rotation_matrix)
+            # Select a random move, None if it is not valid
+            move = self.move_set.random_move(current_protein)
 
-                # Calculate the stability of the new configuration
-                new_stability = new_protein.calculate_stability()
+            # Evaluate the move if it's valid
+            if move is not None:
+                # Calculate the stability of the new configuration from the change of the move
+                new_stability = current_stability + self.move_set.stability_delta(current_protein, move)
 
                 # Accept the new configuration if stability improves
                 if new_stability < current_stability:
-                    current_protein = copy.deepcopy(new_protein)
+                    self.move_set.apply(current_protein, move)
                     current_stability = new_stability
                     hillclimber.append((iteration_count,current_stability))
 
                     # Update the best configuration found so far
                     if current_stability < best_stability:
-                        best_protein = copy.deepcopy(new_protein)
+                        best_snapshot = current_protein.snapshot()
                         best_stability = current_stability
             hillclimber.append((iteration_count,current_stability))
             iteration_count+=1
 
+            if best_stability <= self.lower_bound:
+                print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                break
+
         print("HillClimber Optimization complete.")
         print(f"Best Stability: {best_stability}")
 
         if not self.data is None:
             self.export_data_hil(hillclimber)
-        return best_protein
+
+        # Return the protein in the best configuration found
+        current_protein.restore(best_snapshot)
+        return current_protein
         
 
+    def execute_neighbourhood(self) -> Protein:
+        """
+        Executes the steepest descent or first improvement mode, which scan
+        the whole pivot neighbourhood of the current folding.
+
+        Returns:
+            Protein: The best protein configuration found during the search.
+        """
+        current_protein = self.protein.copy()
+        rotation_matrices = np.array(self.move_set.pivot_matrices)
+        n = len(current_protein.sequence)
+        pivots = np.repeat(np.arange(n - 1), len(rotation_matrices))
+        rotations = np.tile(np.arange(len(rotation_matrices)), n - 1)
+
+        current_stability = current_protein.calculate_stability()
+        best_protein = current_protein.copy()
+        best_stability = current_stability
+        hillclimber = []
+
+        for iteration in range(self.max_iterations):
+            print(f"HillClimber Iteration: {iteration + 1}, Current Stability: {current_stability}, Best Stability: {best_stability}")
+
+            if self.mode == "steepest":
+                move = self.find_steepest_move(current_protein, current_stability, pivots, rotations, rotation_matrices)
+            else:
+                move = self.find_first_move(current_protein, current_stability, pivots, rotations, rotation_matrices)
+
+            if move is None:
+                # No pivot move improves the folding
+                self.local_optima.append(current_stability)
+                print(f"Local optimum reached with stability {current_stability}")
+                if not self.restart:
+                    break
+                random_folding = RandomFolding(Protein(current_protein.sequence), move_set=self.move_set.name)
+                current_protein = random_folding.execute(iterations=1000)
+                current_stability = current_protein.calculate_stability()
+            else:
+                pivot, rotation_index, delta_e = move
+                current_protein.rotate_protein(pivot, rotation_matrices[rotation_index])
+                current_stability += delta_e
+
+            if current_stability < best_stability:
+                best_protein = current_protein.copy()
+                best_stability = current_stability
+            hillclimber.append((iteration + 1, current_stability))
+
+            if best_stability <= self.lower_bound:
+                print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                break
+
+        print("HillClimber Optimization complete.")
+        print(f"Best Stability: {best_stability}")
+
+        if not self.data is None:
+            self.export_data_hil(hillclimber)
+
+        return best_protein
+
+    def find_steepest_move(self, protein: Protein, stability: int, pivots: np.ndarray, rotations: np.ndarray,
+                           rotation_matrices: np.ndarray) -> tuple[int, int, int] | None:
+        """
+        Scores all pivot moves in one batch and finds the one that improves the stability most.
+
+        Args:
+            protein (Protein): The current folding.
+            stability (int): Stability of the current folding.
+            pivots (np.array): The pivot of every move.
+            rotations (np.array): The index of the rotation matrix of every move.
+            rotation_matrices (np.array): The rotation matrices.
+
+        Returns:
+            tuple[int, int, int] | None: Pivot, rotation index and change in stability
+            of the best move, or None at a local optimum.
+        """
+        scores, valid = protein.batch_stability(protein.pivot_foldings(pivots, rotation_matrices[rotations]))
+        deltas = np.where(valid, scores - stability, 0)
+        move = int(np.argmin(deltas))
+        if deltas[move] >= 0:
+            return None
+        return int(pivots[move]), int(rotations[move]), int(deltas[move])
+
+    def find_first_move(self, protein: Protein, stability: int, pivots: np.ndarray, rotations: np.ndarray,
+                        rotation_matrices: np.ndarray) -> tuple[int, int, int] | None:
+        """
+        Scores the pivot moves in a random order, one batch at a time, and
+        finds the first one that improves the stability.
+
+        Args:
+            protein (Protein): The current folding.
+            stability (int): Stability of the current folding.
+            pivots (np.array): The pivot of every move.
+            rotations (np.array): The index of the rotation matrix of every move.
+            rotation_matrices (np.array): The rotation matrices.
+
+        Returns:
+            tuple[int, int, int] | None: Pivot, rotation index and change in stability
+            of the first improving move, or None at a local optimum.
+        """
+        order = np.random.permutation(len(pivots))
+        for start in range(0, len(order), self.chunk_size):
+            moves = order[start:start + self.chunk_size]
+            foldings = protein.pivot_foldings(pivots[moves], rotation_matrices[rotations[moves]])
+            scores, valid = protein.batch_stability(foldings)
+            improving = np.flatnonzero(valid & (scores < stability))
+            if len(improving):
+                move = moves[improving[0]]
+                return int(pivots[move]), int(rotations[move]), int(scores[improving[0]] - stability)
+        return None
+
     def export_data_hil(self, hillclimber):
     
         self.data.hillclimber_data(hillclimber)
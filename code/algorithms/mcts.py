@@ -0,0 +1,364 @@
+from code.classes.protein import Protein
+from code.classes.data_storing import DataStoring
+from code.classes.energy import get_sequence_tables
+from code.classes.lattice import (
+    DIRECTION_KEY_STEPS, NEIGHBOR_KEY_STEPS, coordinates_from_directions, decode_directions, pack_coordinates
+)
+from code.algorithms.branch_and_bound import ALLOWED_DIRECTIONS
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import math, random
+
+# All six direction codes, +-1 (x), +-2 (y) and +-3 (z)
+ROLLOUT_DIRECTIONS = [1, -1, 2, -2, 3, -3]
+
+
+def path_occupancy(prefix: bytes) -> tuple[int, dict]:
+    """
+    Places the amino acids of an encoded partial folding.
+
+    Args:
+        prefix (bytes): The direction codes, encoded as by encode_directions.
+
+    Returns:
+        tuple[int, dict]: Packed position of the last amino acid and packed position -> index of every amino acid.
+    """
+    keys = pack_coordinates(coordinates_from_directions(decode_directions(prefix))).tolist()
+    return keys[-1], dict(zip(keys, range(len(keys))))
+
+
+def rollout(tables, n: int, prefix: bytes, energy: int, temperature: float, rng: random.Random,
+            attempts: int = 10) -> tuple[int, bytes] | None:
+    """
+    Completes a partial folding with a random self-avoiding walk. Every free
+    site is chosen with a probability that grows with the contacts it makes,
+    and the stability is counted along with every placed amino acid.
+
+    Args:
+        tables (SequenceTables): The tables of the sequence.
+        n (int): Length of the sequence.
+        prefix (bytes): The encoded directions of the partial folding.
+        energy (int): Stability of the partial folding.
+        temperature (float): Temperature of the contact weights, higher is more random.
+        rng (random.Random): The random number generator.
+        attempts (int): Number of walks to try before the prefix is given up as trapped.
+
+    Returns:
+        tuple[int, bytes] | None: Stability and encoded directions of the complete folding, or None when every walk got trapped.
+    """
+    start_key, start_occupancy = path_occupancy(prefix)
+    beta = 1 / temperature
+
+    for _ in range(attempts):
+        key = start_key
+        occupancy = dict(start_occupancy)
+        directions = bytearray(prefix)
+        total = energy
+
+        for step in range(len(prefix) + 1, n):
+            candidates = []
+            for direction in ROLLOUT_DIRECTIONS:
+                new_key = key + DIRECTION_KEY_STEPS[direction + 3]
+                if new_key not in occupancy:
+                    candidates.append((tables.contact_energy(step, new_key, occupancy), direction, new_key))
+            if not candidates:
+                break
+
+            weights = [math.exp(-beta * contact) for contact, _, _ in candidates]
+            contact, direction, key = rng.choices(candidates, weights)[0]
+            occupancy[key] = step
+            directions.append(direction + 3)  # Same encoding as encode_directions
+            total += contact
+        else:
+            return total, bytes(directions)
+    return None
+
+
+def run_rollouts(sequence: str, leaves: list[tuple[bytes, int]], temperature: float, seed: int) -> list:
+    """
+    Runs one rollout from every leaf in a worker process.
+
+    Args:
+        sequence (str): The protein sequence.
+        leaves (list[tuple[bytes, int]]): Encoded directions and stability of every leaf.
+        temperature (float): Temperature of the contact weights of the rollouts.
+        seed (int): Seed of the random number generator of this batch.
+
+    Returns:
+        list: The result of rollout for every leaf.
+    """
+    tables = get_sequence_tables(sequence)
+    rng = random.Random(seed)
+    return [rollout(tables, len(sequence), prefix, energy, temperature, rng) for prefix, energy in leaves]
+
+
+class MCTSNode:
+    """
+    A partial folding in the search tree of MCTS.
+
+    The directions of a node are canonical: the first step goes along +x,
+    the first step off the x-axis along +y and the first step out of the
+    xy-plane along +z, as in BranchAndBound. Partial foldings that are equal
+    up to a lattice symmetry so have the same prefix, and the prefix is the
+    key of the node in the transposition table.
+    """
+
+    __slots__ = ("prefix", "level", "energy", "moves", "visits", "total", "dead")
+
+    def __init__(self, prefix: bytes, level: int, energy: int) -> None:
+        """
+        Initializes the node.
+
+        Args:
+            prefix (bytes): The encoded canonical directions.
+            level (int): 0 while the chain is on the x-axis, 1 while it is in the xy-plane, 2 otherwise.
+            energy (int): Stability of the partial folding.
+        """
+        self.prefix = prefix
+        self.level = level
+        self.energy = energy
+        self.moves = None  # (prefix, level, energy) of every child, once expanded
+        self.visits = 0
+        self.total = 0.0  # Summed reward of all rollouts through this node
+        self.dead = False  # No completion of the prefix was found
+
+
+class MCTS:
+    """
+    Implements Monte Carlo Tree Search (UCT) with chain growth for protein folding.
+
+    The tree grows the chain one amino acid at a time, like the beam search.
+    Every iteration walks down the tree with the UCT rule, adds one new node
+    and completes it with a cheap random rollout. The stability of the rollout
+    is propagated back up as a reward. Unlike a beam, the search keeps coming
+    back to prefixes that look bad now but lead to good foldings later.
+
+    Rollouts run in batches, split over a pool of worker processes. A node
+    that is chosen for a rollout gets a virtual loss until its result is in,
+    so the other walks of the batch spread over the tree.
+
+    Every node is stored in a transposition table keyed by its canonical
+    prefix, and the children of a node are looked up there, so a partial
+    folding is expanded once no matter how often it is reached.
+    """
+
+    def __init__(self, data: DataStoring, protein: Protein, iterations: int = 10000, workers: int = 1,
+                 batch_size: int = 32, exploration: float = 0.2, virtual_loss: int = 1, temperature: float = 0.5,
+                 end_time: datetime = None, seed=None, optimum: int = None) -> None:
+        """
+        Initializes the tree search.
+
+        Args:
+            data (DataStoring): Object for managing data storage.
+            protein (Protein): The protein to fold.
+            iterations (int): Maximum number of rollouts.
+            workers (int): Number of processes that run the rollouts.
+            batch_size (int): Number of rollouts per worker per batch.
+            exploration (float): Exploration constant of the UCT rule.
+            virtual_loss (int): Number of lost visits a node gets while its rollout is running.
+            temperature (float): Temperature of the contact weights of the rollouts.
+            end_time (datetime): Optional time to stop.
+            seed: Optional seed of the random number generator.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
+        """
+        self.data = data
+        self.protein = protein
+        self.iterations = iterations
+        self.workers = workers
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.virtual_loss = virtual_loss
+        self.temperature = temperature
+        self.end_time = end_time
+        self.random = random.Random(seed)
+
+        self.table = {}  # Canonical prefix -> MCTSNode
+        self.best_stability = 0
+        self.best_directions = None
+        self.rollouts = 0
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
+
+    def execute(self) -> Protein:
+        """
+        Executes the tree search until the number of rollouts or the end time is reached.
+
+        Returns:
+            Protein: The best protein configuration found.
+        """
+        sequence = self.protein.sequence
+        n = len(sequence)
+        if n <= 2:
+            return Protein(sequence)
+
+        tables = self.protein.tables
+        root = MCTSNode(b"", 0, 0)
+        self.table[root.prefix] = root
+        iteration_data = []
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            while self.rollouts < self.iterations and not root.dead:
+                if self.end_time is not None and datetime.now() >= self.end_time:
+                    break
+                if self.best_stability <= self.lower_bound:
+                    print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                    break
+
+                batch = min(self.batch_size * self.workers, self.iterations - self.rollouts)
+                paths = [path for path in (self.select(root, n) for _ in range(batch)) if path is not None]
+                if not paths:
+                    continue
+
+                leaves = [(path[-1].prefix, path[-1].energy) for path in paths]
+                if executor is None:
+                    results = [rollout(tables, n, prefix, energy, self.temperature, self.random)
+                               for prefix, energy in leaves]
+                else:
+                    shard_size = -(-len(leaves) // self.workers)
+                    shards = [leaves[start:start + shard_size] for start in range(0, len(leaves), shard_size)]
+                    seeds = [self.random.getrandbits(64) for _ in shards]
+                    results = [result for shard in executor.map(
+                        run_rollouts, [sequence] * len(shards), shards, [self.temperature] * len(shards), seeds)
+                        for result in shard]
+
+                for path, result in zip(paths, results):
+                    self.backpropagate(path, result)
+                    if result is not None and result[0] < self.best_stability:
+                        self.best_stability, self.best_directions = result
+                        iteration_data.append((self.rollouts, self.best_stability))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        print(f"MCTS: {self.rollouts} rollouts, {len(self.table)} nodes, best stability {self.best_stability}")
+        self.export_results(iteration_data)
+
+        if self.best_directions is None:
+            return Protein(sequence)
+        return Protein.from_bytes(sequence, self.best_directions)
+
+    def select(self, root: MCTSNode, n: int) -> list[MCTSNode] | None:
+        """
+        Walks down the tree with the UCT rule until a node that has not been
+        visited, adds a virtual loss to every node on the way and returns the path.
+
+        Args:
+            root (MCTSNode): The root of the tree.
+            n (int): Length of the sequence.
+
+        Returns:
+            list[MCTSNode] | None: The nodes from the root to the leaf, or None when the walk ended in a dead end.
+        """
+        path = [root]
+        node = root
+        while node.visits > 0 and len(node.prefix) < n - 1:
+            children = [child for child in self.expand(node, n) if not child.dead]
+            if not children:
+                node.dead = True
+                self.mark_dead(path)
+                return None
+
+            unvisited = [child for child in children if child.visits == 0]
+            if unvisited:
+                node = self.random.choice(unvisited)
+            else:
+                node = max(children, key=lambda child: self.uct_value(child, path[-1].visits))
+            path.append(node)
+
+        for visited in path:
+            visited.visits += self.virtual_loss
+        return path
+
+    def expand(self, node: MCTSNode, n: int) -> list[MCTSNode]:
+        """
+        Looks up the children of a node in the transposition table, and
+        scores and adds them the first time the node is expanded. Sites
+        without a free neighbour are skipped, except for the last amino acid.
+
+        Args:
+            node (MCTSNode): The node to expand.
+            n (int): Length of the sequence.
+
+        Returns:
+            list[MCTSNode]: The children of the node.
+        """
+        if node.moves is None:
+            tables = self.protein.tables
+            step = len(node.prefix) + 1
+            last_key, occupancy = path_occupancy(node.prefix)
+            node.moves = []
+            for direction in ALLOWED_DIRECTIONS[node.level] if step > 1 else [1]:
+                key = last_key + DIRECTION_KEY_STEPS[direction + 3]
+                if key in occupancy:
+                    continue
+                if step < n - 1 and all(key + offset in occupancy for offset in NEIGHBOR_KEY_STEPS):
+                    continue
+                energy = node.energy + tables.contact_energy(step, key, occupancy)
+                node.moves.append((node.prefix + bytes((direction + 3,)), max(node.level, abs(direction) - 1), energy))
+
+        children = []
+        for prefix, level, energy in node.moves:
+            child = self.table.get(prefix)
+            if child is None:
+                child = self.table[prefix] = MCTSNode(prefix, level, energy)
+            children.append(child)
+        return children
+
+    def uct_value(self, node: MCTSNode, parent_visits: int) -> float:
+        """
+        Calculates the UCT value of a node: its mean reward plus an
+        exploration term that shrinks as the node is visited more often.
+        Rewards are scaled by the best stability so far, so they stay between 0 and 1.
+
+        Args:
+            node (MCTSNode): The child node.
+            parent_visits (int): Number of visits of the parent.
+
+        Returns:
+            float: The UCT value.
+        """
+        scale = max(1, -self.best_stability)
+        return node.total / (node.visits * scale) + self.exploration * math.sqrt(math.log(parent_visits) / node.visits)
+
+    def backpropagate(self, path: list[MCTSNode], result: tuple[int, bytes] | None) -> None:
+        """
+        Replaces the virtual loss on the path by the reward of the rollout.
+
+        Args:
+            path (list[MCTSNode]): The nodes from the root to the leaf.
+            result (tuple[int, bytes] | None): Stability and directions of the rollout, None when it got trapped.
+        """
+        self.rollouts += 1
+        reward = -result[0] if result is not None else 0
+        for node in path:
+            node.visits += 1 - self.virtual_loss
+            node.total += reward
+
+        if result is None and len(path[-1].prefix) > 0:
+            path[-1].dead = True
+            self.mark_dead(path[:-1])
+
+    def mark_dead(self, path: list[MCTSNode]) -> None:
+        """
+        Marks the nodes on a path as dead from the leaf upwards, as long as
+        all their children are dead.
+
+        Args:
+            path (list[MCTSNode]): The nodes from the root to the leaf.
+        """
+        for node in reversed(path):
+            if node.moves is None or any(prefix not in self.table or not self.table[prefix].dead
+                                         for prefix, _, _ in node.moves):
+                break
+            node.dead = True
+
+    def export_results(self, iteration_data: list[tuple[int, int]]) -> None:
+        """
+        Exports the number of rollouts and the best stability at every improvement.
+
+        Args:
+            iteration_data (list[tuple[int, int]]): Number of rollouts and the best stability.
+        """
+        if self.data is not None:
+            self.data.hillclimber_data(iteration_data)
@@ -0,0 +1,214 @@
+from code.classes.protein import Protein
+from code.classes.data_storing import DataStoring
+from code.classes.lattice import DIRECTION_KEY_STEPS, NEIGHBOR_KEY_STEPS, pack_position
+from datetime import datetime
+
+import math, random
+
+# All six direction codes, +-1 (x), +-2 (y) and +-3 (z)
+PERM_DIRECTIONS = [1, -1, 2, -2, 3, -3]
+
+
+class PERM:
+    """
+    Implements the pruned-enriched Rosenbluth method (nPERMis) for protein folding.
+
+    Chains are grown one amino acid at a time, depth-first. Every free site
+    for the next amino acid is chosen with a probability that grows with its
+    Boltzmann factor and its number of free neighbours (importance sampling).
+    Every chain carries a Rosenbluth weight. Chains with a high weight
+    compared to the average weight at their length are cloned into several
+    distinct continuations, and chains with a low weight are pruned half of
+    the time, with the weight of the survivors doubled.
+
+    A tour grows all chains that descend from one start. Weights are kept as
+    logarithms, because the Boltzmann factors of long chains overflow.
+    """
+
+    def __init__(self, data: DataStoring, protein: Protein, temperature: float = 0.3, tours: int = 1000,
+                 end_time: datetime = None, clone_factor: float = 3.0, optimum: int = None):
+        """
+        Initializes the PERM algorithm.
+
+        Args:
+            data (DataStoring): Object for managing data storage.
+            protein (Protein): The protein to fold.
+            temperature (float): Temperature of the Boltzmann factors, lower favours more contacts.
+            tours (int): Maximum number of tours.
+            end_time (datetime): Optional time to stop, also in the middle of a tour.
+            clone_factor (float): Weight, relative to the average weight, above which a chain is cloned.
+                A chain is pruned below a fifth of this weight.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
+        """
+        self.data = data
+        self.protein = protein
+        self.beta = 1 / temperature
+        self.tours = tours
+        self.end_time = end_time
+        self.log_clone_factor = math.log(clone_factor)
+
+        n = len(protein.sequence)
+        self.log_weight_sums = [-math.inf] * n  # Log of the summed weights of all chains per length
+        self.counts = [0] * n  # Number of chains per length
+        self.nodes = 0
+        self.stopped = False
+        self.best_stability = math.inf
+        self.best_directions = None
+        self.tour_best = math.inf
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
+
+    def execute(self) -> Protein:
+        """
+        Executes PERM tours until the number of tours or the end time is reached.
+
+        Returns:
+            Protein: The best protein configuration found.
+        """
+        n = len(self.protein.sequence)
+        if n <= 1:
+            return Protein(self.protein.sequence)
+
+        tour_data = []
+        start_key = pack_position((0, 0, 0))
+
+        for tour in range(self.tours):
+            if self.stopped or (self.end_time is not None and datetime.now() >= self.end_time):
+                break
+
+            self.tour_best = math.inf
+            self.grow(1, start_key, 0.0, 0, {start_key: 0}, [])
+
+            if self.tour_best < math.inf:
+                tour_data.append((tour + 1, self.tour_best))
+
+        self.export_results(tour_data)
+
+        if self.best_directions is None:
+            return Protein(self.protein.sequence)
+        return Protein.from_directions(self.protein.sequence, self.best_directions)
+
+    def grow(self, step: int, last_key: int, log_weight: float, energy: int, occupancy: dict, directions: list) -> None:
+        """
+        Places the amino acid at `step` and grows the chain on, cloning or
+        pruning it depending on its weight.
+
+        Args:
+            step (int): Index of the amino acid to place.
+            last_key (int): Packed position of the previous amino acid.
+            log_weight (float): Log of the Rosenbluth weight of the chain.
+            energy (int): Stability of the chain.
+            occupancy (dict): Packed position -> index of every placed amino acid.
+            directions (list): Direction codes of the chain.
+        """
+        self.nodes += 1
+        if self.nodes & 4095 == 0 and self.end_time is not None and datetime.now() >= self.end_time:
+            self.stopped = True
+        if self.stopped:
+            return
+
+        tables = self.protein.tables
+        last = step == len(self.protein.sequence) - 1
+
+        # Every free site with its contact gain and importance
+        candidates = []
+        for direction in PERM_DIRECTIONS:
+            key = last_key + DIRECTION_KEY_STEPS[direction + 3]
+            if key in occupancy:
+                continue
+
+            gain = tables.contact_energy(step, key, occupancy)
+            if last:
+                candidates.append((0.0, direction, key, gain, 0))
+                continue
+
+            free = sum(1 for offset in NEIGHBOR_KEY_STEPS if key + offset not in occupancy)
+            if free == 0:
+                continue  # The chain would be trapped
+            candidates.append((math.exp(-self.beta * gain) * (free + 0.5), direction, key, gain, free))
+
+        if not candidates:
+            return
+
+        # A complete chain: keep the best last placement
+        if last:
+            gain, direction = min((candidate[3], candidate[1]) for candidate in candidates)
+            if energy + gain < self.tour_best:
+                self.tour_best = energy + gain
+            if energy + gain < self.best_stability:
+                self.best_stability = energy + gain
+                self.best_directions = directions + [direction]
+                if self.best_stability <= self.lower_bound:
+                    print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                    self.stopped = True
+            return
+
+        total = sum(candidate[0] for candidate in candidates)
+        log_predicted = log_weight + math.log(total)
+
+        # Compare the weight with the average weight of the chains of this length
+        self.counts[step] += 1
+        self.log_weight_sums[step] = self.log_add(self.log_weight_sums[step], log_predicted)
+        log_upper = self.log_weight_sums[step] - math.log(self.counts[step]) + self.log_clone_factor
+
+        copies = 1
+        if log_predicted > log_upper:
+            copies = min(len(candidates), 1 + int(math.exp(min(log_predicted - log_upper, 10))))
+        elif log_predicted < log_upper + math.log(0.2):
+            if random.random() < 0.5:
+                return
+            log_predicted += math.log(2)
+
+        # The Boltzmann factor of a continuation cancels against its sampling probability
+        for _, direction, key, gain, free in self.sample_distinct(candidates, copies, total):
+            occupancy[key] = step
+            directions.append(direction)
+            child_log_weight = log_predicted - math.log(copies) - math.log(free + 0.5)
+            self.grow(step + 1, key, child_log_weight, energy + gain, occupancy, directions)
+            directions.pop()
+            del occupancy[key]
+
+    def sample_distinct(self, candidates: list, copies: int, total: float) -> list:
+        """
+        Draws distinct candidates with a probability proportional to their importance.
+
+        Args:
+            candidates (list): (importance, direction, key, gain, free neighbours) of every free site.
+            copies (int): Number of candidates to draw.
+            total (float): Summed importance of all candidates.
+
+        Returns:
+            list: The drawn candidates.
+        """
+        if copies >= len(candidates):
+            return candidates
+
+        remaining = list(candidates)
+        chosen = []
+        for _ in range(copies):
+            threshold = random.random() * total
+            for index, candidate in enumerate(remaining):
+                threshold -= candidate[0]
+                if threshold <= 0 or index == len(remaining) - 1:
+                    chosen.append(remaining.pop(index))
+                    total -= candidate[0]
+                    break
+        return chosen
+
+    @staticmethod
+    def log_add(a: float, b: float) -> float:
+        """
+        Returns log(exp(a) + exp(b)) without overflow.
+        """
+        if a == -math.inf:
+            return b
+        high, low = (a, b) if a > b else (b, a)
+        return high + math.log1p(math.exp(low - high))
+
+    def export_results(self, tour_data: list[tuple[int, int]]) -> None:
+        """
+        Exports the best stability of every tour to the CSV file.
+
+        Args:
+            tour_data (list[tuple[int, int]]): Tour number and best stability of every tour.
+        """
+        self.data.perm_data(tour_data)
@@ -1,8 +1,64 @@
 from code.classes.data_storing import DataStoring
 from code.classes.protein import Protein
+from code.classes.moves import MoveSet
+from code.classes.lattice import DIRECTION_KEY_STEPS, pack_position
 from code.visualisation.distribution import Distribution
 
-import copy, random
+import numpy as np
+
+# The ways RandomFolding can sample foldings
+RANDOM_MODES = ("pivot", "walks")
+
+# All six direction codes, +-1 (x), +-2 (y) and +-3 (z), and their packed key steps
+WALK_DIRECTIONS = np.array([1, -1, 2, -2, 3, -3], dtype=np.int8)
+WALK_KEY_STEPS = np.array([DIRECTION_KEY_STEPS[direction + 3] for direction in WALK_DIRECTIONS.tolist()])
+
+
+def grow_walks(n: int, count: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Grows many independent self-avoiding walks at once (Rosenbluth sampling).
+
+    Every step the six neighbouring sites of the chain ends of all walks are
+    checked against the packed keys of their walk in one comparison (only
+    the amino acids with the parity of the new site, the cubic lattice is
+    bipartite), and
+    every walk takes one of its free sites uniformly at random. The
+    Rosenbluth weight of a walk is the product of its number of free sites
+    per step. Weighting the walks with it makes every self-avoiding walk
+    count equally, so statistics of the weighted samples are unbiased.
+
+    Args:
+        n (int): Number of amino acids.
+        count (int): Number of walks.
+        rng (np.random.Generator): The random number generator.
+
+    Returns:
+        tuple: The direction codes (count, n - 1), the log Rosenbluth weights
+        and whether the walk is complete (walks that get trapped have weight 0).
+    """
+    keys = np.empty((count, n), dtype=np.int64)
+    keys[:, 0] = pack_position((0, 0, 0))
+    directions = np.empty((count, n - 1), dtype=np.int8)
+    log_weights = np.zeros(count)
+    complete = np.ones(count, dtype=bool)
+    rows = np.arange(count)
+
+    for step in range(1, n):
+        candidates = keys[:, step - 1, None] + WALK_KEY_STEPS[None, :]
+        # Only amino acids with the parity of the new site can occupy it
+        free = ~(candidates[:, :, None] == keys[:, None, step % 2:step - 1:2]).any(axis=2)
+        free_counts = free.sum(axis=1)
+        complete &= free_counts > 0
+        log_weights += np.log(np.maximum(free_counts, 1))
+
+        # Take the k-th free site, k uniform over the free sites
+        choice = (rng.random(count) * free_counts).astype(np.int64)
+        chosen = np.argmax(np.cumsum(free, axis=1) > choice[:, None], axis=1)
+        directions[:, step - 1] = WALK_DIRECTIONS[chosen]
+        keys[:, step] = candidates[rows, chosen]
+
+    return directions, log_weights, complete
+
 
 class RandomFolding:
     """
@@ -11,18 +67,36 @@ class RandomFolding:
     This algorithm generates random rotations of a protein's structure and
     evaluates their stability, retaining the configuration with the best stability
     score found during the iterations.
+
+    In the walks mode it samples independent self-avoiding walks instead, in
+    batches that are grown and scored with vectorized operations, see execute_walks.
     """
 
-    def __init__(self, protein: Protein,data: DataStoring=None):
+    def __init__(self, protein: Protein,data: DataStoring=None, move_set: str = "rotations", mode: str = "pivot",
+                 batch_size: int = 4096, seed=None, optimum: int = None):
         """
         Initializes the RandomFolding class.
 
         Args:
             data (DataStoring): Object to store and handle result data.
             protein (Protein): The initial protein configuration to optimize.
+            move_set (str): The moves to use, see MoveSet.
+            mode (str): "pivot" for random moves of one folding, "walks" for independent self-avoiding walks.
+            batch_size (int): Number of walks per batch in the walks mode.
+            seed: Optional seed of the random number generator of the walks mode.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
         """
+        if mode not in RANDOM_MODES:
+            raise ValueError(f"Unknown random folding mode '{mode}', choose from {RANDOM_MODES}.")
+
         self.data = data
         self.protein = protein
+        self.move_set = MoveSet(move_set)
+        self.mode = mode
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
+        self.current_stability = None  # Stability of self.protein, updated per rotation
 
     def execute(self, iterations: int = 10000) -> Protein:
         """
@@ -34,9 +108,17 @@ class RandomFolding:
         Returns:
             Protein: The protein configuration with the best stability found.
         """
+        if self.mode == "walks":
+            return self.execute_walks(iterations)
+
+        # Work on a copy, so the input protein is the same start for every run
+        self.protein = self.protein.copy()
+        self.current_stability = None
+
         # Initialize the best protein and its stability
-        best_protein = copy.deepcopy(self.protein)
-        best_stability = best_protein.calculate_stability()
+        best_snapshot = self.protein.snapshot()
+        best_stability = self.protein.calculate_stability()
+        self.current_stability = best_stability
         
         stabilities = []  # Track stability scores for visualization
         iteration_count=1
@@ -49,18 +131,17 @@ class RandomFolding:
             # Attempt a random rotation
             success = self.perform_random_rotation()
 
-            if success:
-                # Calculate the stability of the new configuration
-                stability = self.protein.calculate_stability()
-                stabilities.append((iteration_count,stability))
-
-                # Update the best protein if a better stability is found
-                if stability < best_stability:
-                    best_stability = stability
-                    best_protein = copy.deepcopy(self.protein)
-            else:
-                stability = self.protein.calculate_stability()
-                stabilities.append((iteration_count,stability))
+            # The stability is kept up to date by every applied rotation
+            stability = self.current_stability
+            stabilities.append((iteration_count,stability))
+
+            # Update the best protein if a better stability is found
+            if success and stability < best_stability:
+                best_stability = stability
+                best_snapshot = self.protein.snapshot()
+                if best_stability <= self.lower_bound:
+                    print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                    break
             
             iteration_count+=1
 
@@ -73,28 +154,81 @@ class RandomFolding:
             self.data.random_folding_data(stabilities)
 
         # Store the final results
+        best_protein = self.protein.copy()
+        best_protein.restore(best_snapshot)
         return best_protein
 
+    def execute_walks(self, samples: int) -> Protein:
+        """
+        Samples independent self-avoiding walks and keeps the most stable one.
+
+        The walks are grown in batches with grow_walks and every batch is
+        scored with one call to batch_stability. Every walk is written with
+        its stability and log Rosenbluth weight, so the distribution of the
+        stability over all foldings can be estimated without bias. Walks
+        that got trapped are left out, their weight is 0.
+
+        Args:
+            samples (int): Number of walks to grow.
+
+        Returns:
+            Protein: The most stable walk.
+        """
+        sequence = self.protein.sequence
+        n = len(sequence)
+        if n <= 1:
+            return Protein(sequence)
+
+        best_stability = None
+        best_directions = None
+        sample_count = 0
+
+        for start in range(0, samples, self.batch_size):
+            directions, log_weights, complete = grow_walks(n, min(self.batch_size, samples - start), self.rng)
+            directions, log_weights = directions[complete], log_weights[complete]
+            if len(directions) == 0:
+                continue
+            stabilities, _ = self.protein.tables.batch_stability(directions)
+
+            best = int(np.argmin(stabilities))
+            if best_stability is None or stabilities[best] < best_stability:
+                best_stability = int(stabilities[best])
+                best_directions = directions[best].tolist()
+
+            indices = np.arange(sample_count + 1, sample_count + len(directions) + 1)
+            if self.data:
+                self.data.random_walks_data(zip(indices.tolist(), stabilities.tolist(), np.round(log_weights, 4).tolist()))
+            sample_count += len(directions)
+
+            if best_stability <= self.lower_bound:
+                print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                break
+
+        print(f"Sampled {sample_count} self-avoiding walks, best stability: {best_stability}")
+
+        if best_directions is None:
+            return self.protein.copy()
+        return Protein.from_directions(sequence, best_directions)
+
     def perform_random_rotation(self) -> bool:
         """
-        Performs a single random rotation on the protein structure.
+        Performs a single random move on the protein structure.
 
-        A pivot amino acid is selected randomly, and a random direction is chosen
-        for the rotation. If the rotation is valid (does not cause overlaps),
-        it is applied to the protein.
+        A move is drawn from the move set, by default a rotation around a
+        random pivot amino acid. If the move is valid (does not cause
+        overlaps), it is applied to the protein.
 
         Returns:
-            bool: True if the rotation was successfully applied, False otherwise.
+            bool: True if the move was successfully applied, False otherwise.
         """
-        directions = ['x_positive', 'x_negative', 'y_positive', 'y_negative', 'z_positive', 'z_negative']
-        pivot_index = random.randint(0, len(self.protein.amino_acids) - 1)  # Select a random pivot
-        direction = random.choice(directions)  # Choose a random direction
-        rotation_matrices = self.protein.get_rotation_matrices()
-        rotation_matrix = rotation_matrices[direction]
-
-        # Validate the rotation before applying it
-        if self.protein.is_rotation_valid(pivot_index, rotation_matrix):
-            self.protein.rotate_protein(pivot_index, rotation_matrix)
+        move = self.move_set.random_move(self.protein)
+
+        # Validate the move before applying it
+        if move is not None:
+            if self.current_stability is None:
+                self.current_stability = self.protein.calculate_stability()
+            self.current_stability += self.move_set.stability_delta(self.protein, move)
+            self.move_set.apply(self.protein, move)
             return True
         return False
     
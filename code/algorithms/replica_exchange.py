@@ -0,0 +1,202 @@
+from code.classes.protein import Protein
+from code.classes.data_storing import DataStoring
+from code.classes.worker_pipes import receive_all, report_failure, send_all, stop_workers
+from datetime import datetime
+
+import math, random
+import multiprocessing as mp
+import numpy as np
+
+
+def run_replica(sequence: str, temperature: float, steps: int, seed_sequence: np.random.SeedSequence, connection) -> None:
+    """
+    Runs one replica of the replica exchange in a worker process.
+
+    The replica waits for a message, replaces its folding when the message
+    holds one, performs `steps` Metropolis pivot moves at its fixed
+    temperature and answers with its current and best foldings. A message of
+    None stops the replica. An exception is sent back as a WorkerFailure.
+
+    Args:
+        sequence (str): The protein sequence.
+        temperature (float): The fixed temperature of the replica.
+        steps (int): Number of moves between two exchanges.
+        seed_sequence (np.random.SeedSequence): Seed of the random number generators of this replica.
+        connection: The worker end of the pipe to the coordinator.
+    """
+    try:
+        seed = int(seed_sequence.generate_state(1)[0])
+        random.seed(seed)
+        np.random.seed(seed)
+
+        protein = Protein(sequence)
+        rotation_matrices = list(protein.get_rotation_matrices().values())
+        stability = protein.calculate_stability()
+        best_stability = stability
+        best_encoded = protein.to_bytes()
+
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            if isinstance(message, bytes):
+                protein = Protein.from_bytes(sequence, message)
+                stability = protein.calculate_stability()
+
+            for _ in range(steps):
+                pivot = random.randrange(len(sequence) - 1)
+                rotation_matrix = random.choice(rotation_matrices)
+                if not protein.is_rotation_valid(pivot, rotation_matrix):
+                    continue
+
+                delta_e = protein.stability_delta(pivot, rotation_matrix)
+                if delta_e <= 0 or random.random() < math.exp(-delta_e / temperature):
+                    protein.rotate_protein(pivot, rotation_matrix)
+                    stability += delta_e
+
+                    if stability < best_stability:
+                        best_stability = stability
+                        best_encoded = protein.to_bytes()
+
+            connection.send((stability, protein.to_bytes(), best_stability, best_encoded))
+    except Exception:
+        report_failure(connection)
+    finally:
+        connection.close()
+
+
+class ReplicaExchange:
+    """
+    Implements replica exchange (parallel tempering) for protein folding.
+
+    Every replica is a Metropolis chain at a fixed temperature in its own
+    process. After every `steps_per_exchange` moves the coordinator tries to
+    swap the foldings of neighbouring temperatures with the Metropolis
+    criterion, alternating between the even and the odd pairs. Cold replicas
+    can so escape a local minimum through the hot ones instead of freezing.
+
+    Foldings travel between the processes as direction encodings (one byte per step).
+    """
+
+    def __init__(self, data: DataStoring, protein: Protein, replicas: int = 4, min_temp: float = 0.3,
+                 max_temp: float = 2.0, temperatures: list[float] = None, steps_per_exchange: int = 500,
+                 rounds: int = 1000, end_time: datetime = None, seed=None, optimum: int = None) -> None:
+        """
+        Initializes the replica exchange.
+
+        Args:
+            data (DataStoring): Object to store and manage result data.
+            protein (Protein): The protein to optimize.
+            replicas (int): Number of replicas (and processes).
+            min_temp (float): Lowest temperature of the geometric ladder.
+            max_temp (float): Highest temperature of the geometric ladder.
+            temperatures (list[float]): Optional explicit ladder, overrides replicas, min_temp and max_temp.
+            steps_per_exchange (int): Number of moves of every replica between two exchanges.
+            rounds (int): Maximum number of exchange rounds.
+            end_time (datetime): Optional time to stop.
+            seed: Optional seed for the random number generators of the replicas and the swaps.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
+        """
+        self.data = data
+        self.protein = protein
+        if temperatures is None:
+            temperatures = np.geomspace(min_temp, max_temp, replicas).tolist() if replicas > 1 else [min_temp]
+        self.temperatures = sorted(temperatures)
+        self.steps_per_exchange = steps_per_exchange
+        self.rounds = rounds
+        self.end_time = end_time
+        self.seed = seed
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
+        self.swap_attempts = [0] * (len(self.temperatures) - 1)
+        self.swap_accepted = [0] * (len(self.temperatures) - 1)
+        self.swap_acceptance = []  # (lower temperature, higher temperature, acceptance rate) per pair
+
+    def execute(self) -> Protein:
+        """
+        Executes the replica exchange until the number of rounds or the end time is reached.
+
+        Returns:
+            Protein: The best protein configuration found by any replica.
+        """
+        sequence = self.protein.sequence
+        count = len(self.temperatures)
+        seed_sequences = np.random.SeedSequence(self.seed).spawn(count + 1)
+        swap_random = random.Random(int(seed_sequences[-1].generate_state(1)[0]))
+
+        connections = []
+        processes = []
+        for temperature, seed_sequence in zip(self.temperatures, seed_sequences):
+            parent_connection, child_connection = mp.Pipe()
+            process = mp.Process(
+                target=run_replica,
+                args=(sequence, temperature, self.steps_per_exchange, seed_sequence, child_connection))
+            process.start()
+            child_connection.close()
+            connections.append(parent_connection)
+            processes.append(process)
+
+        best_stability = math.inf
+        best_encoded = None
+        round_data = []
+        messages = [True] * count  # True continues with the current folding
+
+        try:
+            for exchange_round in range(1, self.rounds + 1):
+                if self.end_time is not None and datetime.now() >= self.end_time:
+                    break
+                if best_stability <= self.lower_bound:
+                    print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                    break
+
+                send_all(connections, messages, "Replica")
+                results = receive_all(connections, "Replica")
+
+                stabilities = [result[0] for result in results]
+                foldings = [result[1] for result in results]
+                for _, _, replica_best, replica_encoded in results:
+                    if replica_best < best_stability:
+                        best_stability = replica_best
+                        best_encoded = replica_encoded
+
+                round_data.extend((exchange_round, temperature, stability)
+                                  for temperature, stability in zip(self.temperatures, stabilities))
+
+                # Try to swap the foldings of neighbouring temperatures
+                messages = [True] * count
+                for pair in range(exchange_round % 2, count - 1, 2):
+                    self.swap_attempts[pair] += 1
+                    exponent = ((1 / self.temperatures[pair] - 1 / self.temperatures[pair + 1])
+                                * (stabilities[pair] - stabilities[pair + 1]))
+                    if exponent >= 0 or swap_random.random() < math.exp(exponent):
+                        self.swap_accepted[pair] += 1
+                        messages[pair], messages[pair + 1] = foldings[pair + 1], foldings[pair]
+
+        finally:
+            stop_workers(connections, processes)
+
+        self.report_swap_acceptance()
+        self.export_results(round_data)
+
+        if best_encoded is None:
+            return Protein(sequence)
+        return Protein.from_bytes(sequence, best_encoded)
+
+    def report_swap_acceptance(self) -> None:
+        """
+        Prints the swap acceptance of every pair of neighbouring temperatures.
+        """
+        self.swap_acceptance = []
+        for pair, (attempts, accepted) in enumerate(zip(self.swap_attempts, self.swap_accepted)):
+            rate = accepted / attempts if attempts else 0.0
+            low, high = self.temperatures[pair], self.temperatures[pair + 1]
+            self.swap_acceptance.append((low, high, rate))
+            print(f"Swap T={low:.3f} <-> T={high:.3f}: {accepted}/{attempts} accepted ({rate:.1%})")
+
+    def export_results(self, round_data: list[tuple[int, float, int]]) -> None:
+        """
+        Exports the stability of every replica after every exchange round.
+
+        Args:
+            round_data (list[tuple[int, float, int]]): Round, temperature and stability per replica.
+        """
+        self.data.simulatedannealing_data(round_data)
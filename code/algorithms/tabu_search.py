@@ -0,0 +1,175 @@
+from code.classes.protein import Protein
+from code.classes.data_storing import DataStoring
+from code.algorithms.random_algorithm import RandomFolding
+from code.classes.lattice import DIRECTION_VECTORS, direction_permutations
+from datetime import datetime
+
+import numpy as np
+
+
+class TabuSearch:
+    """
+    Implements tabu search for protein folding.
+
+    Every iteration scores all (n - 1) x 6 pivot moves in one batch and applies
+    the best move that does not lead to a recently visited folding, also when
+    it makes the folding worse. A tabu move is still allowed when it beats the
+    best folding found so far (aspiration). The search so walks off plateaus
+    and out of local optima instead of trying the same moves again.
+
+    Foldings are identified by a Zobrist hash: the XOR of one random 64-bit
+    number per (bond, direction). A pivot move only changes the directions
+    of the bonds after the pivot, so the hashes of all neighbouring foldings
+    follow from the current hash with one suffix XOR per rotation, and every
+    tabu check is a single dictionary lookup.
+    """
+
+    def __init__(self, protein: Protein, max_iterations: int, data: DataStoring = None, tenure: int = None,
+                 start: int = None, seed: int = None, end_time: datetime = None, optimum: int = None) -> None:
+        """
+        Initializes the tabu search.
+
+        Args:
+            protein (Protein): The protein to optimize.
+            max_iterations (int): The number of moves to make.
+            data (DataStoring): Optional object to store the iteration data.
+            tenure (int): Number of iterations a visited folding stays tabu, by default ten times the protein length.
+            start (int): When given, the protein itself is the start instead of a random folding.
+            seed (int): Optional seed of the Zobrist numbers.
+            end_time (datetime): Optional time to stop.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
+        """
+        self.protein = protein
+        self.max_iterations = max_iterations
+        self.data = data
+        self.tenure = tenure if tenure is not None else 10 * len(protein.sequence)
+        self.start = start
+        self.end_time = end_time
+
+        self.rotation_matrices = np.array(list(protein.get_rotation_matrices().values()))
+        self.permutations = direction_permutations(self.rotation_matrices)
+        bonds = max(len(protein.sequence) - 1, 0)
+        self.zobrist = np.random.default_rng(seed).integers(
+            0, np.iinfo(np.uint64).max, size=(bonds, len(DIRECTION_VECTORS)), dtype=np.uint64, endpoint=True)
+        self.tabu = {}  # Hash -> last iteration in which the folding is tabu
+        self.aspirations = 0
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
+
+    def folding_hash(self, codes: np.ndarray) -> int:
+        """
+        Calculates the Zobrist hash of a folding from scratch.
+
+        Args:
+            codes (np.array): Direction code + 3 of every bond.
+
+        Returns:
+            int: The hash of the folding.
+        """
+        return int(np.bitwise_xor.reduce(self.zobrist[np.arange(len(codes)), codes], initial=np.uint64(0)))
+
+    def neighbour_hash_changes(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Calculates how the hash changes with every pivot move.
+
+        Args:
+            codes (np.array): Direction code + 3 of every bond.
+
+        Returns:
+            np.array: The XOR with the current hash of every move, ordered by pivot and then rotation.
+        """
+        bonds = np.arange(len(codes))
+        changes = self.zobrist[bonds, codes][None, :] ^ self.zobrist[bonds[None, :], self.permutations[:, codes]]
+        suffixes = np.bitwise_xor.accumulate(changes[:, ::-1], axis=1)[:, ::-1]
+        return suffixes.T.ravel()
+
+    def execute(self) -> Protein:
+        """
+        Executes the tabu search.
+
+        Returns:
+            Protein: The best protein configuration found.
+        """
+        if self.start is None:
+            self.protein = RandomFolding(self.protein).execute(iterations=1000)
+
+        current_protein = self.protein.copy()
+        n = len(current_protein.sequence)
+        if n <= 2:
+            return current_protein
+
+        rotation_count = len(self.rotation_matrices)
+        pivots = np.repeat(np.arange(n - 1), rotation_count)
+        rotations = np.tile(np.arange(rotation_count), n - 1)
+
+        codes = np.array(current_protein.to_directions()) + 3
+        current_hash = self.folding_hash(codes)
+        current_stability = current_protein.calculate_stability()
+        best_protein = current_protein.copy()
+        best_stability = current_stability
+        iteration_data = []
+
+        for iteration in range(self.max_iterations):
+            if self.end_time is not None and datetime.now() >= self.end_time:
+                break
+            print(f"Tabu Iteration: {iteration + 1}, Current Stability: {current_stability}, Best Stability: {best_stability}")
+            self.tabu[current_hash] = iteration + self.tenure
+
+            foldings = current_protein.pivot_foldings(pivots, self.rotation_matrices[rotations])
+            scores, valid = current_protein.batch_stability(foldings)
+            hashes = self.neighbour_hash_changes(codes) ^ np.uint64(current_hash)
+
+            move = self.choose_move(scores, valid, hashes, iteration, best_stability)
+            if move is None:
+                print("Every pivot move is invalid or tabu.")
+                break
+
+            pivot, rotation = int(pivots[move]), int(rotations[move])
+            current_protein.rotate_protein(pivot, self.rotation_matrices[rotation])
+            codes[pivot:] = self.permutations[rotation, codes[pivot:]]
+            current_hash = int(hashes[move])
+            current_stability = int(scores[move])
+
+            if current_stability < best_stability:
+                best_protein = current_protein.copy()
+                best_stability = current_stability
+            iteration_data.append((iteration + 1, current_stability))
+
+            if best_stability <= self.lower_bound:
+                print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                break
+
+            # Forget the foldings whose tenure is over, so the tabu list stays small
+            if len(self.tabu) > 4 * self.tenure:
+                self.tabu = {key: end for key, end in self.tabu.items() if end > iteration}
+
+        print(f"Tabu search complete. Best Stability: {best_stability}, aspirations: {self.aspirations}")
+
+        if self.data is not None:
+            self.data.hillclimber_data(iteration_data)
+
+        return best_protein
+
+    def choose_move(self, scores: np.ndarray, valid: np.ndarray, hashes: np.ndarray, iteration: int,
+                    best_stability: int) -> int | None:
+        """
+        Chooses the best move that is not tabu, or that beats the best folding (aspiration).
+
+        Args:
+            scores (np.array): Stability after every move.
+            valid (np.array): Validity of every move.
+            hashes (np.array): Hash of the folding after every move.
+            iteration (int): The current iteration.
+            best_stability (int): The best stability found so far.
+
+        Returns:
+            int | None: Index of the chosen move, or None when there is no allowed move.
+        """
+        for move in np.lexsort((np.random.random(len(scores)), scores)).tolist():
+            if not valid[move]:
+                continue
+            if self.tabu.get(int(hashes[move]), -1) < iteration:
+                return move
+            if scores[move] < best_stability:
+                self.aspirations += 1
+                return move
+        return None
@@ -0,0 +1,153 @@
+from code.classes.protein import Protein
+from code.classes.data_storing import DataStoring
+from code.algorithms.Simulatedannealing import cooling_schedule, metropolis_accept
+from code.classes.lattice import directions_from_coordinates
+from datetime import datetime
+
+import numpy as np
+
+
+class VectorizedMonteCarlo:
+    """
+    Runs many independent Monte Carlo chains in lock-step in one process.
+
+    The foldings of all chains are stored in one array of shape (chains, n, 3).
+    Every step proposes one pivot move per chain, rotates the tails of all
+    chains at once, checks the validity and stability of all new foldings with
+    one call to SequenceTables.batch_stability and accepts the moves with the
+    Metropolis criterion as a mask. The Python loop so runs once per step
+    instead of once per move.
+
+    With annealing the temperature follows the schedule of SimulatedAnnealing,
+    without it the chains are hill climbers that only accept improvements and
+    start from random foldings, like HillClimber.
+    """
+
+    def __init__(self, data: DataStoring, protein: Protein, chains: int = 256, annealing: bool = True,
+                 steps_per_temp: int = 100, max_steps: int = 10000, end_time: datetime = None,
+                 optimum: int = None) -> None:
+        """
+        Initializes the chains, all starting from the folding of the protein.
+
+        Args:
+            data (DataStoring): Object to store and manage result data.
+            protein (Protein): The protein to optimize.
+            chains (int): Number of chains that run in lock-step.
+            annealing (bool): Anneal the chains, or only accept improvements (hill climbing).
+            steps_per_temp (int): Number of steps per temperature level when annealing.
+            max_steps (int): Number of steps when hill climbing.
+            end_time (datetime): Optional time to stop.
+            optimum (int): Optional best known stability, the run also stops when it reaches it.
+        """
+        self.data = data
+        self.protein = protein
+        self.chains = chains
+        self.annealing = annealing
+        self.steps_per_temp = steps_per_temp
+        self.max_steps = max_steps
+        self.end_time = end_time
+        self.cooling_rate, self.initial_temp, self.min_temp = cooling_schedule(len(protein.sequence))
+        self.rotation_matrices = np.array(list(protein.get_rotation_matrices().values()), dtype=np.int64)
+        self.attempts = 0
+        self.accepted = 0
+        self.lower_bound = protein.lower_bound(optimum)  # Stop when a folding reaches it
+
+    def execute(self) -> Protein:
+        """
+        Executes the chains until the temperature reaches its minimum (annealing),
+        the number of steps is done (hill climbing) or the end time is reached.
+
+        Returns:
+            Protein: The best protein configuration found by any chain.
+        """
+        tables = self.protein.tables
+        n = len(self.protein.sequence)
+        if n <= 2:
+            return self.protein.copy()
+
+        positions = np.repeat(self.protein.positions.astype(np.int64)[None], self.chains, axis=0)
+        stabilities, _ = tables.batch_stability(positions)
+        if not self.annealing:
+            # Random start foldings: every valid move is accepted at an infinite temperature
+            for _ in range(2 * n):
+                stabilities = self.step(positions, stabilities, np.inf)
+        best_stability = int(stabilities.min())
+        best_positions = positions[int(np.argmin(stabilities))].copy()
+
+        temperature = self.initial_temp if self.annealing else 0.0
+        iteration_data = []
+        step = 0
+
+        while (temperature > self.min_temp) if self.annealing else (step < self.max_steps):
+            if self.end_time is not None and datetime.now() >= self.end_time:
+                break
+            if best_stability <= self.lower_bound:
+                print(f"Reached the lower bound {self.lower_bound}, stopping.")
+                break
+
+            stabilities = self.step(positions, stabilities, temperature)
+            step += 1
+
+            chain = int(np.argmin(stabilities))
+            if stabilities[chain] < best_stability:
+                best_stability = int(stabilities[chain])
+                best_positions = positions[chain].copy()
+
+            if not self.annealing:
+                iteration_data.append((step, best_stability))
+            elif step % self.steps_per_temp == 0:
+                iteration_data.append((step // self.steps_per_temp, temperature, int(stabilities.min())))
+                temperature *= self.cooling_rate
+
+        rate = self.accepted / self.attempts if self.attempts else 0.0
+        print(f"Lock-step Monte Carlo: {self.attempts} moves over {self.chains} chains, "
+              f"{rate:.1%} accepted, best stability {best_stability}")
+
+        self.export_results(iteration_data)
+        return Protein.from_directions(self.protein.sequence, directions_from_coordinates(best_positions))
+
+    def step(self, positions: np.ndarray, stabilities: np.ndarray, temperature: float) -> np.ndarray:
+        """
+        Proposes one random pivot move per chain and applies the accepted moves in place.
+
+        Args:
+            positions (np.array): Coordinates of all chains, shape (chains, n, 3).
+            stabilities (np.array): Stability of every chain.
+            temperature (float): The current temperature, 0 only accepts improvements.
+
+        Returns:
+            np.array: The stability of every chain after the step.
+        """
+        count, n, _ = positions.shape
+        rows = np.arange(count)
+        pivots = np.random.randint(0, n - 1, size=count)
+        rotations = self.rotation_matrices[np.random.randint(0, len(self.rotation_matrices), size=count)]
+
+        # Rotate the amino acids after the pivot of every chain around the pivot
+        pivot_positions = positions[rows, pivots][:, None, :]
+        rotated = np.einsum('cij,ckj->cki', rotations, positions - pivot_positions) + pivot_positions
+        tail = np.arange(n)[None, :] > pivots[:, None]
+        proposed = np.where(tail[:, :, None], rotated, positions)
+
+        new_stabilities, valid = self.protein.tables.batch_stability(proposed)
+        accept = valid & metropolis_accept(new_stabilities - stabilities, temperature, np.random.random(count))
+
+        positions[accept] = proposed[accept]
+        self.attempts += count
+        self.accepted += int(accept.sum())
+        return np.where(accept, new_stabilities, stabilities)
+
+    def export_results(self, iteration_data: list[tuple]) -> None:
+        """
+        Exports the progress in the format of simulated annealing or the hillclimber.
+
+        Args:
+            iteration_data (list[tuple]): Temperature level, temperature and lowest stability
+                of all chains when annealing, or step and best stability when hill climbing.
+        """
+        if self.data is None:
+            return
+        if self.annealing:
+            self.data.simulatedannealing_data(iteration_data)
+        else:
+            self.data.hillclimber_data(iteration_data)
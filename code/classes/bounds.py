@@ -0,0 +1,238 @@
+from code.classes.energy import BOND_ENERGY_TABLE, get_sequence_tables
+from functools import lru_cache
+
+import json, os, tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows, the optima file is still replaced atomically
+    fcntl = None
+
+# Optimal stabilities proven by the exact solver, sequence -> stability
+OPTIMA_FILE = os.path.join(os.path.dirname(__file__), '../..', 'results', 'optima.json')
+OPTIMA_LOCK_FILE = OPTIMA_FILE + '.lock'
+KNOWN_OPTIMA = {}
+optima_loaded = False
+
+
+def remaining_bounds(types: list[int]) -> list[int]:
+    """
+    Calculates for every index the lowest stability the amino acids from
+    that index onwards can add to a partial folding.
+
+    Every contact is counted at its later amino acid. That amino acid can
+    only touch earlier amino acids of opposite parity that are not its
+    chain neighbour, on at most 4 free sites (5 for the last amino acid).
+
+    Args:
+        types (list[int]): The type code of every amino acid.
+
+    Returns:
+        list[int]: The bound for every index, with an extra 0 at the end.
+    """
+    n = len(types)
+    gains = []
+    for index, amino_type in enumerate(types):
+        bond_energies = BOND_ENERGY_TABLE[amino_type]
+        partner_energies = sorted(
+            bond_energies[types[other]] for other in range(index - 3, -1, -2) if types[other] > 0)
+        capacity = 5 if index == n - 1 else 4
+        gains.append(sum(partner_energies[:capacity]))
+
+    remaining_bound = [0] * (n + 1)
+    for index in range(n - 1, -1, -1):
+        remaining_bound[index] = remaining_bound[index + 1] + gains[index]
+    return remaining_bound
+
+
+def contact_weights(types: list[int]) -> list[int]:
+    """
+    Calculates for every amino acid the largest bond energy (in absolute
+    value) it can have with one amino acid of opposite parity.
+
+    Args:
+        types (list[int]): The type code of every amino acid.
+
+    Returns:
+        list[int]: The weight of every amino acid, 0 for P.
+    """
+    weights = []
+    for index, amino_type in enumerate(types):
+        bond_energies = BOND_ENERGY_TABLE[amino_type]
+        weights.append(max([-bond_energies[types[other]]
+                            for other in range(1 - index % 2, len(types), 2) if abs(index - other) > 1],
+                           default=0))
+    return weights
+
+
+def unplaced_slots(types: list[int], weights: list[int]) -> list[tuple[int, int]]:
+    """
+    Calculates for every index the weighted number of free sites of the
+    amino acids from that index onwards, split by parity. An amino acid in
+    the chain has 4 sites for contacts, the first and the last one 5.
+
+    Args:
+        types (list[int]): The type code of every amino acid.
+        weights (list[int]): The weight of every amino acid, see contact_weights.
+
+    Returns:
+        list[tuple[int, int]]: Weighted sites of the even and odd amino acids for
+        every index, with an extra (0, 0) at the end.
+    """
+    n = len(types)
+    slots_per_index = [(0, 0)] * (n + 1)
+    for index in range(n - 1, -1, -1):
+        even, odd = slots_per_index[index + 1]
+        slots = (5 if index in (0, n - 1) else 4) * weights[index]
+        slots_per_index[index] = (even + slots, odd) if index % 2 == 0 else (even, odd + slots)
+    return slots_per_index
+
+
+def slot_bound(placed_even: int, placed_odd: int, unplaced_even: int, unplaced_odd: int) -> int:
+    """
+    Bounds the stability that can still be gained with the weighted free
+    sites. A new contact joins an even and an odd amino acid, at least one
+    of which is not placed yet, so the contacts of the unplaced even amino
+    acids and the contacts between placed even and unplaced odd amino
+    acids are bounded separately (and the same with the parities swapped).
+    All of them together are also bounded by the sites of either parity.
+
+    Args:
+        placed_even (int): Weighted free sites next to the placed even amino acids.
+        placed_odd (int): Weighted free sites next to the placed odd amino acids.
+        unplaced_even (int): Weighted sites of the unplaced even amino acids.
+        unplaced_odd (int): Weighted sites of the unplaced odd amino acids.
+
+    Returns:
+        int: A lower bound on the stability the remaining amino acids can add.
+    """
+    from_even = min(unplaced_even, placed_odd + unplaced_odd) + min(placed_even, unplaced_odd)
+    from_odd = min(unplaced_odd, placed_even + unplaced_even) + min(placed_odd, unplaced_even)
+    return -min(from_even, from_odd, placed_even + unplaced_even, placed_odd + unplaced_odd)
+
+
+@lru_cache(maxsize=None)
+def parity_bound(sequence: str) -> int:
+    """
+    Calculates a lower bound on the stability of any folding of a sequence.
+
+    The cubic lattice is bipartite, so an amino acid only touches amino
+    acids of opposite parity, and it has at most 4 free sites for contacts
+    (5 at the ends of the chain). The bound is the tighter of two counts:
+    every amino acid filling its sites with its best earlier partners
+    (remaining_bounds), and the weighted sites of the even against the odd
+    amino acids (slot_bound), with C-C contacts weighted -5.
+
+    Args:
+        sequence (str): The protein sequence.
+
+    Returns:
+        int: The lower bound, no folding has a lower stability.
+    """
+    types = get_sequence_tables(sequence).type_list
+    even, odd = unplaced_slots(types, contact_weights(types))[0]
+    return max(remaining_bounds(types)[0], slot_bound(0, 0, even, odd))
+
+
+def read_optima() -> dict:
+    """
+    Reads the optima file.
+
+    Returns:
+        dict: Sequence -> stability, empty if there is no readable optima file.
+    """
+    if not os.path.isfile(OPTIMA_FILE):
+        return {}
+    try:
+        with open(OPTIMA_FILE) as f:
+            optima = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Could not read optima file '{OPTIMA_FILE}': {e}")
+        return {}
+    return optima if isinstance(optima, dict) else {}
+
+
+def save_optimum(sequence: str, stability: int) -> None:
+    """
+    Adds an optimum to the optima file. The file is locked while it is read
+    and written, so concurrent jobs do not lose each other's entries, and it
+    is replaced atomically, so a crash never leaves a corrupt file behind.
+
+    Args:
+        sequence (str): The protein sequence.
+        stability (int): The proven optimal stability.
+    """
+    directory = os.path.dirname(OPTIMA_FILE)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(OPTIMA_LOCK_FILE, mode='a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Released when the lock file is closed
+
+        optima = read_optima()
+        if sequence in optima and optima[sequence] <= stability:
+            return
+        optima[sequence] = stability
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, mode='w') as f:
+                json.dump(optima, f, indent=1)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, OPTIMA_FILE)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+def load_optima() -> None:
+    """
+    Loads the optima recorded in earlier sessions into KNOWN_OPTIMA, once per process.
+    """
+    global optima_loaded
+    if optima_loaded:
+        return
+    optima_loaded = True
+    for sequence, stability in read_optima().items():
+        KNOWN_OPTIMA.setdefault(sequence, stability)
+
+
+def record_optimum(sequence: str, stability: int, save: bool = False) -> None:
+    """
+    Records the optimal stability of a sequence as proven by the exact
+    solver, so every later run can stop as soon as it reaches it. A record
+    is only replaced by a lower stability.
+
+    Args:
+        sequence (str): The protein sequence.
+        stability (int): The proven optimal stability.
+        save (bool): Also store it in the optima file, for later sessions.
+    """
+    load_optima()
+    if sequence in KNOWN_OPTIMA and KNOWN_OPTIMA[sequence] <= stability:
+        return
+    KNOWN_OPTIMA[sequence] = stability
+    if save:
+        save_optimum(sequence, stability)
+
+
+def lower_bound(sequence: str, optimum: int = None) -> int:
+    """
+    Returns the lowest stability a folding of the sequence can reach: the
+    recorded optimum if there is one, otherwise the best known stability
+    given for this run, otherwise the parity bound.
+
+    Args:
+        sequence (str): The protein sequence.
+        optimum (int): Optional best known stability, only used for this call.
+
+    Returns:
+        int: The lower bound on the stability.
+    """
+    load_optima()
+    bound = parity_bound(sequence)
+    if sequence in KNOWN_OPTIMA:
+        return max(bound, KNOWN_OPTIMA[sequence])
+    return bound if optimum is None else max(bound, optimum)
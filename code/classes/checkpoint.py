@@ -0,0 +1,113 @@
+import json, os, random, tempfile, time
+import numpy as np
+
+class Checkpoint:
+    """
+    Saves the state of a long time-boxed run, so a restarted run can resume
+    instead of starting over.
+
+    Checkpoints are small JSON files: foldings are stored as direction codes.
+    Every save writes a temporary file and moves it over the checkpoint, so a
+    crash during a write never leaves a corrupt checkpoint behind.
+    """
+
+    def __init__(self, path: str, interval: float = 60.0) -> None:
+        """
+        Initializes the Checkpoint object.
+
+        Args:
+            path (str): Path of the checkpoint file.
+            interval (float): Minimum number of seconds between two periodic saves.
+        """
+        self.path = path
+        self.interval = interval
+        self.last_save = time.time()
+
+    def exists(self) -> bool:
+        """
+        Returns:
+            bool: True if a checkpoint file exists.
+        """
+        return os.path.isfile(self.path)
+
+    def load(self) -> dict | None:
+        """
+        Loads the checkpoint.
+
+        Returns:
+            dict | None: The saved state, or None if there is no readable checkpoint.
+        """
+        if not self.exists():
+            return None
+        try:
+            with open(self.path, mode='r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not read checkpoint '{self.path}': {e}")
+            return None
+
+    def save(self, state: dict) -> None:
+        """
+        Writes the state atomically to the checkpoint file.
+
+        Args:
+            state (dict): The state to save, must be JSON serializable.
+        """
+        directory = os.path.dirname(self.path) or "."
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, mode='w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.last_save = time.time()
+
+    def is_due(self) -> bool:
+        """
+        Returns:
+            bool: True if the interval since the last save has passed.
+        """
+        return time.time() - self.last_save >= self.interval
+
+    def clear(self) -> None:
+        """
+        Removes the checkpoint file, for example when the run has finished.
+        """
+        if self.exists():
+            os.remove(self.path)
+
+
+def get_random_state() -> dict:
+    """
+    Captures the state of the random and NumPy random number generators in a JSON serializable form.
+
+    Returns:
+        dict: The state of both generators.
+    """
+    version, internal_state, gauss_next = random.getstate()
+    name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    return {
+        "random": [version, list(internal_state), gauss_next],
+        "numpy": [name, keys.tolist(), int(position), int(has_gauss), float(cached_gaussian)],
+    }
+
+
+def set_random_state(state: dict) -> None:
+    """
+    Restores the random number generators from a state made by get_random_state.
+
+    Args:
+        state (dict): The state of both generators.
+    """
+    version, internal_state, gauss_next = state["random"]
+    random.setstate((version, tuple(internal_state), gauss_next))
+    name, keys, position, has_gauss, cached_gaussian = state["numpy"]
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), position, has_gauss, cached_gaussian))
@@ -1,5 +1,22 @@
+from code.classes.protein import Protein
+
 import os
 import csv
+import numpy as np
+
+# The header of the raw data file of every algorithm
+RAW_HEADERS = {
+    1: ['Iteration', 'Stability', 'Log Weight'],  # Random Folding
+    2: ['Iteration', 'Stability'],  # Hillclimber
+    3: ['Iteration', 'Stability'],  # Greedy Algorithm
+    4: ['Beam Width', 'Stability', 'Elapsed Time'],  # Beam Search Folding
+    5: ['Iteration', 'Stability', 'Temperature'],  # Simulated Annealing
+    6: ['Nodes', 'Stability', 'Lower Bound', 'Bound Gap', 'Proven'],  # Branch and bound
+    7: ['Tour', 'Stability'],  # PERM
+    8: ['Iteration', 'Stability'],  # Tabu search
+    9: ['Generation', 'Stability', 'Island'],  # Genetic algorithm
+    10: ['Iteration', 'Stability'],  # Monte Carlo tree search
+}
 
 class CsvFunctions:
     """
@@ -13,45 +30,34 @@ class CsvFunctions:
         """
         Ensures the correct header is present in the specified CSV file.
         If the file does not exist, it is created with the appropriate header.
+        A file whose first line already starts with the first column of the
+        header keeps its header, so a resumed or repeated run does not add another.
         
         Args:
             raw_filepath (str): The path to the CSV file.
-            choice (int): The algorithm type indicator (1-5).
+            choice (int): The algorithm type indicator (1-10).
         """
+        header = RAW_HEADERS.get(choice)
+        if header is None:
+            open(raw_filepath, mode='a').close()  # No header for an unknown algorithm
+            return
+
         if os.path.isfile(raw_filepath):
             # Check if the file already has a header
-            with open(raw_filepath, mode='r') as f:
+            with open(raw_filepath, mode='r', newline='') as f:
                 existing_data = f.readlines()
-                if len(existing_data) == 0 or not existing_data[0].strip().startswith("Iteration"):
-                    # Add the appropriate header
-                    temp_data = existing_data[:]
-                    with open(raw_filepath, mode='w', newline='') as fw:
-                        writer = csv.writer(fw)
-                        if choice == 5:  # Simulated Annealing
-                            writer.writerow(['Iteration', 'Stability', 'Temperature'])
-                        elif choice == 3:  # Greedy Algorithm
-                            writer.writerow(['Iteration', 'Stability'])
-                        elif choice == 1:  # Random Folding
-                            writer.writerow(['Iteration', 'Stability'])
-                        elif choice == 4:  # Beam Search Folding
-                            writer.writerow(['Beam Width', 'Stability', 'Elapsed Time'])
-                        elif choice == 2:  # Beam Search Folding
-                            writer.writerow(['Iteration', 'Stability'])
-                        fw.writelines(temp_data)  # Rewriting the existing data
+            first_row = next(csv.reader(existing_data[:1]), [])
+            if not first_row or first_row[0].strip() != header[0]:
+                # Add the appropriate header
+                with open(raw_filepath, mode='w', newline='') as fw:
+                    writer = csv.writer(fw)
+                    writer.writerow(header)
+                    fw.writelines(existing_data)  # Rewriting the existing data
         else:
             # Create the file and write the header
             with open(raw_filepath, mode='w', newline='') as f:
                 writer = csv.writer(f)
-                if choice == 5:  # Simulated Annealing
-                    writer.writerow(['Iteration', 'Stability', 'Temperature'])
-                elif choice == 3:  # Greedy Algorithm
-                    writer.writerow(['Iteration', 'Stability'])
-                elif choice == 1:  # Random Algorithm
-                    writer.writerow(['Iteration', 'Stability'])
-                elif choice == 4:  # Beam Search Folding
-                    writer.writerow(['Beam Width', 'Stability', 'Elapsed Time'])
-                elif choice == 2:  # Hill Climber Algorithm
-                    writer.writerow(['Iteration', 'Stability'])
+                writer.writerow(header)
     
     def csv_header_summary(self, summary_filepath: str, choice: int) -> None:
         """
@@ -65,9 +71,9 @@ class CsvFunctions:
             with open(summary_filepath, mode='w', newline='') as f:
                 writer = csv.writer(f)
                 if choice == 4:
-                    writer.writerow(['Beam Width', 'Elapsed Time (s)', 'Stability', 'Protein Folding Sequence'])
+                    writer.writerow(['Beam Width', 'Elapsed Time (s)', 'Stability', 'Protein Folding Sequence', 'Bound Gap', 'Seed'])
                 else:
-                    writer.writerow(['Run', 'Execution Time (s)', 'Stability', 'Protein Folding Sequence'])
+                    writer.writerow(['Run', 'Execution Time (s)', 'Stability', 'Protein Folding Sequence', 'Bound Gap', 'Seed'])
     
     def csv_summary(
         self, 
@@ -75,7 +81,9 @@ class CsvFunctions:
         current_stability: float, 
         sequence_protein: str, 
         run_count: int, 
-        execution_time: float
+        execution_time: float,
+        bound_gap: int = None,
+        seed=None
     ) -> None:
         """
         Appends summary data to the summary CSV file.
@@ -86,7 +94,34 @@ class CsvFunctions:
             sequence_protein (str): The protein sequence used in the simulation.
             run_count (int): The run iteration number.
             execution_time (float): The time taken for execution in seconds.
+            bound_gap (int): Optional difference between the stability and the lower bound of the sequence.
+            seed: Optional seed of the run, to replay it.
         """
         with open(summary_filepath, mode='a', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([run_count + 1, execution_time, current_stability, sequence_protein])
+            writer.writerow([run_count + 1, execution_time, current_stability, sequence_protein, bound_gap, seed])
+
+    def load_best_folding(self, filepath: str) -> Protein:
+        """
+        Loads a protein from a '*_best_folding.csv' file.
+
+        Files with a 'Direction' column are rebuilt from the direction codes,
+        older files are parsed from their position strings.
+
+        Args:
+            filepath (str): The path to the best folding CSV file.
+
+        Returns:
+            Protein: The saved protein configuration.
+        """
+        with open(filepath, mode='r', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+        sequence = "".join(row['Type'] for row in rows)
+        if rows and 'Direction' in rows[0]:
+            return Protein.from_directions(sequence, [int(row['Direction']) for row in rows[:-1]])
+
+        protein = Protein(sequence)
+        positions = [np.array(row['Position'].strip('[]').split(), dtype=int) for row in rows]
+        protein.move_amino_acids(0, np.array(positions).reshape(-1, 3))
+        return protein
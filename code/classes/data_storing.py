@@ -12,7 +12,8 @@ class DataStoring:
                  parameters: dict = None, 
                  best_protein: object = None, 
                  filename: str = None,
-                 run_count: int = 0):
+                 run_count: int = 0,
+                 queue: object = None):
         """
         Initializes the DataStoring object.
 
@@ -21,6 +22,9 @@ class DataStoring:
             parameters (dict): Parameters used for the algorithm.
             best_protein (Protein): The best protein structure found.
             filename (str): The CSV filename where data will be stored.
+            run_count (int): The number of the current run.
+            queue (multiprocessing.Queue): If given, rows are sent to this queue
+                instead of written, so one process can write for many workers.
         """
         self.csv_directory = os.path.join(os.path.dirname(__file__), '../..', 'results')
         self.algorithm = algorithm
@@ -28,6 +32,23 @@ class DataStoring:
         self.parameters = parameters
         self.protein = best_protein
         self.run_count = run_count
+        self.queue = queue
+
+    def write_rows(self, rows: list) -> None:
+        """
+        Appends rows to the CSV file, or sends them to the queue if one is set.
+
+        Args:
+            rows (list): The rows to write.
+        """
+        if self.queue is not None:
+            self.queue.put(("rows", rows))
+            return
+
+        full_path = self.get_path()
+        with open(full_path, mode='a', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerows(rows)
     
     def ensure_csv_headers(self) -> None:
         """
@@ -49,13 +70,8 @@ class DataStoring:
         Args:
             data (list): List of results to be written to the file.
         """
-        full_path = self.get_path()
-
         # Log de iteration data naar raw data CSV
-        with open(full_path, mode='a', newline='') as f:
-            writer = csv.writer(f)
-            for iteration, temp, stability in iteration_data:
-                writer.writerow([iteration, stability, temp])
+        self.write_rows([[iteration, stability, temp] for iteration, temp, stability in iteration_data])
 
     def greedy_algorithm_data(self, folded_protein) -> None:
         """
@@ -67,30 +83,30 @@ class DataStoring:
             stability (float): The stability score of the run.
             folding_sequence (str): The protein folding sequence.
         """
-        full_path = self.get_path()
-        
         current_stability = folded_protein.calculate_stability()
 
         # Log gegevens naar raw data CSV
-        with open(full_path, mode='a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([self.run_count + 1, current_stability])
+        self.write_rows([[self.run_count + 1, current_stability]])
     
     def random_folding_data(self, stabilities) -> None:
         """
-        Writes Random Folding results to the CSV file.
+        Writes Random Folding results to the CSV file. The Log Weight column
+        of the header is left empty, the pivot mode samples without weights.
 
         Args:
-            iteration (int): The current iteration number.
-            stability (float): The stability score for the iteration.
+            stabilities: Iteration and stability of every iteration.
         """
-        full_path = self.get_path()
-
         # Log de random folding data
-        with open(full_path, mode='a', newline='') as f:
-            writer = csv.writer(f)
-            for iterations_count, stability in stabilities:
-                writer.writerow([iterations_count, stability])
+        self.write_rows([[iterations_count, stability, ""] for iterations_count, stability in stabilities])
+
+    def random_walks_data(self, samples) -> None:
+        """
+        Writes the sampled self-avoiding walks of Random Folding to the CSV file.
+
+        Args:
+            samples: Sample number, stability and log Rosenbluth weight of every walk.
+        """
+        self.write_rows([[sample, stability, log_weight] for sample, stability, log_weight in samples])
 
     def hillclimber_data(self,hillclimber) -> None:
         """
@@ -100,13 +116,8 @@ class DataStoring:
             iteration (int): The current iteration number.
             stability (float): The stability score for the iteration.
         """
-        full_path = self.get_path()
-
         # Log de random folding data
-        with open(full_path, mode='a', newline='') as f:
-            writer = csv.writer(f)
-            for iterations_count, stability in hillclimber:
-                writer.writerow([iterations_count, stability])
+        self.write_rows([[iterations_count, stability] for iterations_count, stability in hillclimber])
 
     def beam_search_data(self, beam_data:list[tuple[float, float, float]]) -> None:
         """
@@ -119,13 +130,39 @@ class DataStoring:
         """
 
         
-        full_path = self.get_path()
-        self.ensure_csv_headers()
+        if self.queue is None:
+            self.ensure_csv_headers()
 
-        with open(full_path, mode='a', newline='') as f:
-                writer = csv.writer(f)
-                for beam_width,elapsed_time, stability in beam_data:
-                    writer.writerow([beam_width,stability,elapsed_time])
+        self.write_rows([[beam_width, stability, elapsed_time] for beam_width, elapsed_time, stability in beam_data])
+
+    def perm_data(self, tour_data: list[tuple[int, int]]) -> None:
+        """
+        Writes PERM results to the CSV file.
+
+        Args:
+            tour_data (list): Tour number and best stability of every tour.
+        """
+        self.write_rows([[tour, stability] for tour, stability in tour_data])
+
+    def genetic_algorithm_data(self, epoch_data: list[tuple[int, int, int]]) -> None:
+        """
+        Writes genetic algorithm results to the CSV file.
+
+        Args:
+            epoch_data (list): Generation, island and best stability of the island after every migration.
+        """
+        # Stability in the second column, as every raw file has it for the distribution plot
+        self.write_rows([[generation, stability, island] for generation, island, stability in epoch_data])
+
+    def branch_and_bound_data(self, certificate: dict) -> None:
+        """
+        Writes the certificate of the exact solver to the CSV file.
+
+        Args:
+            certificate (dict): Nodes explored, stability, lower bound, bound gap and whether the optimum is proven.
+        """
+        self.write_rows([[certificate["nodes"], certificate["stability"], certificate["lower_bound"],
+                          certificate["bound_gap"], certificate["proven"]]])
 
 
 
@@ -158,16 +195,7 @@ class DataStoring:
         Returns:
             list[int]: List of movement directions for the protein.
         """
-        directions = []
-        for i in range(1, len(self.protein.amino_acids)):
-            delta = self.protein.amino_acids[i]["position"] - self.protein.amino_acids[i - 1]["position"]
-            if delta[0] != 0:
-                directions.append(int(delta[0]))
-            elif delta[1] != 0:
-                directions.append(int(delta[1]) * 2)
-            elif delta[2] != 0:
-                directions.append(int(delta[2]) * 3)
-        return directions
+        return self.protein.to_directions()
 
     def generate_output(self, score: float) -> str:
         """
@@ -0,0 +1,185 @@
+from code.classes.lattice import (
+    NEIGHBOR_KEY_OFFSETS, NEIGHBOR_KEY_STEPS, PACK_BASE, coordinates_from_directions, pack_coordinates
+)
+from functools import lru_cache
+
+import numpy as np
+
+# Integer codes for the amino acid types, used by the compact type array
+AMINO_ACID_CODES = {"P": 0, "H": 1, "C": 2}
+
+# Bond energies indexed by two amino acid codes (P, H, C)
+BOND_ENERGIES = np.array([
+    [0, 0, 0],
+    [0, -1, -1],
+    [0, -1, -5]
+])
+BOND_ENERGY_TABLE = BOND_ENERGIES.tolist()
+
+# Offset between the packed keys of two conformations in a batch, larger than any packed key
+BATCH_KEY_STRIDE = PACK_BASE ** 3
+
+
+class SequenceTables:
+    """
+    Precomputed per-sequence tables for the vectorized stability kernel.
+
+    On the cubic lattice two amino acids can only touch when their indices
+    have opposite parity, so the H and C amino acids are split into an even
+    and an odd group and contacts are only searched between the two groups.
+    Every contact is then found exactly once.
+    """
+
+    __slots__ = ("types", "type_list", "even", "odd", "pair_energies", "contact_mask")
+
+    def __init__(self, sequence: str) -> None:
+        """
+        Builds the tables for a sequence.
+
+        Args:
+            sequence (str): The protein sequence consisting of amino acids.
+        """
+        self.types = np.array([AMINO_ACID_CODES.get(amino_acid, 0) for amino_acid in sequence or ""], dtype=np.int8)
+        self.type_list = self.types.tolist()  # Plain integers for the scalar contact_energy
+        bonding = np.flatnonzero(self.types > 0)
+        self.even = bonding[bonding % 2 == 0]  # Indices of even H and C amino acids
+        self.odd = bonding[bonding % 2 == 1]  # Indices of odd H and C amino acids
+
+        # Bond energy for every (even, odd) pair, zero for neighbours in the sequence
+        self.pair_energies = BOND_ENERGIES[self.types[self.even][:, None], self.types[self.odd][None, :]]
+        self.pair_energies[np.abs(self.even[:, None] - self.odd[None, :]) == 1] = 0
+        self.contact_mask = self.pair_energies != 0  # Pairs that change the stability when they touch
+
+    def stability(self, positions: np.ndarray) -> int:
+        """
+        Calculates the stability of one conformation.
+
+        The packed positions of the odd group are sorted once, after which the
+        six neighbours of every even amino acid are found with a binary search,
+        so the kernel runs in O(n log n).
+
+        Args:
+            positions (np.array): Array of shape (n, 3) with the positions of all amino acids.
+
+        Returns:
+            int: The stability score of the conformation.
+        """
+        if len(self.even) == 0 or len(self.odd) == 0:
+            return 0
+
+        odd_keys = pack_coordinates(positions[self.odd])
+        order = np.argsort(odd_keys)
+        sorted_keys = odd_keys[order]
+
+        neighbor_keys = pack_coordinates(positions[self.even])[:, None] + NEIGHBOR_KEY_OFFSETS[None, :]
+        slots = np.searchsorted(sorted_keys, neighbor_keys)
+        np.minimum(slots, len(sorted_keys) - 1, out=slots)
+        found = sorted_keys[slots] == neighbor_keys
+
+        rows = np.nonzero(found)[0]
+        columns = order[slots[found]]
+        return int(self.pair_energies[rows, columns].sum())
+
+    def contact_energy(self, index: int, key: int, occupancy: dict) -> int:
+        """
+        Calculates the bond energy an amino acid adds when it is placed on a
+        lattice site next to already placed amino acids. Used to score a chain
+        that grows one amino acid at a time from the score of its prefix.
+
+        Args:
+            index (int): Index of the amino acid that is placed.
+            key (int): Packed position of the site it is placed on.
+            occupancy (dict): Packed position -> index of every amino acid placed so far.
+
+        Returns:
+            int: The summed bond energy of the new contacts, chain neighbours excluded.
+        """
+        types = self.type_list
+        bond_energies = BOND_ENERGY_TABLE[types[index]]
+        if types[index] == 0:
+            return 0
+
+        energy = 0
+        for step in NEIGHBOR_KEY_STEPS:
+            other = occupancy.get(key + step)
+            if other is not None and abs(index - other) > 1:
+                energy += bond_energies[types[other]]
+        return energy
+
+    def batch_stability(self, conformations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calculates the stability of many conformations of the sequence in one
+        vectorized pass.
+
+        The packed keys of every conformation are shifted by a multiple of
+        BATCH_KEY_STRIDE, so all conformations share one sorted key array and
+        one binary search.
+
+        Args:
+            conformations (np.array): Either coordinates of shape (m, n, 3) or
+                direction codes of shape (m, n - 1).
+
+        Returns:
+            tuple: The m stability scores and m validity flags. A conformation is
+            valid when consecutive amino acids are lattice neighbours and no two
+            amino acids share a position; scores of invalid conformations are
+            not meaningful.
+        """
+        conformations = np.asarray(conformations)
+        if conformations.ndim == 2:
+            coordinates = coordinates_from_directions(conformations)
+        else:
+            coordinates = conformations.astype(np.int64)
+        count = len(coordinates)
+
+        keys = pack_coordinates(coordinates)
+        connected = (np.abs(np.diff(coordinates, axis=1)).sum(axis=2) == 1).all(axis=1)
+        self_avoiding = (np.diff(np.sort(keys, axis=1), axis=1) != 0).all(axis=1)
+        valid = connected & self_avoiding
+
+        if count == 0 or len(self.even) == 0 or len(self.odd) == 0:
+            return np.zeros(count, dtype=int), valid
+
+        keys += np.arange(count, dtype=np.int64)[:, None] * BATCH_KEY_STRIDE
+        odd_keys = keys[:, self.odd].ravel()
+        order = np.argsort(odd_keys)
+        sorted_keys = odd_keys[order]
+
+        neighbor_keys = keys[:, self.even][:, :, None] + NEIGHBOR_KEY_OFFSETS[None, None, :]
+        slots = np.searchsorted(sorted_keys, neighbor_keys)
+        np.minimum(slots, len(sorted_keys) - 1, out=slots)
+        found = sorted_keys[slots] == neighbor_keys
+
+        conformation_rows, even_rows, _ = np.nonzero(found)
+        odd_columns = order[slots[found]] % len(self.odd)
+        energies = self.pair_energies[even_rows, odd_columns]
+        scores = np.bincount(conformation_rows, weights=energies, minlength=count)
+        return scores.astype(int), valid
+
+
+@lru_cache(maxsize=64)
+def get_sequence_tables(sequence: str) -> SequenceTables:
+    """
+    Returns the (cached) stability tables of a sequence.
+
+    Args:
+        sequence (str): The protein sequence consisting of amino acids.
+
+    Returns:
+        SequenceTables: The precomputed tables.
+    """
+    return SequenceTables(sequence)
+
+
+def batch_stability(sequence: str, conformations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the stability and validity of many conformations of one sequence.
+
+    Args:
+        sequence (str): The protein sequence consisting of amino acids.
+        conformations (np.array): Coordinates of shape (m, n, 3) or direction codes of shape (m, n - 1).
+
+    Returns:
+        tuple: The m stability scores and m validity flags.
+    """
+    return get_sequence_tables(sequence).batch_stability(conformations)
@@ -0,0 +1,139 @@
+from itertools import permutations, product
+
+import numpy as np
+
+# Coordinates are shifted by PACK_OFFSET so every component fits in [0, PACK_BASE)
+PACK_OFFSET = 1024
+PACK_BASE = 2048
+
+# The six neighbouring sites of a site on the cubic lattice
+NEIGHBOR_OFFSETS = np.array([
+    [0, 1, 0], [1, 0, 0], [0, 0, 1],  # Positive directions
+    [0, -1, 0], [-1, 0, 0], [0, 0, -1]  # Negative directions
+])
+
+
+def pack_coordinates(coordinates: np.ndarray) -> np.ndarray:
+    """
+    Packs lattice coordinates into single integers, so positions can be used
+    as dictionary keys or compared and sorted as plain numbers.
+
+    Args:
+        coordinates (np.array): Array of shape (..., 3) with lattice coordinates.
+
+    Returns:
+        np.array: Array of shape (...) with one packed integer per position.
+    """
+    shifted = np.asarray(coordinates, dtype=np.int64) + PACK_OFFSET
+    return (shifted[..., 0] * PACK_BASE + shifted[..., 1]) * PACK_BASE + shifted[..., 2]
+
+
+def pack_position(position) -> int:
+    """
+    Packs a single lattice position into an integer.
+
+    Args:
+        position: Sequence of three lattice coordinates.
+
+    Returns:
+        int: The packed position.
+    """
+    x, y, z = (int(value) + PACK_OFFSET for value in position)
+    return (x * PACK_BASE + y) * PACK_BASE + z
+
+
+# Differences between the packed key of a site and the keys of its six neighbours
+NEIGHBOR_KEY_OFFSETS = pack_coordinates(NEIGHBOR_OFFSETS) - pack_coordinates(np.zeros(3))
+NEIGHBOR_KEY_STEPS = NEIGHBOR_KEY_OFFSETS.tolist()  # Plain integers, for fast dictionary lookups
+
+# Unit step of every direction code -3..3 (x = +-1, y = +-2, z = +-3), indexed by code + 3
+DIRECTION_VECTORS = np.array([
+    [0, 0, -1], [0, -1, 0], [-1, 0, 0],
+    [0, 0, 0],
+    [1, 0, 0], [0, 1, 0], [0, 0, 1]
+])
+
+# Difference in packed key of one step in every direction code, indexed by code + 3
+DIRECTION_KEY_STEPS = (pack_coordinates(DIRECTION_VECTORS) - pack_coordinates(np.zeros(3))).tolist()
+
+# The 47 symmetries of the cubic lattice other than the identity: every
+# permutation of the axes combined with every choice of signs (rotations and reflections)
+LATTICE_SYMMETRIES = [
+    matrix for matrix in (
+        np.array([[sign[row] * (column == permutation[row]) for column in range(3)] for row in range(3)])
+        for permutation in permutations(range(3)) for sign in product((1, -1), repeat=3))
+    if not np.array_equal(matrix, np.eye(3))
+]
+
+
+def coordinates_from_directions(directions: np.ndarray) -> np.ndarray:
+    """
+    Builds lattice coordinates from direction codes with a cumulative sum.
+    The first amino acid is placed at the origin.
+
+    Args:
+        directions (np.array): Array of shape (..., n - 1) with codes +-1 (x), +-2 (y) or +-3 (z).
+
+    Returns:
+        np.array: Array of shape (..., n, 3) with the coordinates of every amino acid.
+    """
+    steps = DIRECTION_VECTORS[np.asarray(directions, dtype=np.int64) + 3]
+    coordinates = np.zeros(steps.shape[:-2] + (steps.shape[-2] + 1, 3), dtype=np.int64)
+    np.cumsum(steps, axis=-2, out=coordinates[..., 1:, :])
+    return coordinates
+
+
+def directions_from_coordinates(coordinates: np.ndarray) -> np.ndarray:
+    """
+    Derives the direction codes of a chain from its lattice coordinates.
+    This is the inverse of coordinates_from_directions.
+
+    Args:
+        coordinates (np.array): Array of shape (..., n, 3) with the coordinates of every amino acid.
+
+    Returns:
+        np.array: Array of shape (..., n - 1) with codes +-1 (x), +-2 (y) or +-3 (z).
+    """
+    steps = np.diff(np.asarray(coordinates, dtype=np.int64), axis=-2)
+    return (steps @ np.array([1, 2, 3])).astype(np.int8)
+
+
+def encode_directions(directions) -> bytes:
+    """
+    Encodes direction codes as a compact byte string with one byte per step.
+
+    Args:
+        directions: Sequence of direction codes +-1, +-2 or +-3.
+
+    Returns:
+        bytes: The encoded directions.
+    """
+    return (np.asarray(directions, dtype=np.int8) + 3).astype(np.uint8).tobytes()
+
+
+def decode_directions(encoded: bytes) -> np.ndarray:
+    """
+    Decodes a byte string made by encode_directions.
+
+    Args:
+        encoded (bytes): The encoded directions.
+
+    Returns:
+        np.array: The direction codes.
+    """
+    return np.frombuffer(encoded, dtype=np.uint8).astype(np.int8) - 3
+
+
+def direction_permutations(rotation_matrices: np.ndarray) -> np.ndarray:
+    """
+    Calculates how every rotation matrix maps the direction codes.
+
+    Args:
+        rotation_matrices (np.array): The rotation matrices, shape (r, 3, 3).
+
+    Returns:
+        np.array: For every rotation, the rotated direction code + 3 of every direction code + 3, shape (r, 7).
+    """
+    vector_codes = {tuple(vector): index for index, vector in enumerate(DIRECTION_VECTORS.tolist())}
+    return np.array([[vector_codes[tuple(matrix @ vector)] for vector in DIRECTION_VECTORS.tolist()]
+                     for matrix in rotation_matrices])
@@ -0,0 +1,252 @@
+from code.classes.protein import Protein, ROTATION_MATRICES
+from code.classes.lattice import LATTICE_SYMMETRIES
+
+import random
+import numpy as np
+
+# The move sets an algorithm can draw its moves from
+MOVE_SETS = ("rotations", "symmetries", "local", "all")
+
+# The six unit steps on the cubic lattice, as tuples for fast arithmetic
+UNIT_STEPS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+
+
+class Move:
+    """
+    A move of a consecutive block of amino acids. A pivot move also keeps its
+    pivot and matrix, so it can use the fast pivot checks of Protein.
+    """
+
+    __slots__ = ("start_index", "positions", "pivot_index", "rotation_matrix")
+
+    def __init__(self, start_index: int, positions: list = None, pivot_index: int = None,
+                 rotation_matrix: np.ndarray = None) -> None:
+        """
+        Initializes the move.
+
+        Args:
+            start_index (int): Index of the first amino acid that moves.
+            positions (list): The new positions of the moved amino acids (local moves).
+            pivot_index (int): Index of the pivot amino acid (pivot moves).
+            rotation_matrix (np.array): The rotation or reflection of the tail (pivot moves).
+        """
+        self.start_index = start_index
+        self.positions = positions
+        self.pivot_index = pivot_index
+        self.rotation_matrix = rotation_matrix
+
+
+def adjacent(first: tuple, second: tuple) -> bool:
+    """
+    Returns:
+        bool: True if two lattice positions are neighbours.
+    """
+    return abs(first[0] - second[0]) + abs(first[1] - second[1]) + abs(first[2] - second[2]) == 1
+
+
+def end_moves(protein: Protein, index: int) -> list[Move]:
+    """
+    Finds the end moves of the first or last amino acid: it moves to another
+    free site next to its only chain neighbour.
+
+    Args:
+        protein (Protein): The protein.
+        index (int): Index of the amino acid, only the first and last have end moves.
+
+    Returns:
+        list[Move]: The end moves.
+    """
+    n = len(protein.positions)
+    if n < 2 or index not in (0, n - 1):
+        return []
+
+    neighbour = protein.positions[1 if index == 0 else n - 2].tolist()
+    moves = []
+    for step in UNIT_STEPS:
+        site = (neighbour[0] + step[0], neighbour[1] + step[1], neighbour[2] + step[2])
+        if protein.occupant(site) is None:
+            moves.append(Move(index, [site]))
+    return moves
+
+
+def crankshaft_moves(protein: Protein, index: int) -> list[Move]:
+    """
+    Finds the crankshaft moves of the amino acids index and index + 1: when
+    they form a U with their outer neighbours, the pair turns around the axis
+    through those neighbours.
+
+    Args:
+        protein (Protein): The protein.
+        index (int): Index of the first amino acid of the pair.
+
+    Returns:
+        list[Move]: The crankshaft moves.
+    """
+    n = len(protein.positions)
+    if index < 1 or index + 2 >= n:
+        return []
+
+    before = protein.positions[index - 1].tolist()
+    after = protein.positions[index + 2].tolist()
+    if not adjacent(before, after):
+        return []
+
+    axis = (after[0] - before[0], after[1] - before[1], after[2] - before[2])
+    current = protein.positions[index].tolist()
+    moves = []
+    for step in UNIT_STEPS:
+        if step[0] * axis[0] + step[1] * axis[1] + step[2] * axis[2] != 0:
+            continue
+        first = (before[0] + step[0], before[1] + step[1], before[2] + step[2])
+        if list(first) == current:
+            continue
+        second = (after[0] + step[0], after[1] + step[1], after[2] + step[2])
+        if protein.occupant(first) is None and protein.occupant(second) is None:
+            moves.append(Move(index, [first, second]))
+    return moves
+
+
+def pull_moves(protein: Protein, index: int, direction: int) -> list[Move]:
+    """
+    Finds the pull moves of an amino acid (Lesh et al., 2003). The amino acid
+    moves to a free site L next to its chain neighbour on one side and
+    diagonal to its old site. When its chain neighbour on the other side is
+    not next to L, that neighbour moves to the site C between L and the old
+    site, and the chain on that side is pulled along, every amino acid taking
+    the old site of the amino acid two places further, until the chain is
+    connected again.
+
+    Args:
+        protein (Protein): The protein.
+        index (int): Index of the amino acid to pull.
+        direction (int): -1 to pull the chain before the amino acid along, 1 for the chain after it.
+
+    Returns:
+        list[Move]: The pull moves.
+    """
+    n = len(protein.positions)
+    anchor_index = index - direction
+    if not 0 <= anchor_index < n:
+        return []
+
+    positions = protein.positions
+    anchor = positions[anchor_index].tolist()
+    current = positions[index].tolist()
+    bond = (current[0] - anchor[0], current[1] - anchor[1], current[2] - anchor[2])
+
+    moves = []
+    for step in UNIT_STEPS:
+        if step[0] * bond[0] + step[1] * bond[1] + step[2] * bond[2] != 0:
+            continue
+        site_l = [anchor[0] + step[0], anchor[1] + step[1], anchor[2] + step[2]]
+        site_c = [current[0] + step[0], current[1] + step[1], current[2] + step[2]]
+        if protein.occupant(site_l) is not None:
+            continue
+
+        new_positions = {index: site_l}
+        follower = index + direction
+        if 0 <= follower < n and positions[follower].tolist() != site_c:
+            if protein.occupant(site_c) is not None:
+                continue
+            new_positions[follower] = site_c
+            other = follower + direction
+            while 0 <= other < n and not adjacent(positions[other].tolist(), new_positions[other - direction]):
+                new_positions[other] = positions[other - 2 * direction].tolist()
+                other += direction
+
+        start_index = min(new_positions)
+        block = [new_positions[i] for i in range(start_index, start_index + len(new_positions))]
+        moves.append(Move(start_index, block))
+    return moves
+
+
+class MoveSet:
+    """
+    Draws random moves for the local search algorithms.
+
+    - rotations: pivot moves with the six 90 degree rotations (the original move set).
+    - symmetries: pivot moves with all 47 non-identity lattice symmetries,
+      so 180 degree turns and reflections take one move.
+    - local: end, crankshaft and pull moves, which only change a few amino
+      acids and still find room in compact foldings.
+    - all: half pivot moves with all symmetries, half local moves.
+    """
+
+    def __init__(self, name: str = "rotations") -> None:
+        """
+        Initializes the move set.
+
+        Args:
+            name (str): "rotations", "symmetries", "local" or "all".
+        """
+        if name not in MOVE_SETS:
+            raise ValueError(f"Unknown move set '{name}', choose from {MOVE_SETS}.")
+
+        self.name = name
+        self.pivot_matrices = []
+        if name == "rotations":
+            self.pivot_matrices = list(ROTATION_MATRICES.values())
+        elif name in ("symmetries", "all"):
+            self.pivot_matrices = list(LATTICE_SYMMETRIES)
+        self.local = name in ("local", "all")
+
+    def random_move(self, protein: Protein) -> Move | None:
+        """
+        Draws a random move and checks it.
+
+        Args:
+            protein (Protein): The protein to move.
+
+        Returns:
+            Move | None: The move, or None when the drawn move is not valid.
+        """
+        n = len(protein.positions)
+        if n < 2:
+            return None
+
+        if self.pivot_matrices and (not self.local or random.random() < 0.5):
+            pivot_index = random.randrange(n - 1)
+            rotation_matrix = random.choice(self.pivot_matrices)
+            if not protein.is_rotation_valid(pivot_index, rotation_matrix):
+                return None
+            return Move(pivot_index + 1, pivot_index=pivot_index, rotation_matrix=rotation_matrix)
+
+        index = random.randrange(n)
+        moves = end_moves(protein, index) + crankshaft_moves(protein, index)
+        moves += pull_moves(protein, index, -1) + pull_moves(protein, index, 1)
+        if not moves:
+            return None
+        move = random.choice(moves)
+        if not protein.is_block_valid(move.start_index, move.positions):
+            return None
+        return move
+
+    @staticmethod
+    def stability_delta(protein: Protein, move: Move) -> int:
+        """
+        Calculates the change in stability of a valid move without applying it.
+
+        Args:
+            protein (Protein): The protein.
+            move (Move): The move.
+
+        Returns:
+            int: The stability after the move minus the stability before it.
+        """
+        if move.rotation_matrix is not None:
+            return protein.stability_delta(move.pivot_index, move.rotation_matrix)
+        return protein.block_stability_delta(move.start_index, move.positions)
+
+    @staticmethod
+    def apply(protein: Protein, move: Move) -> None:
+        """
+        Applies a valid move to the protein.
+
+        Args:
+            protein (Protein): The protein.
+            move (Move): The move.
+        """
+        if move.rotation_matrix is not None:
+            protein.rotate_protein(move.pivot_index, move.rotation_matrix)
+        else:
+            protein.move_amino_acids(move.start_index, move.positions)
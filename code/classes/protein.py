@@ -1,11 +1,91 @@
+from code.classes.energy import BOND_ENERGY_TABLE, get_sequence_tables
+from code.classes.bounds import lower_bound
+from code.classes.lattice import (
+    LATTICE_SYMMETRIES, NEIGHBOR_KEY_STEPS, NEIGHBOR_OFFSETS, coordinates_from_directions, decode_directions,
+    directions_from_coordinates, encode_directions, pack_coordinates, pack_position
+)
+
 import numpy as np
 
+# Coordinates stay within +-len(sequence) of the origin, so a small integer type suffices
+COORDINATE_DTYPE = np.int16
+
+ROTATION_MATRICES = {
+    "x_positive": np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]]),
+    "x_negative": np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]]),
+    "y_positive": np.array([[0, 0, -1], [0, 1, 0], [1, 0, 0]]),
+    "y_negative": np.array([[0, 0, 1], [0, 1, 0], [-1, 0, 0]]),
+    "z_positive": np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]]),
+    "z_negative": np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]])
+}
+
+
+class AminoAcidView:
+    """
+    Dictionary-like view on a single amino acid of a protein.
+
+    Kept for code that still reads ``amino_acids[i]["position"]``. Reading a
+    position returns a copy, writing a position updates the coordinate buffer
+    of the protein.
+    """
+
+    __slots__ = ("protein", "index")
+
+    def __init__(self, protein: "Protein", index: int) -> None:
+        """
+        Initializes the view.
+
+        Args:
+            protein (Protein): The protein the amino acid belongs to.
+            index (int): Index of the amino acid in the sequence.
+        """
+        self.protein = protein
+        self.index = index
+
+    def __getitem__(self, key: str):
+        if key == "position":
+            return self.protein.positions[self.index].astype(int)
+        elif key == "type":
+            return self.protein.sequence[self.index]
+        elif key == "index":
+            return self.index
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key != "position":
+            raise KeyError(f"Only the position of an amino acid can be changed, not '{key}'.")
+        self.protein.set_position(self.index, value)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> list:
+        return ["type", "position", "index"]
+
+    def __repr__(self) -> str:
+        return f"{{'type': '{self['type']}', 'position': {self['position']}, 'index': {self.index}}}"
+
+
 class Protein:
     """
     Represents a protein structure and provides methods for manipulation,
     rotation, and stability calculation in a 3D space.
+
+    The coordinates are stored in one contiguous (n, 3) integer array and the
+    amino acid types in an array of type codes. ``amino_acids`` offers a
+    dictionary-like view on both for existing code. ``occupancy`` maps every
+    packed lattice position to the index of the amino acid placed on it.
+
+    Moves made with apply_move are recorded in a journal, so they can be
+    reverted with undo_move. snapshot and restore save and load only the
+    coordinate buffer, which is far cheaper than a deep copy.
     """
 
+    __slots__ = ("sequence", "types", "positions", "occupancy", "tables", "journal", "_amino_acids")
+
     def __init__(self, sequence: str = None):
         """
         Initializes the protein object.
@@ -14,21 +94,125 @@ class Protein:
             sequence (str): The protein sequence consisting of amino acids.
         """
         self.sequence = sequence
-        self.amino_acids = []  # Stores amino acid positions and types
+        self.types = np.zeros(0, dtype=np.int8)  # Type code of every amino acid
+        self.positions = np.zeros((0, 3), dtype=COORDINATE_DTYPE)  # Position of every amino acid
+        self.occupancy = {}  # Packed position -> index of the amino acid on it
+        self.tables = get_sequence_tables(sequence)  # Precomputed tables for the stability kernel
+        self.journal = []  # (start index, old positions) of every applied move that can be undone
+        self._amino_acids = None
         self.initialize_protein_structure()
 
+    @classmethod
+    def from_directions(cls, sequence: str, directions) -> "Protein":
+        """
+        Builds a protein from the direction code of every step along the chain,
+        with the first amino acid at the origin.
+
+        Args:
+            sequence (str): The protein sequence consisting of amino acids.
+            directions: The len(sequence) - 1 direction codes, +-1 (x), +-2 (y) or +-3 (z),
+                or a byte string made by to_bytes.
+
+        Returns:
+            Protein: The protein in the described conformation.
+        """
+        if isinstance(directions, (bytes, bytearray)):
+            directions = decode_directions(directions)
+        protein = cls(sequence)
+        protein.positions[:] = coordinates_from_directions(directions)
+        protein.rebuild_occupancy()
+        return protein
+
+    @classmethod
+    def from_bytes(cls, sequence: str, encoded: bytes) -> "Protein":
+        """
+        Builds a protein from a byte string made by to_bytes.
+
+        Args:
+            sequence (str): The protein sequence consisting of amino acids.
+            encoded (bytes): The encoded directions.
+
+        Returns:
+            Protein: The protein in the described conformation.
+        """
+        return cls.from_directions(sequence, decode_directions(encoded))
+
+    def to_directions(self) -> list[int]:
+        """
+        Returns the direction code of every step along the chain.
+
+        Returns:
+            list[int]: Codes +-1 (x), +-2 (y) or +-3 (z), one per step.
+        """
+        return directions_from_coordinates(self.positions).tolist()
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the conformation as one byte per step. Equal conformations give
+        equal byte strings, so the result can be stored, hashed and compared.
+
+        Returns:
+            bytes: The encoded directions.
+        """
+        return encode_directions(directions_from_coordinates(self.positions))
+
     def initialize_protein_structure(self) -> None:
         """
         Initializes the protein structure with default positions in 3D space.
         Each amino acid is placed along the x-axis initially.
         """
         if self.sequence:
-            for index, amino_acid in enumerate(self.sequence):
-                self.amino_acids.append({
-                    "type": amino_acid,
-                    "position": np.array([index, 0, 0]),
-                    "index": index
-                })
+            length = len(self.sequence)
+            self.types = self.tables.types
+            self.positions = np.zeros((length, 3), dtype=COORDINATE_DTYPE)
+            self.positions[:, 0] = np.arange(length)
+            self.rebuild_occupancy()
+
+    def rebuild_occupancy(self) -> None:
+        """
+        Rebuilds the occupancy index from the coordinate buffer.
+        """
+        self.occupancy = {key: index for index, key in enumerate(pack_coordinates(self.positions).tolist())}
+
+    def occupant(self, position: np.ndarray) -> int | None:
+        """
+        Looks up which amino acid occupies a lattice position.
+
+        Args:
+            position (np.array): The lattice position.
+
+        Returns:
+            int | None: Index of the amino acid on the position, or None if it is free.
+        """
+        return self.occupancy.get(pack_position(position))
+
+    @property
+    def amino_acids(self) -> list:
+        """
+        list: Dictionary-like views with the type, position and index of every amino acid.
+        """
+        if self._amino_acids is None:
+            self._amino_acids = [AminoAcidView(self, index) for index in range(len(self.positions))]
+        return self._amino_acids
+
+    @amino_acids.setter
+    def amino_acids(self, amino_acids: list) -> None:
+        self.positions = np.array([amino_acid["position"] for amino_acid in amino_acids], dtype=COORDINATE_DTYPE).reshape(-1, 3)
+        self.rebuild_occupancy()
+
+    def set_position(self, index: int, position: np.ndarray) -> None:
+        """
+        Places a single amino acid at a new position.
+
+        Args:
+            index (int): Index of the amino acid.
+            position (np.array): The new position.
+        """
+        old_key = pack_position(self.positions[index])
+        if self.occupancy.get(old_key) == index:
+            del self.occupancy[old_key]
+        self.positions[index] = position
+        self.occupancy[pack_position(self.positions[index])] = index
 
     def calculate_neighbors(self, position: np.ndarray) -> list:
         """
@@ -52,6 +236,44 @@ class Protein:
         Bonds between hydrophobic (H) and/or cysteine (C) amino acids contribute
         to the stability score.
 
+        Uses the vectorized kernel of the precomputed sequence tables.
+
+        Returns:
+            int: The total stability score of the protein.
+        """
+        return self.tables.stability(self.positions)
+
+    def lower_bound(self, optimum: int = None) -> int:
+        """
+        Returns the lowest stability any folding of the sequence can reach,
+        see code.classes.bounds.lower_bound.
+
+        Args:
+            optimum (int): Optional best known stability of the sequence for this run.
+
+        Returns:
+            int: The recorded optimum of the sequence, the given optimum or its parity bound.
+        """
+        return lower_bound(self.sequence, optimum)
+
+    def batch_stability(self, conformations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calculates the stability of many conformations of this sequence in one
+        vectorized pass, without changing the protein.
+
+        Args:
+            conformations (np.array): Coordinates of shape (m, n, 3) or direction codes of shape (m, n - 1).
+
+        Returns:
+            tuple: The m stability scores and m validity flags.
+        """
+        return self.tables.batch_stability(conformations)
+
+    def calculate_stability_reference(self) -> int:
+        """
+        Reference implementation of calculate_stability, which checks every
+        neighbour of every H and C amino acid against the whole chain.
+
         Returns:
             int: The total stability score of the protein.
         """
@@ -70,6 +292,102 @@ class Protein:
                                 stability_score += bond_score
         return stability_score // 2  # Each bond is counted twice, so divide by 2
 
+    def stability_delta(self, pivot_index: int, rotation_matrix: np.ndarray) -> int:
+        """
+        Calculates the change in stability of a pivot move without applying it.
+
+        A pivot move only changes the contacts between the rotated tail and the
+        fixed part up to the pivot, so only the H and C amino acids in the tail
+        are looked at. The move is assumed to be valid.
+
+        Args:
+            pivot_index (int): Index of the pivot amino acid.
+            rotation_matrix (np.array): Rotation matrix of the move.
+
+        Returns:
+            int: The stability after the move minus the stability before it.
+        """
+        tail_bonding = np.flatnonzero(self.types[pivot_index + 1:] > 0)
+        if len(tail_bonding) == 0 or not (self.types[:pivot_index + 1] > 0).any():
+            return 0
+
+        new_positions = self.rotated_tail(pivot_index, rotation_matrix)[tail_bonding]
+        tail_bonding += pivot_index + 1
+        old_energy = self.head_contact_energy(tail_bonding, self.positions[tail_bonding], pivot_index)
+        new_energy = self.head_contact_energy(tail_bonding, new_positions, pivot_index)
+        return new_energy - old_energy
+
+    def block_stability_delta(self, start_index: int, positions: np.ndarray) -> int:
+        """
+        Calculates the change in stability when a consecutive block of amino
+        acids moves to new positions (a local move), without applying it.
+
+        Unlike a pivot move, a local move changes the contacts inside the block
+        as well, so every contact of a moved amino acid is looked at before and
+        after the move. The move is assumed to be valid.
+
+        Args:
+            start_index (int): Index of the first amino acid of the block.
+            positions (np.array): The new positions, one row per amino acid.
+
+        Returns:
+            int: The stability after the move minus the stability before it.
+        """
+        end_index = start_index + len(positions)
+        occupancy = self.occupancy
+        type_list = self.tables.type_list
+        old_keys = pack_coordinates(self.positions[start_index:end_index]).tolist()
+        new_keys = pack_coordinates(np.asarray(positions)).tolist()
+        new_occupancy = dict(zip(new_keys, range(start_index, end_index)))
+
+        delta = 0
+        for index, old_key, new_key in zip(range(start_index, end_index), old_keys, new_keys):
+            if type_list[index] == 0:
+                continue
+            bond_energies = BOND_ENERGY_TABLE[type_list[index]]
+            for offset in NEIGHBOR_KEY_STEPS:
+                # Contacts inside the block are counted once, at the lower index
+                other = occupancy.get(old_key + offset)
+                if other is not None and abs(index - other) > 1 and \
+                        (other > index or not start_index <= other < end_index):
+                    delta -= bond_energies[type_list[other]]
+
+                other = new_occupancy.get(new_key + offset)
+                if other is None:
+                    other = occupancy.get(new_key + offset)
+                    if other is not None and start_index <= other < end_index:
+                        continue  # A site the block leaves
+                elif other < index:
+                    continue
+                if other is not None and abs(index - other) > 1:
+                    delta += bond_energies[type_list[other]]
+        return delta
+
+    def head_contact_energy(self, indices: np.ndarray, positions: np.ndarray, pivot_index: int) -> int:
+        """
+        Calculates the bond energy between amino acids placed at the given
+        positions and the amino acids up to and including the pivot.
+
+        Args:
+            indices (np.array): Indices of the amino acids after the pivot.
+            positions (np.array): Positions to evaluate them at, one row per index.
+            pivot_index (int): Index of the pivot amino acid.
+
+        Returns:
+            int: The summed bond energy of all contacts with the fixed part.
+        """
+        neighbor_keys = pack_coordinates(positions[:, None, :] + NEIGHBOR_OFFSETS[None, :, :])
+        occupancy = self.occupancy
+        types = self.types
+        energy = 0
+        for index, keys in zip(indices.tolist(), neighbor_keys.tolist()):
+            bond_energies = BOND_ENERGY_TABLE[types[index]]
+            for key in keys:
+                other = occupancy.get(key)
+                if other is not None and other <= pivot_index and index - other > 1:
+                    energy += bond_energies[types[other]]
+        return energy
+
     def calculate_bond_score(self, type1: str, type2: str) -> int:
         """
         Calculate the bond score between two amino acid types.
@@ -96,10 +414,10 @@ class Protein:
             pivot_index (int): Index of the pivot amino acid.
             rotation_matrix (np.array): Rotation matrix to apply.
         """
-        pivot_position = self.amino_acids[pivot_index]["position"]
-        relative_position = self.amino_acids[amino_index]["position"] - pivot_position
+        pivot_position = self.positions[pivot_index]
+        relative_position = self.positions[amino_index] - pivot_position
         rotated_position = np.dot(rotation_matrix, relative_position)
-        self.amino_acids[amino_index]["position"] = rotated_position + pivot_position
+        self.set_position(amino_index, rotated_position + pivot_position)
 
     def rotate_protein(self, pivot_index: int, rotation_matrix: np.ndarray) -> None:
         """
@@ -109,8 +427,103 @@ class Protein:
             pivot_index (int): Index of the pivot amino acid.
             rotation_matrix (np.array): Rotation matrix to apply.
         """
-        for i in range(pivot_index + 1, len(self.amino_acids)):
-            self.rotate_amino_acid(i, pivot_index, rotation_matrix)
+        self.move_amino_acids(pivot_index + 1, self.rotated_tail(pivot_index, rotation_matrix))
+
+    def move_amino_acids(self, start_index: int, positions: np.ndarray) -> None:
+        """
+        Places a consecutive block of amino acids at new positions and keeps
+        the occupancy index up to date.
+
+        Args:
+            start_index (int): Index of the first amino acid to move.
+            positions (np.array): The new positions, one row per amino acid.
+        """
+        end_index = start_index + len(positions)
+        occupancy = self.occupancy
+        for index, key in enumerate(pack_coordinates(self.positions[start_index:end_index]).tolist(), start_index):
+            if occupancy.get(key) == index:
+                del occupancy[key]
+        self.positions[start_index:end_index] = positions
+        for index, key in enumerate(pack_coordinates(self.positions[start_index:end_index]).tolist(), start_index):
+            occupancy[key] = index
+
+    def rotated_tail(self, pivot_index: int, rotation_matrix: np.ndarray) -> np.ndarray:
+        """
+        Calculates the positions of all amino acids after the pivot when rotated,
+        without changing the protein.
+
+        Args:
+            pivot_index (int): Index of the pivot amino acid.
+            rotation_matrix (np.array): Rotation matrix to apply.
+
+        Returns:
+            np.array: The rotated positions of the amino acids after the pivot.
+        """
+        pivot_position = self.positions[pivot_index].astype(np.int64)
+        relative_positions = self.positions[pivot_index + 1:] - pivot_position
+        return relative_positions @ np.asarray(rotation_matrix).T + pivot_position
+
+    def pivot_foldings(self, pivot_indices: np.ndarray, rotation_matrices: np.ndarray) -> np.ndarray:
+        """
+        Calculates the foldings after many pivot moves at once, without changing
+        the protein. The foldings can be scored with batch_stability.
+
+        Args:
+            pivot_indices (np.array): The pivot of every move, shape (m,).
+            rotation_matrices (np.array): The rotation matrix of every move, shape (m, 3, 3).
+
+        Returns:
+            np.array: The coordinates after every move, shape (m, n, 3).
+        """
+        positions = self.positions.astype(np.int64)
+        pivot_positions = positions[pivot_indices][:, None, :]
+        rotated = np.einsum('mij,mkj->mki', rotation_matrices, positions[None] - pivot_positions) + pivot_positions
+        tail = np.arange(len(positions))[None, :] > np.asarray(pivot_indices)[:, None]
+        return np.where(tail[:, :, None], rotated, positions[None])
+
+    def apply_move(self, pivot_index: int, rotation_matrix: np.ndarray) -> None:
+        """
+        Applies a pivot move and records it in the journal, so it can be undone.
+
+        Args:
+            pivot_index (int): Index of the pivot amino acid.
+            rotation_matrix (np.array): Rotation matrix to apply.
+        """
+        self.journal.append((pivot_index + 1, self.positions[pivot_index + 1:].copy()))
+        self.rotate_protein(pivot_index, rotation_matrix)
+
+    def undo_move(self) -> None:
+        """
+        Reverts the most recent move in the journal.
+        """
+        start_index, old_positions = self.journal.pop()
+        self.move_amino_acids(start_index, old_positions)
+
+    def commit_moves(self) -> None:
+        """
+        Accepts all moves in the journal, so they can no longer be undone.
+        """
+        self.journal.clear()
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Saves the current conformation.
+
+        Returns:
+            np.array: A copy of the coordinate buffer.
+        """
+        return self.positions.copy()
+
+    def restore(self, snapshot: np.ndarray) -> None:
+        """
+        Restores a conformation saved with snapshot and clears the journal.
+
+        Args:
+            snapshot (np.array): A coordinate buffer returned by snapshot.
+        """
+        self.positions[:] = snapshot
+        self.rebuild_occupancy()
+        self.journal.clear()
 
     def find_valid_rotations(self, pivot_index: int) -> list:
         """
@@ -133,6 +546,10 @@ class Protein:
         """
         Checks if a rotation is valid for a given pivot and rotation matrix.
 
+        The rotated amino acids move as one rigid body, so they can only collide
+        with the amino acids up to and including the pivot. Each rotated position
+        is looked up in the occupancy index and the check stops at the first clash.
+
         Args:
             pivot_index (int): Index of the pivot amino acid.
             rotation_matrix (np.array): Rotation matrix to validate.
@@ -140,17 +557,31 @@ class Protein:
         Returns:
             bool: True if the rotation is valid, False otherwise.
         """
-        pivot_position = self.amino_acids[pivot_index]["position"]
-        for amino_acid in self.amino_acids:
-            if amino_acid["index"] > pivot_index:
-                original_position = amino_acid["position"]
-                relative_position = original_position - pivot_position
-                rotated_position = np.dot(rotation_matrix, relative_position) + pivot_position
-                if any(
-                    np.array_equal(rotated_position, other["position"])
-                    for other in self.amino_acids
-                ):
-                    return False
+        occupancy = self.occupancy
+        free = pivot_index + 1
+        for key in pack_coordinates(self.rotated_tail(pivot_index, rotation_matrix)).tolist():
+            if occupancy.get(key, free) <= pivot_index:
+                return False
+        return True
+
+    def is_block_valid(self, start_index: int, positions: np.ndarray) -> bool:
+        """
+        Checks if a consecutive block of amino acids can move to new positions,
+        that is if no new position is taken by an amino acid outside the block.
+
+        Args:
+            start_index (int): Index of the first amino acid of the block.
+            positions (np.array): The new positions, one row per amino acid.
+
+        Returns:
+            bool: True if the move is valid, False otherwise.
+        """
+        occupancy = self.occupancy
+        end_index = start_index + len(positions)
+        for key in pack_coordinates(np.asarray(positions)).tolist():
+            other = occupancy.get(key)
+            if other is not None and not start_index <= other < end_index:
+                return False
         return True
 
     def get_rotation_matrices(self) -> dict:
@@ -160,22 +591,57 @@ class Protein:
         Returns:
             dict: Dictionary of rotation matrices with labels.
         """
-        return {
-            "x_positive": np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]]),
-            "x_negative": np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]]),
-            "y_positive": np.array([[0, 0, -1], [0, 1, 0], [1, 0, 0]]),
-            "y_negative": np.array([[0, 0, 1], [0, 1, 0], [-1, 0, 0]]),
-            "z_positive": np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]]),
-            "z_negative": np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]])
-        }
+        return dict(ROTATION_MATRICES)
+
+    def get_symmetry_matrices(self) -> list:
+        """
+        Returns the 47 symmetries of the cubic lattice other than the identity,
+        the 90 degree rotations included, for pivot moves.
+
+        Returns:
+            list: The symmetry matrices.
+        """
+        return list(LATTICE_SYMMETRIES)
 
     def copy(self) -> "Protein":
         """
-        Creates a copy of the protein object.
+        Creates a copy of the protein object. Only the coordinate buffer and
+        occupancy index are copied, the sequence and tables are shared and the
+        journal starts empty.
 
         Returns:
             Protein: A copy of the current protein object.
         """
-        new_protein = Protein(self.sequence)
-        new_protein.amino_acids = self.amino_acids.copy()
+        new_protein = Protein.__new__(Protein)
+        new_protein.sequence = self.sequence
+        new_protein.types = self.types
+        new_protein.positions = self.positions.copy()
+        new_protein.occupancy = self.occupancy.copy()
+        new_protein.tables = self.tables
+        new_protein.journal = []
+        new_protein._amino_acids = None
         return new_protein
+
+    def __copy__(self) -> "Protein":
+        return self.copy()
+
+    def __deepcopy__(self, memo: dict) -> "Protein":
+        new_protein = self.copy()
+        memo[id(self)] = new_protein
+        return new_protein
+
+    def __getstate__(self) -> tuple:
+        return self.sequence, self.positions
+
+    def __setstate__(self, state: tuple) -> None:
+        sequence, positions = state
+        self.sequence = sequence
+        self.types = np.zeros(0, dtype=np.int8)
+        self.positions = np.zeros((0, 3), dtype=COORDINATE_DTYPE)
+        self.occupancy = {}
+        self.tables = get_sequence_tables(sequence)
+        self.journal = []
+        self._amino_acids = None
+        self.initialize_protein_structure()
+        self.positions = positions.copy()
+        self.rebuild_occupancy()
@@ -0,0 +1,104 @@
+import traceback
+
+
+class WorkerFailure:
+    """
+    The answer of a worker process whose work raised an exception, with the
+    traceback of the exception, so the coordinator can raise it instead of
+    waiting on a pipe that is closed.
+    """
+
+    def __init__(self, message: str) -> None:
+        """
+        Initializes the failure.
+
+        Args:
+            message (str): The formatted traceback of the exception in the worker.
+        """
+        self.message = message
+
+
+def report_failure(connection) -> None:
+    """
+    Sends the exception that is being handled to the coordinator, in a worker
+    process. Nothing is sent when the coordinator has already closed the pipe.
+
+    Args:
+        connection: The worker end of the pipe to the coordinator.
+    """
+    try:
+        connection.send(WorkerFailure(traceback.format_exc()))
+    except (BrokenPipeError, OSError):
+        pass
+
+
+def send_all(connections: list, messages: list, name: str) -> None:
+    """
+    Sends one message to every worker process.
+
+    Args:
+        connections (list): The coordinator ends of the pipes, one per worker.
+        messages (list): The message for every worker.
+        name (str): Name of a worker in error messages, for example "Replica".
+
+    Raises:
+        RuntimeError: If the pipe to a worker is broken, with the index of the worker.
+    """
+    for index, (connection, message) in enumerate(zip(connections, messages)):
+        try:
+            connection.send(message)
+        except (BrokenPipeError, OSError) as e:
+            raise RuntimeError(f"{name} {index} stopped before it got its message.") from e
+
+
+def receive_all(connections: list, name: str) -> list:
+    """
+    Receives one answer from every worker process.
+
+    Args:
+        connections (list): The coordinator ends of the pipes, one per worker.
+        name (str): Name of a worker in error messages, for example "Replica".
+
+    Returns:
+        list: The answer of every worker.
+
+    Raises:
+        RuntimeError: If a worker failed or stopped, with the index of the worker.
+    """
+    results = []
+    for index, connection in enumerate(connections):
+        try:
+            result = connection.recv()
+        except (EOFError, OSError) as e:
+            raise RuntimeError(f"{name} {index} stopped without an answer.") from e
+        if isinstance(result, WorkerFailure):
+            raise RuntimeError(f"{name} {index} failed:\n{result.message}")
+        results.append(result)
+    return results
+
+
+def stop_workers(connections: list, processes: list, timeout: float = 10.0) -> None:
+    """
+    Asks every worker process to stop with a message of None and waits for
+    all of them. Broken pipes are skipped, and a worker that does not stop
+    within the timeout is terminated, so no process is left behind.
+
+    Args:
+        connections (list): The coordinator ends of the pipes, one per worker.
+        processes (list): The worker processes.
+        timeout (float): Number of seconds to wait for every worker.
+    """
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass  # The worker has already stopped
+
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+    for connection in connections:
+        connection.close()
@@ -8,19 +8,23 @@ class Distribution:
     Class for visualizing the distribution of stability over different iterations.
     """
     
-    def __init__(self, stabilities: list[float] = None):
+    def __init__(self, stabilities: list[float] = None, log_weights: list[float] = None):
         """
         Initializes the Distribution class.
         
         Args:
             stabilities (list[float], optional): List of stability values. Defaults to None.
+            log_weights (list[float], optional): Log weight of every stability value,
+                for example the Rosenbluth weights of sampled walks. Defaults to equal weights.
         """
         self.stabilities = stabilities
+        self.log_weights = log_weights
 
     def visualize_stability_distribution_from_results(self, filename: str) -> None:
         """
         Creates a distribution plot of stability based on data from the second column of a CSV file
-        and saves it as a PNG file in the 'results/distribution' directory.
+        and saves it as a PNG file in the 'results/distribution' directory. The third column is only
+        used as a weight when its header is 'Log Weight' (the walks of Random Folding).
 
         Args:
             filename (str): Name of the CSV file located in the 'results' directory.
@@ -37,14 +41,18 @@ class Distribution:
         try:
             # Read the CSV file
             stabilities = []
+            log_weights = []
             with open(filepath, mode='r') as csvfile:
                 reader = csv.reader(csvfile)
-                next(reader)  # Skip header if present
+                header = next(reader, [])  # Skip header if present
+                weighted = len(header) > 2 and header[2] == 'Log Weight'
                 for row in reader:
                     if len(row) > 1:  # Ensure there is a second column
                         try:
                             stability = float(row[1])  # Extract stability value
+                            log_weight = float(row[2]) if weighted and len(row) > 2 and row[2] else 0.0
                             stabilities.append(stability)
+                            log_weights.append(log_weight)
                         except ValueError:
                             continue  # Skip rows with invalid values
             
@@ -55,6 +63,7 @@ class Distribution:
             
             # Set stability data for plotting
             self.stabilities = stabilities
+            self.log_weights = log_weights if weighted else None
             
             # Plot stability distribution
             self.plot_stability_distribution()
@@ -77,7 +86,12 @@ class Distribution:
         Plots the distribution of stability over different iterations.
         Sets the x-axis to integer values.
         """
-        plt.hist(self.stabilities, bins=30, edgecolor='black')
+        weights = None
+        if self.log_weights is not None and any(self.log_weights):
+            log_weights = np.array(self.log_weights)
+            weights = np.exp(log_weights - log_weights.max())
+            weights *= len(log_weights) / weights.sum()  # Scaled to the number of samples
+        plt.hist(self.stabilities, bins=30, weights=weights, edgecolor='black')
         plt.title('Distribution of Stability in Random Folding')
         plt.xlabel('Stability (integer values)')
         plt.ylabel('Frequency')
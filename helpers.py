@@ -3,16 +3,55 @@ from code.algorithms.random_algorithm import RandomFolding
 from code.algorithms.hillclimber import HillClimber
 from code.algorithms.beam_search import BeamSearchProteinFolding
 from code.algorithms.Simulatedannealing import SimulatedAnnealing
+from code.algorithms.branch_and_bound import BranchAndBound
+from code.algorithms.perm import PERM
+from code.algorithms.replica_exchange import ReplicaExchange
+from code.algorithms.vectorized_monte_carlo import VectorizedMonteCarlo
+from code.algorithms.tabu_search import TabuSearch
+from code.algorithms.genetic_algorithm import GeneticAlgorithm
+from code.algorithms.mcts import MCTS
+from code.classes.checkpoint import Checkpoint, get_random_state, set_random_state
 from code.classes.data_storing import DataStoring
+from code.classes.protein import Protein
 from code.classes.csv_functions import CsvFunctions
 from code.visualisation.visualize import ProteinVisualizer
 from code.visualisation.distribution import Distribution
 from datetime import datetime, timedelta
+from queue import Empty
 
 import matplotlib.pyplot as plt
-import os, time, csv
+import multiprocessing as mp
+import numpy as np
+import os, time, csv, random, traceback
 import helpers
 
+# The predefined benchmark sequences p1 - p9
+SEQUENCES = {
+    1: "HHPHHHPH",
+    2: "HHPHHHPHPHHHPH",
+    3: "HPHPPHHPHPPHPHHPPHPH",
+    4: "PPPHHPPHHPPPPPHHHHHHHPPHHPPPPHHPPHPP",
+    5: "HHPHPHPHPHHHHPHPPPHPPPHPPPPHPPPHPPPHPHHHHPHPHPHPHH",
+    6: "PPCHHPPCHPPPPCHHHHCHHPPHHPPPPHHPPHPP",
+    7: "CPPCHPPCHPPCPPHHHHHHCCPCHPPCPCHPPHPC",
+    8: "HCPHPCPHPCHCHPHPPPHPPPHPPPPHPCPHPPPHPHHHCCHCHCHCHH",
+    9: "HCPHPHPHCHHHHPCCPPHPPPHPPPPCPPPHPPPHPHHHHCHPHPHPHH"
+}
+
+# The algorithms that can be chosen in the menu
+ALGORITHMS = {
+    1: "Random Folding",
+    2: "Hillclimber",
+    3: "Greedy Folding",
+    4: "Beam search folding",
+    5: "Simulatedannealing folding",
+    6: "Branch and bound (exact)",
+    7: "PERM",
+    8: "Tabu search",
+    9: "Genetic algorithm",
+    10: "Monte Carlo tree search",
+}
+
 # Functions to retrieve users data via the terminal
 def get_sequence():
     """
@@ -21,17 +60,7 @@ def get_sequence():
     """
     sequence = None
 
-    sequences = {
-        1: "HHPHHHPH",
-        2: "HHPHHHPHPHHHPH",
-        3: "HPHPPHHPHPPHPHHPPHPH",
-        4: "PPPHHPPHHPPPPPHHHHHHHPPHHPPPPHHPPHPP",
-        5: "HHPHPHPHPHHHHPHPPPHPPPHPPPPHPPPHPPPHPHHHHPHPHPHPHH",
-        6: "PPCHHPPCHPPPPCHHHHCHHPPHHPPPPHHPPHPP",
-        7: "CPPCHPPCHPPCPPHHHHHHCCPCHPPCPCHPPHPC",
-        8: "HCPHPCPHPCHCHPHPPPHPPPHPPPPHPCPHPPPHPHHHCCHCHCHCHH",
-        9: "HCPHPHPHCHHHHPCCPPHPPPHPPPPCPPPHPPPHPHHHHCHPHPHPHH"
-    }
+    sequences = SEQUENCES
 
     print("Choose a sequence:")
     for key, value in sequences.items():
@@ -51,26 +80,20 @@ def get_sequence():
     return sequence
 
 def get_algorithm():
-    algorithm = {
-        1: "Random Folding",
-        2: "Hillclimber",
-        3: "Greedy Folding",
-        4: "Beam search folding",
-        5: "Simulatedannealing folding",
-    }
+    algorithm = ALGORITHMS
     print("Choose a algorithm:")
     for key, value in algorithm.items():
         print(f"{key}: {value}")
-    print("6: Other menu")
+    print("11: Other menu")
 
-    choice = input("Enter your choice (1, 2 ,3 ,4, 5 or 6): ").strip()
+    choice = input("Enter your choice (1 - 11): ").strip()
     try:
         choice = int(choice)
         if choice in algorithm:
             algorithm = algorithm[choice]
             return choice, algorithm
         else:
-            print("Invalid choice. Please enter a number between 1 and 5.")
+            print("Invalid choice. Please enter a number between 1 and 10.")
             return None
     except ValueError:
         print("Invalid input. Please enter a number.")
@@ -124,6 +147,30 @@ def get_minutes():
     x_times = int(x_times)
     return x_times
 
+def get_workers():
+    print("How many worker processes you want to use (1 runs everything in this process)")
+    workers = input(" ").strip()
+    workers = int(workers) if workers else 1
+    return max(1, workers)
+
+def get_seed():
+    print("Enter a seed for the random number generators (empty for a random seed)")
+    seed = input(" ").strip()
+    return int(seed) if seed else None
+
+def get_chains():
+    print("How many chains you want to run in lock-step (1 runs a single chain)")
+    chains = input(" ").strip()
+    chains = int(chains) if chains else 1
+    return max(1, chains)
+
+def get_resume(filename):
+    if not Checkpoint(get_checkpoint_path(filename)).exists():
+        return False
+    print(f"A checkpoint of an interrupted run was found for '{filename}'.")
+    resume = input("Do you want to resume it? (y/n): ").strip().lower()
+    return resume == "y"
+
 def get_sub_menu():
     print("1: Stability")
     print("2: Visualizer")
@@ -144,30 +191,79 @@ def run_algorithm(choice: int, protein, algorithm, filename):
     if choice == 1:
         # Perform random folding
         iterations = int(input("Enter the number of iterations for random folding: ").strip())
-        random_folding = RandomFolding(protein,data)
+        mode = input("Enter the random folding mode (pivot or walks): ").strip().lower() or "pivot"
+        random_folding = RandomFolding(protein,data, mode=mode)
         folded_protein = random_folding.execute(iterations=iterations)
     
     elif choice == 2:
         # Perform hillclimber folding
         max_iterations = int(input("Enter the number of iterations for random folding: ").strip())
-        hillclimber_folding = HillClimber( protein,max_iterations=max_iterations,data = data)
-        folded_protein = hillclimber_folding.execute()
+        chains = get_chains()
+        if chains > 1:
+            lock_step = VectorizedMonteCarlo(data, protein, chains=chains, annealing=False, max_steps=max_iterations)
+            folded_protein = lock_step.execute()
+        else:
+            mode = input("Enter the hillclimber mode (random, steepest or first): ").strip().lower() or "random"
+            hillclimber_folding = HillClimber( protein,max_iterations=max_iterations,data = data, mode=mode)
+            folded_protein = hillclimber_folding.execute()
     
     elif choice == 3:
-        # Perform greedy folding
-        greedy_folding = GreedyFolding(data, protein)
+        # Perform greedy folding, constructive when a lookahead is given
+        lookahead = input("Enter the lookahead for greedy folding (empty for the hybrid greedy): ").strip()
+        greedy_folding = GreedyFolding(data, protein, lookahead=int(lookahead) if lookahead else None)
         folded_protein = greedy_folding.execute()
 
     elif choice == 4:
         # Perform beam search
         beam_width = int(input("Enter the beam width for beam search folding: ").strip())
-        beam_search = BeamSearchProteinFolding(data, protein, beam_width)
+        workers = get_workers()
+        beam_search = BeamSearchProteinFolding(data, protein, beam_width, workers=workers)
         folded_protein = beam_search.execute()
 
     elif choice == 5:
-        # Perform simulated annealing
-        sa = SimulatedAnnealing(data, protein)
-        folded_protein = sa.execute()
+        # Perform simulated annealing, or replica exchange with more than one replica
+        replicas = int(input("Enter the number of replicas (1 for simulated annealing): ").strip() or 1)
+        chains = get_chains() if replicas <= 1 else 1
+        if replicas > 1:
+            replica_exchange = ReplicaExchange(data, protein, replicas=replicas)
+            folded_protein = replica_exchange.execute()
+        elif chains > 1:
+            lock_step = VectorizedMonteCarlo(data, protein, chains=chains)
+            folded_protein = lock_step.execute()
+        else:
+            sa = SimulatedAnnealing(data, protein)
+            folded_protein = sa.execute()
+
+    elif choice == 6:
+        # Search the optimal folding
+        branch_and_bound = BranchAndBound(protein, data)
+        folded_protein = branch_and_bound.execute()
+
+    elif choice == 7:
+        # Perform PERM chain growth
+        tours = int(input("Enter the number of tours for PERM: ").strip())
+        perm = PERM(data, protein, tours=tours)
+        folded_protein = perm.execute()
+
+    elif choice == 8:
+        # Perform tabu search
+        max_iterations = int(input("Enter the number of iterations for tabu search: ").strip())
+        tabu_search = TabuSearch(protein, max_iterations=max_iterations, data=data)
+        folded_protein = tabu_search.execute()
+
+    elif choice == 9:
+        # Perform the genetic algorithm, with one process per island
+        generations = int(input("Enter the number of generations for the genetic algorithm: ").strip())
+        islands = int(input("Enter the number of islands (1 runs everything in this process): ").strip() or 1)
+        genetic_algorithm = GeneticAlgorithm(data, protein, islands=islands, generations=generations)
+        folded_protein = genetic_algorithm.execute()
+
+    elif choice == 10:
+        # Perform Monte Carlo tree search, with the rollouts spread over worker processes
+        iterations = int(input("Enter the number of rollouts for Monte Carlo tree search: ").strip())
+        workers = get_workers()
+        mcts = MCTS(data, protein, iterations=iterations, workers=workers)
+        folded_protein = mcts.execute()
 
     return folded_protein
 
@@ -212,11 +308,368 @@ def run_choise_menu(choice, protein):
         print("Invalid choice. Please select 1, 2, 3, 4, or 5.")
         return
 
-def run_algorithm_for_x_minutes(choice, protein, algorithm, filename, x_times):
+def run_algorithm_once(choice, protein, data, end_time, parameters=None, checkpoint=None, state=None):
+    """
+    Runs one restart of an algorithm as used by run_algorithm_for_x_minutes.
+
+    Parameters:
+
+    choice: The selected algorithm.
+    protein: The Protein object.
+    data: The DataStoring object of this run.
+    end_time: The end of the time-boxed execution (used by beam search).
+    parameters: Optional dictionary with algorithm parameters, missing keys get their default.
+        1 Random folding: iterations, move_set, mode ("pivot" or "walks").
+        2 Hillclimber: max_iterations, mode ("random", "steepest" or "first"), restart, move_set, chains.
+        3 Greedy folding: lookahead.
+        4 Beam search: beam_width, anytime.
+        5 Simulated annealing: max_attempts_per_temp, hillclimber_iterations, move_set, chains,
+            replicas (with min_temp, max_temp, steps_per_exchange and rounds).
+        6 Branch and bound: node_limit.
+        7 PERM: temperature, tours.
+        8 Tabu search: max_iterations, tenure.
+        9 Genetic algorithm: islands, population_size, generations, migration_interval, migrants,
+            elite, crossover_rate, mutation_rate.
+        10 Monte Carlo tree search: iterations, workers, exploration, temperature.
+        All but 3 and 6 also take optimum, a best known stability to stop at. See the README.
+    checkpoint: Optional function to save the algorithm state during the run (simulated annealing and beam search).
+    state: Optional algorithm state from a checkpoint to continue from.
+    """
+    parameters = parameters or {}
+    optimum = parameters.get("optimum")
+
+    if choice == 1:  # Random Folding
+        rf = RandomFolding(
+            protein,
+            data,
+            move_set=parameters.get("move_set", "rotations"),
+            mode=parameters.get("mode", "pivot"),
+            seed=random.getrandbits(64),
+            optimum=optimum)
+        folded_protein = rf.execute(iterations=parameters.get("iterations", 1000))
+
+    elif choice in (2, 5) and parameters.get("chains", 1) > 1:  # Lock-step chains
+        lock_step = VectorizedMonteCarlo(
+            data,
+            protein,
+            chains=parameters["chains"],
+            annealing=choice == 5,
+            steps_per_temp=parameters.get("max_attempts_per_temp", 100),
+            max_steps=int(parameters.get("max_iterations", 10000)),
+            end_time=end_time,
+            optimum=optimum)
+        folded_protein = lock_step.execute()
+
+    elif choice == 2:  # hillclimber
+        max_iterations = int(parameters.get("max_iterations", 10000))
+        hillclimber_folding = HillClimber(
+            protein,
+            max_iterations=max_iterations,
+            data=data,
+            mode=parameters.get("mode", "random"),
+            restart=parameters.get("restart", False),
+            move_set=parameters.get("move_set", "rotations"),
+            optimum=optimum)
+        folded_protein = hillclimber_folding.execute()
+
+    elif choice == 3:  # Greedy Algorithm
+        gf = GreedyFolding(data, protein, lookahead=parameters.get("lookahead"))
+        folded_protein = gf.execute()
+
+    elif choice == 4:  # Beam Search
+        bs = BeamSearchProteinFolding(data, protein, beam_width=parameters.get("beam_width", 1), optimum=optimum)
+        if parameters.get("anytime", True):
+            folded_protein = bs.execute_anytime(end_time, checkpoint=checkpoint, state=state)
+        else:
+            folded_protein = bs.execute_with_dynamic_beam_width(end_time, checkpoint=checkpoint, state=state)
+
+    elif choice == 5 and parameters.get("replicas", 1) > 1:  # Replica exchange
+        replica_exchange = ReplicaExchange(
+            data,
+            protein,
+            replicas=parameters["replicas"],
+            min_temp=parameters.get("min_temp", 0.3),
+            max_temp=parameters.get("max_temp", 2.0),
+            steps_per_exchange=parameters.get("steps_per_exchange", 500),
+            rounds=parameters.get("rounds", 1000),
+            end_time=end_time,
+            seed=random.getrandbits(64),
+            optimum=optimum)
+        folded_protein = replica_exchange.execute()
+
+    elif choice == 5:  # Simulated Annealing
+        sa = SimulatedAnnealing(
+            data,
+            protein,
+            max_attempts_per_temp=parameters.get("max_attempts_per_temp", 100),
+            hillclimber_iterations=parameters.get("hillclimber_iterations", 1000),
+            move_set=parameters.get("move_set", "rotations"),
+            optimum=optimum)
+        if state is not None:
+            sa.load_state(state)
+        folded_protein = sa.execute(checkpoint=checkpoint)
+
+    elif choice == 6:  # Branch and bound
+        bb = BranchAndBound(protein, data, node_limit=parameters.get("node_limit"), end_time=end_time)
+        folded_protein = bb.execute()
+
+    elif choice == 7:  # PERM
+        perm = PERM(
+            data,
+            protein,
+            temperature=parameters.get("temperature", 0.3),
+            tours=parameters.get("tours", 100),
+            end_time=end_time,
+            optimum=optimum)
+        folded_protein = perm.execute()
+
+    elif choice == 8:  # Tabu search
+        tabu_search = TabuSearch(
+            protein,
+            max_iterations=int(parameters.get("max_iterations", 1000)),
+            data=data,
+            tenure=parameters.get("tenure"),
+            end_time=end_time,
+            optimum=optimum)
+        folded_protein = tabu_search.execute()
+
+    elif choice == 9:  # Genetic algorithm
+        genetic_algorithm = GeneticAlgorithm(
+            data,
+            protein,
+            islands=parameters.get("islands", 1),
+            population_size=parameters.get("population_size", 100),
+            generations=parameters.get("generations", 1000),
+            migration_interval=parameters.get("migration_interval", 10),
+            migrants=parameters.get("migrants", 2),
+            elite=parameters.get("elite", 2),
+            crossover_rate=parameters.get("crossover_rate", 0.9),
+            mutation_rate=parameters.get("mutation_rate", 0.5),
+            end_time=end_time,
+            seed=random.getrandbits(64),
+            optimum=optimum)
+        folded_protein = genetic_algorithm.execute()
+
+    elif choice == 10:  # Monte Carlo tree search
+        mcts = MCTS(
+            data,
+            protein,
+            iterations=parameters.get("iterations", 10000),
+            workers=parameters.get("workers", 1),
+            exploration=parameters.get("exploration", 0.2),
+            temperature=parameters.get("temperature", 0.5),
+            end_time=end_time,
+            seed=random.getrandbits(64),
+            optimum=optimum)
+        folded_protein = mcts.execute()
+
+    return folded_protein
+
+def seed_worker(seed_sequence):
+    """
+    Seeds the random number generators of the current process from a NumPy seed sequence.
+    """
+    seed = int(seed_sequence.generate_state(1)[0])
+    random.seed(seed)
+    np.random.seed(seed)
+
+def run_worker(choice, sequence, algorithm, filename, end_time, seed_sequence, queue, parameters=None, stop=None):
+    """
+    Runs independent restarts of an algorithm in a worker process until end_time,
+    or until a folding reaches the lower bound of the sequence.
+    Raw rows and a summary of every run are sent to the parent through the queue.
+
+    Parameters:
+
+    choice: The selected algorithm.
+    sequence: The protein sequence.
+    algorithm: The name of the algorithm.
+    filename: The filename of the CSV file where the results will be saved.
+    end_time: The time to stop starting new runs.
+    seed_sequence: The NumPy SeedSequence of this worker.
+    queue: The queue to the parent process.
+    parameters: Optional dictionary with algorithm parameters.
+    stop: Optional multiprocessing Event that is set when any worker reaches the lower bound.
+
+    An exception in a run is sent to the parent as an error message with its traceback.
+    """
+    try:
+        seed_worker(seed_sequence)
+        protein = Protein(sequence)
+
+        while datetime.now() < end_time and not (stop is not None and stop.is_set()):
+            start_time = time.time()
+            data = DataStoring(algorithm=algorithm, filename=filename, queue=queue)
+            folded_protein = run_algorithm_once(choice, protein, data, end_time, parameters)
+            execution_time = time.time() - start_time
+            stability = folded_protein.calculate_stability()
+            queue.put(("run", (stability, execution_time, folded_protein.to_bytes())))
+
+            if stop is not None and stability <= protein.lower_bound((parameters or {}).get("optimum")):
+                stop.set()
+    except Exception:
+        queue.put(("error", traceback.format_exc()))
+    finally:
+        # The parent counts the finished workers, so this is sent even after an error
+        queue.put(("done", None))
+
+def get_checkpoint_path(filename):
+    """
+    Returns the path of the checkpoint file that belongs to a results file.
+    """
+    return os.path.join("results", "checkpoints", filename.replace('.csv', '.json'))
+
+def build_checkpoint_state(choice, protein, end_time, best_stability, best_protein, run_count, algorithm_state=None, spawned_workers=0,
+                           seed=None):
+    """
+    Collects everything needed to resume a time-boxed run in a JSON serializable dictionary.
+
+    Parameters:
+
+    choice: The selected algorithm.
+    protein: The Protein object.
+    end_time: The end of the time-boxed execution.
+    best_stability: The best stability found so far.
+    best_protein: The best Protein found so far.
+    run_count: The number of finished runs.
+    algorithm_state: Optional internal state of the running algorithm.
+    spawned_workers: The number of worker random streams used so far.
+    seed: The entropy of the master seed sequence of the run.
+    """
+    return {
+        "sequence": protein.sequence,
+        "choice": choice,
+        "remaining_seconds": max(0.0, (end_time - datetime.now()).total_seconds()),
+        "run_count": run_count,
+        "best_stability": best_stability,
+        "best_directions": best_protein.to_directions() if best_protein else None,
+        "random_state": get_random_state(),
+        "algorithm_state": algorithm_state,
+        "spawned_workers": spawned_workers,
+        "seed": seed,
+    }
+
+def run_parallel_restarts(choice, protein, algorithm, filename, end_time, seed_sequences, raw_filepath, summary_filepath,
+                          parameters=None, best_stability=None, best_protein=None, run_count=0, checkpoint=None, seed=None):
+    """
+    Runs independent restarts of an algorithm in a pool of worker processes until end_time.
+    This process is the only writer of the raw and summary CSV files and keeps the global best folding.
+
+    Parameters:
+
+    choice: The selected algorithm.
+    protein: The Protein object.
+    algorithm: The name of the algorithm.
+    filename: The filename of the CSV file where the results will be saved.
+    end_time: The time to stop starting new runs.
+    seed_sequences: One NumPy SeedSequence per worker process.
+    raw_filepath: The path of the raw data CSV file.
+    summary_filepath: The path of the summary CSV file.
+    parameters: Optional dictionary with algorithm parameters.
+    best_stability, best_protein, run_count: The progress so far when resuming.
+    checkpoint: Optional function called with the best stability, best Protein and run count after every run.
+    seed: The entropy of the master seed sequence, written to the summary of every run.
+
+    Returns:
+
+    tuple: The best stability and the best Protein found.
+
+    Raises:
+
+    RuntimeError: If a worker raised an exception or was killed, with the traceback of the worker.
+    """
+    csv_object = CsvFunctions()
+    lower_bound = protein.lower_bound((parameters or {}).get("optimum"))
+
+    queue = mp.Queue()
+    stop = mp.Event()
+    processes = [
+        mp.Process(
+            target=run_worker,
+            args=(choice, protein.sequence, algorithm, filename, end_time, seed_sequence, queue, parameters, stop)
+        )
+        for seed_sequence in seed_sequences
+    ]
+    for process in processes:
+        process.start()
+
+    running = len(processes)
+    errors = []
+    while running > 0:
+        try:
+            kind, message = queue.get(timeout=1.0)
+        except Empty:
+            # A worker that was killed never sends "done", so stop waiting when no worker is left
+            if not any(process.is_alive() for process in processes):
+                break
+            continue
+
+        if kind == "rows":
+            with open(raw_filepath, mode='a', newline='') as f:
+                csv.writer(f).writerows(message)
+
+        elif kind == "run":
+            current_stability, execution_time, encoded = message
+
+            if best_stability is None or current_stability < best_stability:
+                best_stability = current_stability
+                best_protein = Protein.from_bytes(protein.sequence, encoded)
+
+            print(f"Run {run_count + 1} completed: Time={execution_time:.2f}s, Stability={current_stability}")
+
+            csv_object.csv_summary(
+                summary_filepath,
+                current_stability,
+                protein.sequence,
+                run_count,
+                execution_time,
+                current_stability - lower_bound,
+                seed)
+
+            run_count += 1
+
+            if checkpoint is not None:
+                checkpoint(best_stability, best_protein, run_count)
+
+            # The lower bound is reached, the other workers stop after their current run
+            if best_stability <= lower_bound:
+                stop.set()
+
+        elif kind == "error":
+            # Stop the other workers after their current run, the error is raised once they are done
+            errors.append(message)
+            stop.set()
+
+        elif kind == "done":
+            running -= 1
+
+    for process in processes:
+        process.join()
+
+    errors += [f"Worker process exited with code {process.exitcode}."
+               for process in processes if process.exitcode != 0]
+    if errors:
+        raise RuntimeError("A worker process failed:\n" + "\n".join(errors))
+
+    return best_stability, best_protein
+
+def run_algorithm_for_x_minutes(choice, protein, algorithm, filename, x_times, workers=1, seed=None, parameters=None,
+                                resume=False, checkpoint_interval=60):
     
     """
     Run an algorithm for a specified number of minutes and save the results in the folder under the given CSV file names.
-    Both raw data and a summary will be saved.
+    Both raw data and a summary will be saved. The run stops early when a folding reaches the lower bound of the
+    sequence (its recorded optimum or its parity bound), and the summary gives the gap to that bound for every run.
+
+    With more than one worker, independent restarts run in a pool of processes. Every worker gets its
+    own random stream derived from the master seed, and sends its raw rows and run summaries back to
+    this process, which is the only one writing the CSV files and keeps the global best folding.
+    Without a seed a random one is drawn. The seed is printed and written to the summary of every run,
+    so the run can be replayed by passing it again.
+
+    The best folding, run counter, random state and algorithm state are saved periodically in
+    'results/checkpoints'. With resume, an interrupted run continues from its checkpoint with the
+    time that was left.
 
     Parameters:
 
@@ -225,6 +678,15 @@ def run_algorithm_for_x_minutes(choice, protein, algorithm, filename, x_times):
     algorithm: The name of the algorithm.
     filename: The filename of the CSV file where the results will be saved.
     x_times: The number of minutes the algorithm should run.
+    workers: The number of worker processes.
+    seed: The master seed for the random number generators of the workers.
+    parameters: Optional dictionary with algorithm parameters, see run_algorithm_once.
+    resume: Continue from the checkpoint of an interrupted run if there is one.
+    checkpoint_interval: The minimum number of seconds between two checkpoints.
+
+    Returns:
+
+    The best stability found, or None if no folding was found.
     """
     best_stability = None  
     best_protein = None  
@@ -246,57 +708,114 @@ def run_algorithm_for_x_minutes(choice, protein, algorithm, filename, x_times):
     csv_object.csv_header(raw_filepath, choice)
     csv_object.csv_header_summary(summary_filepath, choice)
 
+    lower_bound = protein.lower_bound((parameters or {}).get("optimum"))
+
     # Set looptime
     end_time = datetime.now() + timedelta(minutes=x_times)
     run_count = 0
 
-    print(f"Starting {x_times}-minute execution...")
+    # Continue from the checkpoint of an interrupted run
+    checkpoint = Checkpoint(get_checkpoint_path(filename), checkpoint_interval)
+    state = checkpoint.load() if resume else None
+    algorithm_state = None
+    spawned_workers = 0
+
+    if state is not None and state["sequence"] == protein.sequence and state["choice"] == choice:
+        end_time = datetime.now() + timedelta(seconds=state["remaining_seconds"])
+        run_count = state["run_count"]
+        algorithm_state = state["algorithm_state"]
+        spawned_workers = state["spawned_workers"]
+        seed = state.get("seed", seed)
+        if state["best_directions"] is not None:
+            best_stability = state["best_stability"]
+            best_protein = Protein.from_directions(protein.sequence, state["best_directions"])
+        print(f"Resuming from checkpoint after {run_count} runs, {state['remaining_seconds']:.0f}s left.")
+    else:
+        state = None
+
+    # Beam search, branch and bound and the lookahead greedy are deterministic,
+    # so parallel restarts would all find the same folding
+    single_run = choice == 3 and (parameters or {}).get("lookahead") is not None
+    if (choice in (4, 6) or single_run) and workers > 1:
+        print(f"{algorithm} runs in a single process.")
+        workers = 1
+
+    seed_sequence = np.random.SeedSequence(seed)
+    seed = seed_sequence.entropy
+    print(f"Starting {x_times}-minute execution with seed {seed}...")
+
+    if workers > 1:
+        # Skip the random streams used before the interruption
+        if spawned_workers:
+            seed_sequence.spawn(spawned_workers)
+        seed_sequences = seed_sequence.spawn(workers)
+        spawned_workers += workers
+
+        def save_parallel_checkpoint(best_stability, best_protein, run_count):
+            if checkpoint.is_due():
+                checkpoint.save(build_checkpoint_state(
+                    choice, protein, end_time, best_stability, best_protein, run_count, spawned_workers=spawned_workers,
+                    seed=seed))
+
+        best_stability, best_protein = run_parallel_restarts(
+            choice, protein, algorithm, filename, end_time, seed_sequences, raw_filepath, summary_filepath,
+            parameters, best_stability, best_protein, run_count, save_parallel_checkpoint, seed)
 
-    while datetime.now() < end_time:
-        start_time = time.time()  # Starting time
-        data = DataStoring(algorithm=algorithm ,filename=filename, run_count=run_count)
+    else:
+        if state is not None:
+            set_random_state(state["random_state"])
+        else:
+            seed_worker(seed_sequence)
 
-        if choice == 1:  # Random Folding
-            rf = RandomFolding(protein,data)
-            folded_protein = rf.execute(iterations=1000)
-        
-        elif choice == 2:  # hillclimber
-            max_iterations = int(10000)
-            hillclimber_folding = HillClimber( protein,max_iterations=max_iterations,data = data)
-            folded_protein = hillclimber_folding.execute()
-        
-        elif choice == 3:  # Greedy Algorithm
-            gf = GreedyFolding(data, protein)
-            folded_protein = gf.execute()
-            
-        elif choice == 4:  # Beam Search
-            bs = BeamSearchProteinFolding(data, protein, beam_width=1)
-            folded_protein = bs.execute_with_dynamic_beam_width(end_time)
+        def save_checkpoint(algorithm_state=None):
+            if not checkpoint.is_due():
+                return False
+            checkpoint.save(build_checkpoint_state(
+                choice, protein, end_time, best_stability, best_protein, run_count, algorithm_state, seed=seed))
+            return True
 
-        elif choice == 5:  # Simulated Annealing
-            sa = SimulatedAnnealing(data, protein)
-            folded_protein = sa.execute()
+        while datetime.now() < end_time:
+            start_time = time.time()  # Starting time
+            data = DataStoring(algorithm=algorithm ,filename=filename, run_count=run_count)
 
-        # Calculates stabbility and time of the best protein from this run
-        current_stability = folded_protein.calculate_stability()
-        execution_time = time.time() - start_time
+            folded_protein = run_algorithm_once(
+                choice, protein, data, end_time, parameters, checkpoint=save_checkpoint, state=algorithm_state)
+            algorithm_state = None
 
-        if best_stability is None or current_stability < best_stability:
-            best_stability = current_stability
-            best_protein = folded_protein
-        
-        sequence_protein=folded_protein.sequence
+            # Calculates stabbility and time of the best protein from this run
+            current_stability = folded_protein.calculate_stability()
+            execution_time = time.time() - start_time
 
-        print(f"Run {run_count + 1} completed: Time={execution_time:.2f}s, Stability={current_stability}")
-        
-        csv_object.csv_summary(
-            summary_filepath,
-            current_stability,
-            sequence_protein,
-            run_count,
-            execution_time)
+            if best_stability is None or current_stability < best_stability:
+                best_stability = current_stability
+                best_protein = folded_protein
 
-        run_count += 1
+            sequence_protein=folded_protein.sequence
+
+            print(f"Run {run_count + 1} completed: Time={execution_time:.2f}s, Stability={current_stability}")
+
+            csv_object.csv_summary(
+                summary_filepath,
+                current_stability,
+                sequence_protein,
+                run_count,
+                execution_time,
+                current_stability - lower_bound,
+                seed)
+
+            run_count += 1
+            save_checkpoint()
+
+            if choice == 6:
+                break  # The exact search is finished or has used all the time
+            if single_run:
+                break  # Another run would give the same folding
+            if best_stability <= lower_bound:
+                print(f"Reached the lower bound {lower_bound}, stopping.")
+                break
+
+    # The run has finished, so it no longer needs to be resumed
+    checkpoint.clear()
 
     # Shows the best folding
     if best_protein:
@@ -314,14 +833,17 @@ def run_algorithm_for_x_minutes(choice, protein, algorithm, filename, x_times):
         # Saves the amino acids placing of the best protein
         amino_acids_filename = filename.replace('.csv', '_best_folding.csv')
         amino_acids_path = os.path.join(plots_directory, amino_acids_filename)
+        directions = best_protein.to_directions() + [0]
         with open(amino_acids_path, mode='w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(['Index', 'Type', 'Position'])
+            writer.writerow(['Index', 'Type', 'Position', 'Direction'])
             for index, amino_acid in enumerate(best_protein.amino_acids):
-                writer.writerow([index, amino_acid['type'], amino_acid['position']])
+                writer.writerow([index, amino_acid['type'], amino_acid['position'], directions[index]])
     else:
         print("No valid folding found.")
 
     distribution = Distribution()
     distribution.visualize_stability_distribution_from_results(filename)
 
+    return best_stability
+
@@ -47,7 +47,11 @@ def main():
 
         elif sort_run == "2":
             minutes = helpers.get_minutes()
-            run_algorithm_for_x_minutes(choice, protein, algorithm, filename, minutes)
+            workers = helpers.get_workers()
+            seed = helpers.get_seed()
+            resume = helpers.get_resume(filename)
+            run_algorithm_for_x_minutes(choice, protein, algorithm, filename, minutes, workers=workers, seed=seed,
+                                        resume=resume)
 
         else:
             print("Invalid execution mode selected.")
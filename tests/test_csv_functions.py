@@ -0,0 +1,27 @@
+from code.classes.csv_functions import RAW_HEADERS, CsvFunctions
+
+import pytest
+
+
+@pytest.mark.parametrize("choice", sorted(RAW_HEADERS))
+def test_header_is_written_once(choice, tmp_path):
+    raw_filepath = str(tmp_path / "raw.csv")
+    csv_object = CsvFunctions()
+
+    csv_object.csv_header(raw_filepath, choice)
+    with open(raw_filepath, mode='a') as f:
+        f.write("1,-3\n")
+    csv_object.csv_header(raw_filepath, choice)
+
+    with open(raw_filepath) as f:
+        lines = f.read().splitlines()
+    assert lines == [",".join(RAW_HEADERS[choice]), "1,-3"]
+
+
+def test_header_is_added_to_a_file_without_one(tmp_path):
+    raw_filepath = tmp_path / "raw.csv"
+    raw_filepath.write_text("10,-6,1\n")
+
+    CsvFunctions().csv_header(str(raw_filepath), 9)
+
+    assert raw_filepath.read_text().splitlines() == ["Generation,Stability,Island", "10,-6,1"]
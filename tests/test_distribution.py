@@ -0,0 +1,48 @@
+from code.visualisation.distribution import Distribution
+
+import csv
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+
+def write_results(directory, filename: str, header: list, rows: list) -> None:
+    """
+    Writes a raw results CSV file in the 'results' directory under directory.
+    """
+    (directory / "results").mkdir()
+    with open(directory / "results" / filename, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def plotted_weights(monkeypatch, filename: str):
+    """
+    Plots the distribution of a results file and returns the weights given to the histogram.
+    """
+    calls = []
+    original_hist = plt.hist
+    monkeypatch.setattr(plt, "hist", lambda *args, **kwargs: calls.append(kwargs) or original_hist(*args, **kwargs))
+    Distribution().visualize_stability_distribution_from_results(filename)
+    assert len(calls) == 1
+    return calls[0]["weights"]
+
+
+def test_temperature_column_is_not_a_weight(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_results(tmp_path, "sa.csv", ['Iteration', 'Stability', 'Temperature'],
+                  [[1, -3, 10.0], [2, -4, 5.0], [3, -4, 1.0]])
+
+    assert plotted_weights(monkeypatch, "sa.csv") is None
+    assert (tmp_path / "results" / "distribution" / "sa_distribution.png").is_file()
+
+
+def test_log_weight_column_weighs_the_walks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_results(tmp_path, "walks.csv", ['Iteration', 'Stability', 'Log Weight'],
+                  [[1, -3, 0.0], [2, -4, 1.0]])
+
+    weights = plotted_weights(monkeypatch, "walks.csv")
+    assert weights is not None
+    assert weights[1] > weights[0]
@@ -0,0 +1,106 @@
+from code.algorithms.branch_and_bound import BranchAndBound
+from code.classes import bounds
+from code.classes.protein import Protein
+
+import random
+import numpy as np
+import pytest
+
+STEPS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+BOND_ENERGIES = {"HH": -1, "HC": -1, "CH": -1, "CC": -5}
+DIRECTION_CODES = {(1, 0, 0): 1, (-1, 0, 0): -1, (0, 1, 0): 2, (0, -1, 0): -2, (0, 0, 1): 3, (0, 0, -1): -3}
+
+
+def random_walk(steps: int, rng: random.Random) -> list[int]:
+    """
+    Grows a random self-avoiding walk, starting over when it gets trapped.
+
+    Args:
+        steps (int): Number of steps.
+        rng (random.Random): The random number generator.
+
+    Returns:
+        list[int]: The direction codes of the walk.
+    """
+    while True:
+        position = (0, 0, 0)
+        visited = {position}
+        directions = []
+        for _ in range(steps):
+            free = [step for step in STEPS if tuple(np.add(position, step)) not in visited]
+            if not free:
+                break
+            step = rng.choice(free)
+            position = tuple(np.add(position, step))
+            visited.add(position)
+            directions.append(DIRECTION_CODES[step])
+        else:
+            return directions
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_stability_matches_reference(seed):
+    rng = random.Random(seed)
+    sequence = "".join(rng.choice("HPC") for _ in range(rng.randint(2, 40)))
+    walks = [random_walk(len(sequence) - 1, rng) for _ in range(20)]
+
+    references = []
+    for directions in walks:
+        protein = Protein.from_directions(sequence, directions)
+        references.append(protein.calculate_stability_reference())
+        assert protein.calculate_stability() == references[-1]
+
+    scores, valid = Protein(sequence).batch_stability(np.array(walks, dtype=np.int8).reshape(len(walks), -1))
+    assert valid.all()
+    assert scores.tolist() == references
+
+
+def brute_force_optimum(sequence: str) -> int:
+    """
+    Finds the lowest stability of a sequence by trying every self-avoiding
+    walk with its first step along +x.
+
+    Args:
+        sequence (str): The protein sequence.
+
+    Returns:
+        int: The optimal stability.
+    """
+    occupied = {(0, 0, 0): 0}
+
+    def extend(index: int, position: tuple, energy: int) -> int:
+        if index == len(sequence):
+            return energy
+        best = 0
+        for step in STEPS if index > 1 else STEPS[:1]:
+            new_position = (position[0] + step[0], position[1] + step[1], position[2] + step[2])
+            if new_position in occupied:
+                continue
+            contact = 0
+            for offset in STEPS:
+                other = occupied.get((new_position[0] + offset[0], new_position[1] + offset[1],
+                                      new_position[2] + offset[2]))
+                if other is not None and other < index - 1:
+                    contact += BOND_ENERGIES.get(sequence[index] + sequence[other], 0)
+            occupied[new_position] = index
+            best = min(best, extend(index + 1, new_position, energy + contact))
+            del occupied[new_position]
+        return best
+
+    return extend(1, (0, 0, 0), 0)
+
+
+@pytest.mark.parametrize("sequence", ["HHPHHHPH", "HPHPPHHPH", "CHPHCHHPC", "HCPHPCPHPC", "CPPCHPPCHPC"])
+def test_branch_and_bound_matches_brute_force(sequence, tmp_path, monkeypatch):
+    # Proven optima go to a temporary file instead of results/optima.json
+    monkeypatch.setattr(bounds, "OPTIMA_FILE", str(tmp_path / "optima.json"))
+    monkeypatch.setattr(bounds, "OPTIMA_LOCK_FILE", str(tmp_path / "optima.json.lock"))
+    monkeypatch.setattr(bounds, "KNOWN_OPTIMA", {})
+    monkeypatch.setattr(bounds, "optima_loaded", False)
+
+    branch_and_bound = BranchAndBound(Protein(sequence))
+    folded_protein = branch_and_bound.execute()
+
+    assert branch_and_bound.certificate["proven"]
+    assert folded_protein.calculate_stability() == brute_force_optimum(sequence)
+    assert bounds.KNOWN_OPTIMA[sequence] == branch_and_bound.best_stability